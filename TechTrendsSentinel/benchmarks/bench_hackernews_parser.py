@@ -0,0 +1,38 @@
+# benchmarks/bench_hackernews_parser.py
+# 比较各 HackerNews 解析后端在保存的页面上的解析耗时：
+#   python benchmarks/bench_hackernews_parser.py [页面.html ...]
+
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))  # 与 src 下的模块一样使用扁平导入
+
+from hackernews_parser import PARSERS  # noqa: E402
+
+DEFAULT_FIXTURES = [os.path.join(ROOT, 'tests', 'fixtures', 'hackernews_front_page.html')]
+
+
+def bench(html, number=50, repeat=5):
+    # 返回 {后端: (每次解析的最短耗时毫秒, 解析出的条目数)}
+    results = {}
+    for name, parse in PARSERS.items():
+        best = min(timeit.repeat(lambda: parse(html), number=number, repeat=repeat)) / number
+        results[name] = (best * 1000, len(parse(html)))
+    return results
+
+
+def main(paths):
+    for path in paths or DEFAULT_FIXTURES:
+        with open(path, 'r', encoding='utf-8') as file:
+            html = file.read()
+        results = bench(html)
+        baseline = results['bs4'][0]
+        print(f"{os.path.basename(path)} ({len(html) / 1024:.0f} KB)")
+        for name, (milliseconds, count) in sorted(results.items(), key=lambda item: item[1][0]):
+            print(f"  {name:<12}{milliseconds:8.2f} ms  {count:>3} 条  {baseline / milliseconds:5.1f}x")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,219 @@
+# benchmarks/bench_jobs.py
+# 离线基准测试：在本地桩服务（GitHub、HackerNews、OpenAI/Ollama、SMTP）上运行 github_job 和 hackernews_job，
+# 统计耗时、请求数、峰值内存和各阶段耗时，结果写入 JSON，便于比较不同版本：
+#   python benchmarks/bench_jobs.py [--sizes 10 100 1000] [--llm-latency 0.05] [--output bench.json] [--baseline old.json]
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_services import GitHubStub, HackerNewsStub, LLMStub, SMTPSink  # noqa: E402
+
+PROMPTS = ('report_prompt.txt', 'hackernews_system_prompt.txt', 'report_merge_prompt.txt', 'report_rollup_prompt.txt')
+
+
+def prepare_workspace(workspace, overrides, repos):
+    # 在临时目录中按仓库的目录结构准备配置、提示词和订阅列表，任务在 workspace/src 中运行，
+    # 生成的报告、缓存和数据库都留在临时目录中，每次运行互不影响
+    with open(os.path.join(ROOT, 'config.json'), 'r', encoding='utf-8') as file:
+        config = json.load(file)
+    config.update(overrides)
+    with open(os.path.join(workspace, 'config.json'), 'w', encoding='utf-8') as file:
+        json.dump(config, file, indent=4, ensure_ascii=False)
+    with open(os.path.join(workspace, 'subscriptions.json'), 'w', encoding='utf-8') as file:
+        json.dump(repos, file)
+    os.makedirs(os.path.join(workspace, 'prompts'))
+    for name in PROMPTS:
+        source = os.path.join(ROOT, 'prompts', name)
+        target = os.path.join(workspace, 'prompts', name)
+        if os.path.exists(source):
+            shutil.copyfile(source, target)
+        else:
+            with open(target, 'w', encoding='utf-8') as file:
+                file.write('请总结以下内容，生成简报。\n')
+    os.makedirs(os.path.join(workspace, 'src'))
+
+
+def run_child(job):
+    # 子进程：与 daemon_process.main 一样创建各组件并运行一次任务，峰值内存只包含任务本身
+    sys.path.insert(0, os.path.join(ROOT, 'src'))
+    import resource
+    from config import Config
+    from daemon_process import github_job, hackernews_job
+    from github_client import GitHubClient
+    from hackernews_client import HackerNewsClient
+    from llm import LLM
+    from notifier import Notifier
+    from report_generator import ReportGenerator
+    from subscription_manager import SubscriptionManager
+    import metrics
+
+    config = Config.shared()
+    llm = LLM(config)
+    llm.warm_up()
+    report_generator = ReportGenerator.from_config(llm, config)
+    notifier = Notifier.from_config(config)
+
+    start = time.perf_counter()
+    if job == 'github':
+        github_job(SubscriptionManager.from_config(config), GitHubClient.from_config(config),
+                   report_generator, notifier, config.freq_days, workers=config.pipeline_workers,
+                   queue_size=config.pipeline_queue_size)
+    else:
+        hackernews_job(HackerNewsClient.from_config(config), report_generator, notifier)
+    wall_seconds = time.perf_counter() - start
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = peak_rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)  # macOS 以字节为单位
+    return {
+        'wall_seconds': round(wall_seconds, 3),
+        'peak_rss_mb': round(peak_rss_mb, 1),
+        'stages': {
+            'pipeline': metrics.STAGE_SECONDS.snapshot(),
+            'queue_wait': metrics.QUEUE_WAIT_SECONDS.snapshot(),
+            'http': metrics.HTTP_REQUEST_SECONDS.snapshot(),
+            'llm': metrics.LLM_REQUEST_SECONDS.snapshot(),
+            'report': metrics.REPORT_SECONDS.snapshot(),
+            'email': metrics.EMAIL_SEND_SECONDS.snapshot(),
+        },
+        'errors': metrics.ERRORS_TOTAL.snapshot(),
+        'cache': metrics.CACHE_REQUESTS_TOTAL.snapshot(),
+    }
+
+
+def run_scenario(job, size, services, args):
+    github, hackernews, llm, smtp = services
+    repos = [f'bench-org/repo-{index:04d}' for index in range(size or 0)]
+    overrides = {
+        'github_api_url': github.url,
+        'hackernews_base_url': hackernews.url,
+        'subscriptions_file': '../subscriptions.json',
+        # 只测量代码本身：放开客户端限速，桩服务的延迟代替真实网络延迟
+        'github_requests_per_second': 1000,
+        'hackernews_requests_per_second': 1000,
+        'is_ollama': args.backend == 'ollama',
+        'metrics_port': 0,
+        'email': {
+            'smtp_server': '127.0.0.1', 'smtp_port': smtp.port, 'ssl': False,
+            'from': 'bench@example.com', 'password': 'bench', 'to': 'bench@example.com',
+            'max_messages_per_minute': 0,
+        },
+    }
+    env = dict(os.environ, OPENAI_BASE_URL=f'{llm.url}/v1', OPENAI_API_KEY='bench', OLLAMA_HOST=llm.url,
+               GITHUB_TOKEN='bench', EMAIL_PASSWORD='bench')
+    for service in services:
+        service.reset()
+
+    workspace = tempfile.mkdtemp(prefix=f'bench_{job}_')
+    try:
+        prepare_workspace(workspace, overrides, repos)
+        result_path = os.path.join(workspace, 'result.json')
+        output = None if args.verbose else subprocess.DEVNULL
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--child', job, '--result', result_path],
+                       cwd=os.path.join(workspace, 'src'), env=env, stdout=output, stderr=output, check=True)
+        with open(result_path, 'r', encoding='utf-8') as file:
+            result = json.load(file)
+    finally:
+        if args.keep:
+            print(f"保留工作目录：{workspace}")
+        else:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    result = dict({'job': job, 'subscriptions': size}, **result)
+    result['requests'] = {'github': github.requests, 'hackernews': hackernews.requests, 'llm': llm.requests,
+                          'smtp_connections': smtp.connections, 'emails': smtp.messages}
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    previous = {(item['job'], item['subscriptions']): item for item in (baseline or {}).get('results', [])}
+    print(f"{'任务':<12}{'订阅数':>6}{'耗时(s)':>10}{'GitHub':>8}{'HN':>6}{'LLM':>6}{'邮件':>6}{'峰值内存(MB)':>14}  对比基线")
+    for item in results:
+        requests = item['requests']
+        line = (f"{item['job']:<12}{item['subscriptions'] or '-':>6}{item['wall_seconds']:>10.2f}"
+                f"{requests['github']:>8}{requests['hackernews']:>6}{requests['llm']:>6}{requests['emails']:>6}"
+                f"{item['peak_rss_mb']:>14.1f}")
+        old = previous.get((item['job'], item['subscriptions']))
+        if old:
+            line += f"  {item['wall_seconds'] / old['wall_seconds']:.2f}x"
+        print(line)
+        stages = ', '.join(f"{name} {values['sum']:.2f}s" for name, values in item['stages']['pipeline'].items())
+        if stages:
+            print(f"{'':<18}阶段累计耗时：{stages}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark for github_job and hackernews_job')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help='Numbers of subscriptions')
+    parser.add_argument('--jobs', nargs='+', choices=['github', 'hackernews'], default=['github', 'hackernews'])
+    parser.add_argument('--backend', choices=['openai', 'ollama'], default='openai', help='LLM API to emulate')
+    parser.add_argument('--github-latency', type=float, default=0.02, help='Seconds per GitHub request')
+    parser.add_argument('--hackernews-latency', type=float, default=0.05, help='Seconds per HackerNews request')
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='Seconds per LLM call')
+    parser.add_argument('--items-per-kind', type=int, default=5, help='Commits/issues/PRs returned per repository')
+    parser.add_argument('--output', default='bench_jobs.json', help='Where to write the JSON results')
+    parser.add_argument('--baseline', help='Previous JSON results to compare wall time against')
+    parser.add_argument('--keep', action='store_true', help='Keep the temporary workspaces')
+    parser.add_argument('--verbose', action='store_true', help='Show the job logs')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_child(args.child)
+        with open(args.result, 'w', encoding='utf-8') as file:
+            json.dump(result, file)
+        return
+
+    services = (GitHubStub(args.github_latency, args.items_per_kind).start(),
+                HackerNewsStub(args.hackernews_latency).start(),
+                LLMStub(args.llm_latency).start(),
+                SMTPSink().start())
+    try:
+        results = []
+        for job in args.jobs:
+            # hackernews_job 与订阅数无关，只运行一次
+            for size in (args.sizes if job == 'github' else [None]):
+                results.append(run_scenario(job, size, services, args))
+    finally:
+        for service in services:
+            service.stop()
+
+    report = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'settings': {name: getattr(args, name) for name in
+                     ('backend', 'github_latency', 'hackernews_latency', 'llm_latency', 'items_per_kind')},
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2, ensure_ascii=False)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+    print_results(results, baseline)
+    print(f"结果已保存到 {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+# benchmarks/bench_startup.py
+# 测量命令行工具和守护进程的启动耗时：每个场景在新的 Python 进程中运行多次，统计最短和中位耗时，
+# 并列出导入耗时最多的模块（python -X importtime），结果写入 JSON，便于比较不同版本：
+#   python benchmarks/bench_startup.py [--repeat 10] [--output bench_startup.json] [--baseline old.json]
+
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, 'src')
+
+# 场景名 -> 在 src 目录下运行的 Python 参数；单条命令执行后即退出，不进入交互模式
+SCENARIOS = {
+    'command_tool list': ['command_tool.py', 'list'],
+    'command_tool help': ['command_tool.py', 'help'],
+    'import daemon_process': ['-c', 'import daemon_process'],
+    'import llm': ['-c', 'import llm'],
+}
+
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$')
+
+
+def run_once(arguments):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *arguments], cwd=SRC, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                   check=True)
+    return time.perf_counter() - start
+
+
+def slowest_imports(arguments, top_n):
+    # 只统计顶层导入（缩进最小的行），其累计耗时包含各自依赖的导入
+    output = subprocess.run([sys.executable, '-X', 'importtime', *arguments], cwd=SRC, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True).stderr
+    entries = []
+    for line in output.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            entries.append((len(match.group(3)), match.group(4), int(match.group(2)) / 1000))
+    if not entries:
+        return {}
+    depth = min(entry[0] for entry in entries)
+    top = sorted((entry for entry in entries if entry[0] == depth), key=lambda entry: entry[2], reverse=True)
+    return {name: round(milliseconds, 1) for _, name, milliseconds in top[:top_n]}
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    previous = {item['scenario']: item for item in (baseline or {}).get('results', [])}
+    print(f"{'场景':<26}{'最短(ms)':>10}{'中位(ms)':>10}  对比基线")
+    for item in results:
+        line = f"{item['scenario']:<26}{item['min_ms']:>10.1f}{item['median_ms']:>10.1f}"
+        old = previous.get(item['scenario'])
+        if old:
+            line += f"  {item['median_ms'] / old['median_ms']:.2f}x"
+        print(line)
+        imports = ', '.join(f"{name} {milliseconds:.0f}ms" for name, milliseconds in item['imports'].items())
+        if imports:
+            print(f"{'':<4}导入耗时：{imports}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup time benchmark for command_tool and the daemon')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--repeat', type=int, default=10, help='Runs per scenario')
+    parser.add_argument('--top', type=int, default=5, help='Number of slowest imports to show')
+    parser.add_argument('--output', default='bench_startup.json', help='Where to write the JSON results')
+    parser.add_argument('--baseline', help='Previous JSON results to compare startup time against')
+    args = parser.parse_args()
+
+    results = []
+    for name in args.scenarios:
+        arguments = SCENARIOS[name]
+        run_once(arguments)  # 第一次运行用于生成字节码缓存，不计入结果
+        timings = [run_once(arguments) * 1000 for _ in range(args.repeat)]
+        results.append({
+            'scenario': name,
+            'min_ms': round(min(timings), 1),
+            'median_ms': round(statistics.median(timings), 1),
+            'imports': slowest_imports(arguments, args.top),
+        })
+
+    report = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'settings': {'repeat': args.repeat},
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2, ensure_ascii=False)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+    print_results(results, baseline)
+    print(f"结果已保存到 {args.output}")
+
+
+if __name__ == '__main__':
+    main()
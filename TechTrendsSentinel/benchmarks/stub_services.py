@@ -0,0 +1,225 @@
+# benchmarks/stub_services.py
+# 基准测试使用的本地桩服务：GitHub REST API、HackerNews 页面、OpenAI/Ollama 兼容的对话接口和 SMTP 收件服务器。
+# 每个服务在后台线程中运行，按 latency 秒延迟响应，并统计收到的请求数
+
+import json
+import os
+import socketserver
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'tests', 'fixtures')
+
+
+# HTTP 桩服务基类：子类实现 handle(method, path, body)，返回 (状态码, 响应头, 响应体)
+class StubService:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._server.server_port}'
+
+    def start(self):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # 支持长连接，与真实服务一样复用连接池
+
+            def do_GET(self):
+                self._respond('GET')
+
+            def do_POST(self):
+                self._respond('POST')
+
+            def _respond(self, method):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                service._count()
+                if service.latency:
+                    time.sleep(service.latency)
+                status, headers, payload = service.handle(method, self.path, body)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+
+    def _count(self):
+        with self._lock:
+            self.requests += 1
+
+    def handle(self, method, path, body):
+        raise NotImplementedError
+
+
+def _json_response(data, status=200, headers=None):
+    return status, dict({'Content-Type': 'application/json'}, **(headers or {})), json.dumps(data).encode()
+
+
+# GitHub REST API：每个仓库的 commits / issues / pulls 各返回 items_per_kind 条在当前日期范围内的条目
+class GitHubStub(StubService):
+    def __init__(self, latency=0.02, items_per_kind=5):
+        super().__init__(latency)
+        self.items_per_kind = items_per_kind
+
+    def handle(self, method, path, body):
+        parts = urlparse(path).path.strip('/').split('/')
+        if len(parts) != 4 or parts[0] != 'repos' or parts[3] not in ('commits', 'issues', 'pulls'):
+            return _json_response({'message': 'Not Found'}, 404)
+        repo, kind = f'{parts[1]}/{parts[2]}', parts[3]
+        now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        items = []
+        for index in range(1, self.items_per_kind + 1):
+            if kind == 'commits':
+                items.append({'sha': f'{repo}-{index}', 'commit': {
+                    'message': f'Commit {index} of {repo}', 'committer': {'date': now}}})
+            else:
+                items.append({'id': zlib.crc32(f'{repo}/{kind}/{index}'.encode()), 'number': index,
+                              'title': f'{kind[:-1].capitalize()} {index} of {repo}', 'state': 'closed',
+                              'updated_at': now, 'closed_at': now})
+        # 配额始终充足，请求节奏只受客户端的 github_requests_per_second 限制
+        rate_headers = {'X-RateLimit-Limit': '5000', 'X-RateLimit-Remaining': '4999',
+                        'X-RateLimit-Reset': str(int(time.time()) + 3600)}
+        return _json_response(items, headers=rate_headers)
+
+
+# HackerNews：列表页返回保存的首页，讨论页返回保存的评论页
+class HackerNewsStub(StubService):
+    def __init__(self, latency=0.05):
+        super().__init__(latency)
+        with open(os.path.join(FIXTURES, 'hackernews_front_page.html'), 'rb') as file:
+            self.front_page = file.read()
+        with open(os.path.join(FIXTURES, 'hackernews_item.html'), 'rb') as file:
+            self.item_page = file.read()
+
+    def handle(self, method, path, body):
+        page = self.item_page if urlparse(path).path == '/item' else self.front_page
+        return 200, {'Content-Type': 'text/html; charset=utf-8'}, page
+
+
+# OpenAI（/v1/chat/completions）与 Ollama（/api/chat、/api/generate）兼容的对话接口，返回固定格式的简报
+class LLMStub(StubService):
+    def __init__(self, latency=0.05, report_lines=20):
+        super().__init__(latency)
+        self.report_lines = report_lines
+
+    def _report(self, request):
+        messages = request.get('messages') or [{'content': request.get('prompt', '')}]
+        title = messages[-1]['content'].strip().splitlines()[0] if messages[-1]['content'].strip() else ''
+        lines = [f'- 进展 {index}：{title[:60]}' for index in range(1, self.report_lines + 1)]
+        return '## 简报\n\n' + '\n'.join(lines)
+
+    def handle(self, method, path, body):
+        request = json.loads(body or b'{}')
+        path = urlparse(path).path
+        if path.endswith('/chat/completions'):
+            content = self._report(request)
+            if request.get('stream'):
+                chunk = {'id': 'bench', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                         'model': request.get('model'), 'choices': [
+                             {'index': 0, 'delta': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}]}
+                payload = f'data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n'.encode()
+                return 200, {'Content-Type': 'text/event-stream'}, payload
+            return _json_response({
+                'id': 'bench', 'object': 'chat.completion', 'created': int(time.time()), 'model': request.get('model'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+            })
+        if path in ('/api/chat', '/api/generate'):
+            content = self._report(request) if path == '/api/chat' and request.get('messages') else ''
+            response = {'model': request.get('model'), 'created_at': datetime.now(timezone.utc).isoformat(),
+                        'done': True, 'load_duration': 0}
+            if path == '/api/chat':
+                response['message'] = {'role': 'assistant', 'content': content}
+            else:
+                response['response'] = content
+            if request.get('stream'):
+                return 200, {'Content-Type': 'application/x-ndjson'}, (json.dumps(response) + '\n').encode()
+            return _json_response(response)
+        return _json_response({'error': 'not found'}, 404)
+
+
+# SMTP 收件服务器：支持 EHLO、AUTH PLAIN 和 DATA，只统计连接数和收到的邮件数
+class SMTPSink:
+    def __init__(self):
+        self.connections = 0
+        self.messages = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                with sink._lock:
+                    sink.connections += 1
+                self._reply('220 localhost ESMTP bench')
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode('utf-8', 'replace').strip().upper()
+                    if command.startswith('EHLO'):
+                        self._reply('250-localhost', '250-AUTH PLAIN', '250 OK')
+                    elif command.startswith('AUTH'):
+                        self._reply('235 Authentication successful')
+                    elif command == 'DATA':
+                        self._reply('354 End data with <CR><LF>.<CR><LF>')
+                        while self.rfile.readline() not in (b'.\r\n', b''):
+                            pass
+                        with sink._lock:
+                            sink.messages += 1
+                        self._reply('250 OK')
+                    elif command == 'QUIT':
+                        self._reply('221 Bye')
+                        return
+                    else:  # HELO、MAIL、RCPT、RSET、NOOP
+                        self._reply('250 OK')
+
+            def _reply(self, *lines):
+                self.wfile.write(''.join(f'{line}\r\n' for line in lines).encode())
+
+        self._server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset(self):
+        with self._lock:
+            self.connections = 0
+            self.messages = 0
@@ -15,8 +15,8 @@ PID_FILE="./run/$DAEMON_NAME.pid"
 # 启动守护进程的函数
 start() {
     echo "Starting $DAEMON_NAME..."
-    # 使用 nohup 命令在后台运行 Python 脚本，并将输出重定向到日志文件
-    nohup python3 $DAEMON_PATH > $LOG_FILE 2>&1 &
+    # 使用 nohup 命令在后台运行 Python 脚本，并将输出重定向到日志文件；额外参数（如 --profile）原样传给脚本
+    nohup python3 $DAEMON_PATH "$@" > $LOG_FILE 2>&1 &
     # 将守护进程的 PID 写入文件
     echo $! > $PID_FILE
     echo "$DAEMON_NAME started."
@@ -57,7 +57,7 @@ status() {
 # 根据输入参数选择执行哪个函数
 case "$1" in
     start)
-        start
+        start "${@:2}"
         ;;
     stop)
         stop
@@ -68,10 +68,10 @@ case "$1" in
     restart)
         # 重启守护进程
         stop
-        start
+        start "${@:2}"
         ;;
     *)
         # 如果参数不符合预期，显示用法
-        echo "Usage: $0 {start|stop|status|restart}"
+        echo "Usage: $0 {start|stop|status|restart} [--profile]"
         exit 1
 esac
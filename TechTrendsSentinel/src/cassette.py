@@ -0,0 +1,163 @@
+# src/cassette.py
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib  # 导入zlib压缩录制的响应
+from contextlib import closing
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from logger import LOG  # 导入日志模块
+
+RECORD = 'record'  # 正常访问网络和模型，并把响应写入录制文件
+REPLAY = 'replay'  # 只从录制文件返回响应，不访问网络和模型
+
+# 请求中的日期和时间戳（如 since 参数、报告标题中的日期）在匹配前统一替换，录制的数据可以在之后任何一天回放
+DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}(?:[T -]\d{2}(?::|%3A|-)\d{2}(?:(?::|%3A|-)\d{2})?(?:\.\d+)?(?:Z|%2B00%3A00|\+00:00)?)?')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS interactions (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    summary TEXT,
+    payload BLOB NOT NULL,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (kind, key, seq)
+);
+'''
+
+
+class CassetteMiss(LookupError):
+    pass
+
+
+# 录制/回放存储：按 (类型, 请求键) 保存 zlib 压缩的响应；同一请求录制多次时按录制顺序依次回放，超出后重复最后一次
+class Cassette:
+    def __init__(self, path='data/cassette.db', mode=REPLAY):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"不支持的录制模式：{mode}（可用：{RECORD}、{REPLAY}）")
+        self.path = path
+        self.mode = mode
+        self._played = {}  # (类型, 请求键) -> 已回放的次数
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')  # WAL 模式允许并发读写
+            conn.executescript(SCHEMA)
+
+    @classmethod
+    def from_config(cls, config):
+        # cassette_mode 为空时不启用录制/回放，返回 None
+        if not config.cassette_mode:
+            return None
+        return cls(config.cassette_path, config.cassette_mode)
+
+    @property
+    def replaying(self):
+        return self.mode == REPLAY
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def make_key(request):
+        text = json.dumps(request, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(DATE_RE.sub('<date>', text).encode('utf-8')).hexdigest()
+
+    def record(self, kind, request, payload, summary=None):
+        key = self.make_key(request)
+        blob = zlib.compress(json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute(
+                'INSERT INTO interactions (kind, key, seq, summary, payload, recorded_at) '
+                'SELECT ?, ?, COALESCE(MAX(seq) + 1, 0), ?, ?, ? FROM interactions WHERE kind = ? AND key = ?',
+                (kind, key, summary, blob, time.time(), kind, key)
+            )
+
+    def lookup(self, kind, request, summary=None):
+        # 返回下一条录制的响应，没有录制时抛出 CassetteMiss
+        key = self.make_key(request)
+        with self._lock:
+            seq = self._played.get((kind, key), 0)
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    'SELECT payload FROM interactions WHERE kind = ? AND key = ? AND seq <= ? ORDER BY seq DESC LIMIT 1',
+                    (kind, key, seq)
+                ).fetchone()
+            if row is None:
+                raise CassetteMiss(f"录制文件中没有该请求：{summary or key}")
+            self._played[(kind, key)] = seq + 1
+        return json.loads(zlib.decompress(row[0]).decode('utf-8'))
+
+    def play(self, kind, request, call, summary=None):
+        # 回放模式返回录制的响应；录制模式调用 call() 并保存其返回值（须可序列化为 JSON）
+        if self.replaying:
+            return self.lookup(kind, request, summary)
+        payload = call()
+        self.record(kind, request, payload, summary)
+        return payload
+
+    def counts(self):
+        with closing(self._connect()) as conn:
+            return dict(conn.execute('SELECT kind, COUNT(*) FROM interactions GROUP BY kind').fetchall())
+
+
+# 挂载到 requests.Session 上的传输适配器：录制或回放经过该会话的所有 HTTP 请求。
+# 请求键只包含方法、URL 和请求体，不包含请求头，令牌等凭据不会写入录制文件
+class CassetteAdapter(HTTPAdapter):
+    def __init__(self, cassette, **kwargs):
+        self.cassette = cassette
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        body = request.body.decode('utf-8') if isinstance(request.body, bytes) else request.body
+        key = {'method': request.method, 'url': request.url, 'body': body}
+        summary = f'{request.method} {request.url}'
+        if self.cassette.replaying:
+            try:
+                payload = self.cassette.lookup('http', key, summary)
+            except CassetteMiss as e:
+                raise requests.exceptions.ConnectionError(str(e), request=request)
+            return self._replay_response(request, payload)
+
+        response = super().send(request, **kwargs)
+        # 保存解压后的响应体；字节按 latin-1 无损转换为文本
+        headers = {name: value for name, value in response.headers.items()
+                   if name.lower() not in ('content-encoding', 'transfer-encoding', 'set-cookie')}
+        self.cassette.record('http', key, {
+            'status': response.status_code, 'reason': response.reason, 'headers': headers,
+            'body': response.content.decode('latin-1'),
+        }, summary)
+        return response
+
+    @staticmethod
+    def _replay_response(request, payload):
+        response = requests.Response()
+        response.status_code = payload['status']
+        response.reason = payload['reason']
+        response.headers = CaseInsensitiveDict(payload['headers'])
+        response._content = payload['body'].encode('latin-1')
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        return response
+
+
+def mount_session(session, cassette, pool_size):
+    # 为会话挂载连接池适配器，启用录制/回放时使用 CassetteAdapter
+    if cassette:
+        adapter = CassetteAdapter(cassette, pool_connections=pool_size, pool_maxsize=pool_size)
+        LOG.info(f"HTTP 请求{'回放' if cassette.replaying else '录制'}模式：{cassette.path}")
+    else:
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return adapter
@@ -5,11 +5,9 @@ import argparse
 import argparse  # 导入argparse库，用于处理命令行参数解析
 
 class CommandHandler:
-    def __init__(self, github_client, subscription_manager, report_generator):
-        # 初始化CommandHandler，接收GitHub客户端、订阅管理器和报告生成器
-        self.github_client = github_client
-        self.subscription_manager = subscription_manager
-        self.report_generator = report_generator
+    def __init__(self, services):
+        # 初始化CommandHandler，接收按需创建GitHub客户端、订阅管理器和报告生成器的 Services
+        self.services = services
         self.parser = self.create_parser()  # 创建命令行解析器
 
     def create_parser(self):
@@ -23,6 +21,9 @@ class CommandHandler:
         # 添加订阅命令
         parser_add = subparsers.add_parser('add', help='Add a subscription')
         parser_add.add_argument('repo', type=str, help='The repository to subscribe to (e.g., owner/repo)')
+        parser_add.add_argument('--frequency-days', type=int, help='Report period in days (default: global setting)')
+        parser_add.add_argument('--recipients', nargs='+', help='Email recipients for this repository')
+        parser_add.add_argument('--priority', choices=['high', 'low'], help='Rate limit priority')
         parser_add.set_defaults(func=self.add_subscription)
 
         # 删除订阅命令
@@ -34,6 +35,15 @@ class CommandHandler:
         parser_list = subparsers.add_parser('list', help='List all subscriptions')
         parser_list.set_defaults(func=self.list_subscriptions)
 
+        # 批量导入、导出订阅命令
+        parser_import = subparsers.add_parser('import', help='Import subscriptions from a JSON file')
+        parser_import.add_argument('file', type=str, help='JSON list of repositories or subscription objects')
+        parser_import.set_defaults(func=self.import_subscriptions)
+
+        parser_export_subs = subparsers.add_parser('export-subscriptions', help='Export subscriptions to a JSON file')
+        parser_export_subs.add_argument('file', type=str, help='The JSON file to write')
+        parser_export_subs.set_defaults(func=self.export_subscriptions)
+
         # 导出每日进展命令
         parser_export = subparsers.add_parser('export', help='Export daily progress')
         parser_export.add_argument('repo', type=str, help='The repository to export progress from (e.g., owner/repo)')
@@ -58,29 +68,39 @@ class CommandHandler:
 
     # 下面是各种命令对应的方法实现，每个方法都使用了相应的管理器来执行实际操作，并输出结果信息
     def add_subscription(self, args):
-        self.subscription_manager.add_subscription(args.repo)
+        self.services.subscription_manager.add_subscription(args.repo, args.frequency_days, args.recipients,
+                                                             args.priority)
         print(f"Added subscription for repository: {args.repo}")
 
     def remove_subscription(self, args):
-        self.subscription_manager.remove_subscription(args.repo)
+        self.services.subscription_manager.remove_subscription(args.repo)
         print(f"Removed subscription for repository: {args.repo}")
 
     def list_subscriptions(self, args):
-        subscriptions = self.subscription_manager.list_subscriptions()
+        subscriptions = self.services.subscription_manager.iter_subscriptions()
         print("Current subscriptions:")
         for sub in subscriptions:
-            print(f"  - {sub}")
+            settings = ', '.join(f"{key}: {value}" for key, value in sub.to_dict().items() if key != 'repo')
+            print(f"  - {sub.repo}" + (f" ({settings})" if settings else ''))
+
+    def import_subscriptions(self, args):
+        count = self.services.subscription_manager.import_file(args.file)
+        print(f"Imported {count} new subscriptions from {args.file}")
+
+    def export_subscriptions(self, args):
+        count = self.services.subscription_manager.export_file(args.file)
+        print(f"Exported {count} subscriptions to {args.file}")
 
     def export_daily_progress(self, args):
-        self.github_client.export_daily_progress(args.repo)
+        self.services.github_client.export_daily_progress(args.repo)
         print(f"Exported daily progress for repository: {args.repo}")
 
     def export_progress_by_date_range(self, args):
-        self.github_client.export_progress_by_date_range(args.repo, days=args.days)
+        self.services.github_client.export_progress_by_date_range(args.repo, days=args.days)
         print(f"Exported progress for the last {args.days} days for repository: {args.repo}")
 
     def generate_daily_report(self, args):
-        self.report_generator.generate_daily_report(args.file)
+        self.services.report_generator.generate_daily_report(args.file)
         print(f"Generated daily report from file: {args.file}")
 
     def print_help(self, args=None):
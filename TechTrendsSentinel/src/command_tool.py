@@ -1,22 +1,39 @@
+import argparse  # 导入argparse库，用于解析启动参数
 import shlex  # 导入shlex库，用于正确解析命令行输入
 
 from config import Config  # 从config模块导入Config类，用于配置管理
-from github_client import GitHubClient  # 从github_client模块导入GitHubClient类，用于GitHub API操作
-from report_generator import ReportGenerator  # 从report_generator模块导入ReportGenerator类，用于报告生成
-from llm import LLM  # 从llm模块导入LLM类，可能用于语言模型相关操作
-from subscription_manager import SubscriptionManager  # 从subscription_manager模块导入SubscriptionManager类，管理订阅
+from services import Services  # 按需创建GitHub客户端、语言模型、报告生成器和订阅管理器
 from command_handler import CommandHandler  # 从command_handler模块导入CommandHandler类，处理命令行命令
 from logger import LOG  # 从logger模块导入LOG对象，用于日志记录
+from profiler import Profiler  # 导入剖析器，用于 --profile 模式
+
+def run_command(args, profiler):
+    if profiler:
+        with profiler.profile(f'command_{args.command}'):
+            args.func(args)  # 在剖析中执行命令，结束后输出耗时最多的函数
+    else:
+        args.func(args)  # 执行对应的命令函数
 
 def main():
-    config = Config()  # 创建配置实例
-    github_client = GitHubClient(config.github_token)  # 创建GitHub客户端实例
-    llm = LLM()  # 创建语言模型实例
-    report_generator = ReportGenerator(llm)  # 创建报告生成器实例
-    subscription_manager = SubscriptionManager(config.subscriptions_file)  # 创建订阅管理器实例
-    command_handler = CommandHandler(github_client, subscription_manager, report_generator)  # 创建命令处理器实例
+    startup_parser = argparse.ArgumentParser(description='GitHub Sentinel command line tool')
+    startup_parser.add_argument('--profile', action='store_true', help='Profile every command and log the hottest functions')
+    # 其余参数作为单条命令执行，例如 command_tool.py list；不带命令时进入交互模式
+    startup_args, command = startup_parser.parse_known_args()
+
+    config = Config.shared()  # 获取共享的配置实例
+    profiler = Profiler.from_config(config) if startup_args.profile else None
+    # 各组件在命令首次用到时才创建，list/add/remove 不会导入 openai、ollama 和 requests
+    command_handler = CommandHandler(Services(config))  # 创建命令处理器实例
     
     parser = command_handler.parser  # 获取命令解析器
+    if command:
+        args = parser.parse_args(command)  # 参数无效时 argparse 输出用法并退出
+        if args.command is None:
+            parser.print_help()
+            return
+        run_command(args, profiler)
+        return
+
     command_handler.print_help()  # 打印帮助信息
 
     while True:
@@ -28,7 +45,7 @@ def main():
                 args = parser.parse_args(shlex.split(user_input))  # 解析用户输入的命令
                 if args.command is None:  # 如果没有命令被解析，则继续循环
                     continue
-                args.func(args)  # 执行对应的命令函数
+                run_command(args, profiler)
             except SystemExit as e:  # 捕获由于错误命令引发的异常
                 LOG.error("Invalid command. Type 'help' to see the list of available commands.")
         except Exception as e:
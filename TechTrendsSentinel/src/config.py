@@ -1,9 +1,21 @@
 import json
 import os
+import threading
 
 class Config:
+    _shared = None  # 进程内共享的实例，见 shared()
+    _shared_lock = threading.Lock()
+
     def __init__(self):
         self.load_config()
+
+    @classmethod
+    def shared(cls):
+        # 返回进程内共享的配置实例，各组件不再各自重新读取和解析 config.json
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
     
     def load_config(self):
         # 尝试从环境变量获取配置或使用 config.json 文件中的配置作为回退
@@ -17,14 +29,93 @@ class Config:
             self.email = config.get('email', {})
             # 使用环境变量或配置文件中的电子邮件密码
             self.email['password'] = os.getenv('EMAIL_PASSWORD', self.email.get('password', ''))
+            # 持久化发件箱（为空则不启用）、最大投递次数、首次重试间隔和后台发送线程的轮询间隔
+            self.outbox_db = config.get('outbox_db', 'data/outbox.db')
+            self.outbox_max_attempts = config.get('outbox_max_attempts', 8)
+            self.outbox_retry_seconds = config.get('outbox_retry_seconds', 60)
+            self.outbox_poll_seconds = config.get('outbox_poll_seconds', 30)
 
+            # 订阅存储（SQLite），首次使用时导入 subscriptions_file 中原有的 JSON 订阅列表
+            self.subscriptions_db = config.get('subscriptions_db', 'data/subscriptions.db')
             self.subscriptions_file = config.get('subscriptions_file')
+            # GitHub API 与 HackerNews 的地址，可指向本地桩服务进行离线测试与基准测试
+            self.github_api_url = config.get('github_api_url', 'https://api.github.com')
+            self.hackernews_base_url = config.get('hackernews_base_url', 'https://news.ycombinator.com')
+            # GitHub 请求的最大并发数（同时进行中的HTTP请求上限）
+            self.github_max_concurrency = config.get('github_max_concurrency', 8)
+            # GitHub 条件请求缓存目录（为空则关闭缓存）及其容量上限
+            self.github_cache_dir = config.get('github_cache_dir', 'cache/github')
+            self.github_cache_max_size_mb = config.get('github_cache_max_size_mb', 100)
+            # GitHub 请求速率上限（次/秒）、为高优先级仓库保留的配额，以及配额不足时可推迟的低优先级仓库
+            self.github_requests_per_second = config.get('github_requests_per_second', 10)
+            self.github_rate_limit_reserve = config.get('github_rate_limit_reserve', 200)
+            self.github_low_priority_repos = config.get('github_low_priority_repos', [])
+            # 本地事件存储（SQLite）路径，为空则每次都从 GitHub 获取完整日期范围
+            self.github_event_store = config.get('github_event_store', 'data/github_events.db')
+            # GitHub 后端：rest 或 graphql（graphql 模式下一次查询获取一批仓库，单批仓库数和估算点数有上限）
+            self.github_backend = config.get('github_backend', 'rest')
+            self.github_graphql_batch_size = config.get('github_graphql_batch_size', 50)
+            self.github_graphql_max_cost = config.get('github_graphql_max_cost', 10)
             # 默认每天执行
             self.freq_days = config.get('github_progress_frequency_days', 1)
+            # 检查到期订阅的间隔（小时），为空时取全局周期与所有订阅报告周期中的最小值
+            self.github_check_interval_hours = config.get('github_check_interval_hours')
             # 默认早上8点更新 (操作系统默认时区是 UTC +0，08点刚好对应北京时间凌晨12点)
             self.exec_time = config.get('github_progress_execution_time', "08:00")
             self.hackernews_freq_hours=config.get('hackernews_progress_frequency_hours',1)
+            # 调度器：保存上次运行时间的文件、错过运行后的补跑策略（once / skip）和每次运行的随机推迟秒数
+            self.scheduler_state_file = config.get('scheduler_state_file', 'data/scheduler_state.json')
+            self.scheduler_catch_up = config.get('scheduler_catch_up', 'once')
+            self.scheduler_jitter_seconds = config.get('scheduler_jitter_seconds', 30)
+            # Prometheus 格式指标端点的监听地址与端口（0 表示不启动），后台进程与 Gradio 界面各用一个端口
+            self.metrics_host = config.get('metrics_host', '127.0.0.1')
+            self.metrics_port = config.get('metrics_port', 9108)
+            self.gradio_metrics_port = config.get('gradio_metrics_port', 9109)
+            # --profile 模式：.prof 文件的保存目录、日志中输出的函数数量和排序字段（cumulative / tottime）
+            self.profile_dir = config.get('profile_dir', 'data/profiles')
+            self.profile_top_n = config.get('profile_top_n', 20)
+            self.profile_sort = config.get('profile_sort', 'cumulative')
+            # HackerNews 页面解析后端：auto / lxml / htmlparser / bs4
+            self.hackernews_parser = config.get('hackernews_parser', 'auto')
+            # 已见新闻索引（为空则不启用），以及判定热度快速上升的每小时分数增量
+            self.hackernews_story_index = config.get('hackernews_story_index', 'data/hackernews_stories.db')
+            self.hackernews_rising_points_per_hour = config.get('hackernews_rising_points_per_hour', 50)
+            # 抓取 /news 的页数、额外抓取的列表（如 newest、show）、并发数、请求超时与速率，
+            # 以及每条新闻抽样的顶层评论数（0 表示不抓取评论）
+            self.hackernews_pages = config.get('hackernews_pages', 1)
+            self.hackernews_extra_feeds = config.get('hackernews_extra_feeds', [])
+            self.hackernews_max_concurrency = config.get('hackernews_max_concurrency', 4)
+            self.hackernews_timeout_seconds = config.get('hackernews_timeout_seconds', 10)
+            self.hackernews_requests_per_second = config.get('hackernews_requests_per_second', 2)
+            self.hackernews_top_comments = config.get('hackernews_top_comments', 0)
+            # github_job 流水线各阶段（拉取/总结/通知）的工作线程数与阶段间队列长度
+            self.pipeline_workers = config.get('pipeline_workers', {'fetch': 8, 'summarize': 2, 'notify': 1})
+            self.pipeline_queue_size = config.get('pipeline_queue_size', 10)
             self.is_ollama=config.get('is_ollama',False)
             self.model_name=config.get('model_name','gpt-4o-mini')
+            # Ollama 模型在每次调用后继续驻留内存的时间，以及定时任务开始前提前预热的秒数
+            self.ollama_keep_alive = config.get('ollama_keep_alive', '30m')
+            self.ollama_rewarm_lead_seconds = config.get('ollama_rewarm_lead_seconds', 120)
+            # LLM 响应缓存目录（为空则关闭缓存）、有效期和容量上限
+            self.llm_cache_dir = config.get('llm_cache_dir', 'cache/llm')
+            self.llm_cache_ttl_hours = config.get('llm_cache_ttl_hours', 168)
+            self.llm_cache_max_size_mb = config.get('llm_cache_max_size_mb', 50)
+            # 进展内容超过单次提示的 token 预算时分段并行总结（map-reduce），以及并行总结的并发数
+            self.report_chunk_tokens = config.get('report_chunk_tokens', 6000)
+            self.report_map_workers = config.get('report_map_workers', 4)
+            # 每日简报存储（为空则不启用）：多天的报告由已保存的每日简报汇总生成，只有缺少简报的日期才总结原始数据
+            self.report_store_db = config.get('report_store_db', 'data/reports.db')
+            # 模型请求：每个后端的并发上限、单次请求超时（秒）和失败重试次数
+            self.llm_max_concurrency = config.get('llm_max_concurrency', {'openai': 8, 'ollama': 1})
+            self.llm_timeout_seconds = config.get('llm_timeout_seconds', 300)
+            self.llm_max_retries = config.get('llm_max_retries', 3)
             # dry_run模式，开启后绕过llm大模型的连接，直接输出prompt
             self.dry_run = config.get('dry_run',False)
+            # 录制/回放模式：record 时把 GitHub、HackerNews 的响应和模型输出写入 cassette_path，
+            # replay 时直接返回录制的内容，不访问网络也不调用模型；为空时不启用
+            self.cassette_mode = config.get('cassette_mode', '')
+            self.cassette_path = config.get('cassette_path', 'data/cassette.db')
+            if self.cassette_mode:
+                # 缓存命中时不会发出请求，录制会缺少这些响应，因此录制和回放时都关闭缓存
+                self.github_cache_dir = ''
+                self.llm_cache_dir = ''
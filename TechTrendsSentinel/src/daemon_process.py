@@ -1,14 +1,21 @@
-import schedule  # 导入 schedule 实现定时任务执行器
-import time  # 导入time库，用于控制时间间隔
+import argparse  # 导入argparse库，用于解析启动参数
+import time  # 导入time库，用于计算推迟时间
+from datetime import date
+from functools import partial
 import signal  # 导入signal库，用于信号处理
 import sys  # 导入sys库，用于执行系统相关的操作
 
 from config import Config  # 导入配置管理类
 from github_client import GitHubClient  # 导入GitHub客户端类，处理GitHub API请求
+from rate_limiter import PRIORITY_LOW, RateLimitDeferred  # 导入低优先级常量与速率限制推迟异常
+from pipeline import Pipeline, Stage  # 导入多阶段流水线
 from notifier import Notifier  # 导入通知器类，用于发送通知
 from report_generator import ReportGenerator  # 导入报告生成器类
 from llm import LLM  # 导入语言模型类，可能用于生成报告内容
-from src.hackernews_client import HackerNewsClient
+from hackernews_client import HackerNewsClient  # 导入HackerNews客户端类
+from scheduler import Scheduler  # 导入事件驱动的调度器
+from metrics import start_metrics_server  # 导入指标端点
+from profiler import Profiler  # 导入剖析器，用于 --profile 模式
 from subscription_manager import SubscriptionManager  # 导入订阅管理器类，管理GitHub仓库订阅
 from logger import LOG  # 导入日志记录器
 
@@ -19,61 +26,191 @@ def graceful_shutdown(signum, frame):
     sys.exit(0)  # 安全退出程序
 
 
-def github_job(subscription_manager, github_client, report_generator, notifier, days):
+def github_job(subscription_manager, github_client, report_generator, notifier, days, repos=None,
+               workers=None, queue_size=10, scheduler=None):
     LOG.info("[开始执行定时任务]")
-    subscriptions = subscription_manager.list_subscriptions()  # 获取当前所有订阅
-    LOG.info(f"订阅列表：{subscriptions}")
-    for repo in subscriptions:
-        # 遍历每个订阅的仓库，执行以下操作
-        markdown_file_path = github_client.export_progress_by_date_range(repo, days)
-        # 从Markdown文件自动生成进展简报
-        report, report_file_path = report_generator.generate_report_by_date_range(markdown_file_path, days)
-        subject = f"[Github Sentinel] {repo} 进展简报"
-        notifier.notify(subject, report)
+    if repos:
+        # 补跑被推迟的仓库，期间已取消的订阅不再处理
+        subscriptions = [subscription for subscription in map(subscription_manager.get_subscription, repos)
+                         if subscription]
+    else:
+        subscriptions = subscription_manager.due_subscriptions()  # 获取到期的订阅
+    LOG.info(f"本次处理 {len(subscriptions)} 个订阅：{[subscription.repo for subscription in subscriptions[:20]]}")
+    # 订阅中设置为低优先级的仓库，在配额不足时与 github_low_priority_repos 一样被推迟
+    github_client.rate_limiter.low_priority_repos.update(
+        subscription.repo for subscription in subscriptions if subscription.priority == PRIORITY_LOW)
+    workers = workers or {}
+    deferred = []
+    # 启用每日简报存储时按天汇总：拉取阶段只导出缺少简报的日期，总结阶段汇总各天的简报；
+    # 两个阶段使用同一个截止日期，任务跨过午夜时日期范围也保持一致
+    rollup = report_generator.report_store is not None
+    until = date.today()
+
+    def fetch(subscription):
+        # 拉取阶段：按订阅的报告周期导出仓库进展，低优先级仓库因速率限制被推迟时不进入后续阶段
+        repo, repo_days = subscription.repo, subscription.frequency_days or days
+        try:
+            if rollup:
+                missing = report_generator.missing_days(repo, repo_days, until)
+                return subscription, github_client.export_progress_by_day(repo, missing), repo_days
+            return subscription, github_client.export_progress_by_date_range(repo, repo_days), repo_days
+        except RateLimitDeferred as e:
+            LOG.warning(f"[{repo}]{str(e)}")
+            deferred.append(repo)
+            return None
+
+    def summarize(item):
+        # 总结阶段：从Markdown文件自动生成进展简报
+        subscription, exported, repo_days = item
+        if rollup:
+            report, report_file_path = report_generator.generate_rollup_report(subscription.repo, repo_days,
+                                                                               exported, until)
+        else:
+            report, report_file_path = report_generator.generate_report_by_date_range(exported, repo_days)
+        return subscription, report, repo_days
+
+    def notify(item):
+        # 通知阶段：发送邮件到订阅的收件人；报告已发送或已写入发件箱后才记录本次运行时间，
+        # 发送失败（包括摘要模式下 batch() 结束时摘要发送失败）的仓库下次任务仍会重新处理
+        subscription, report, repo_days = item
+        subject = f"[Github Sentinel] {subscription.repo} 进展简报"
+        # 同一仓库同一报告周期的报告只发送一次，任务重跑时发件箱会跳过已发送的报告
+        message_id = f"github:{subscription.repo}:{until.isoformat()}:{repo_days}"
+        notifier.notify(subject, report, subscription.recipients, message_id,
+                        on_delivered=partial(subscription_manager.mark_run, [subscription.repo]))
+
+    stages = [
+        Stage('summarize', summarize, workers.get('summarize', 2)),
+        Stage('notify', notify, workers.get('notify', 1)),
+    ]
+
+    def graphql_items():
+        # GraphQL 模式下按查询批次逐批导出，每批的结果立即进入总结阶段，获取下一批的同时总结上一批；
+        # 同一批中的仓库使用相同的报告周期
+        groups = {}
+        for subscription in subscriptions:
+            groups.setdefault(subscription.frequency_days or days, []).append(subscription)
+        batch_size = github_client.graphql.max_batch_size
+        for repo_days, group in groups.items():
+            for start in range(0, len(group), batch_size):
+                batch = group[start:start + batch_size]
+                if rollup:
+                    # 一次查询即可获取整批仓库缺少简报的日期，逐天导出
+                    exported, batch_deferred = github_client.export_progress_by_day_batch(
+                        {subscription.repo: report_generator.missing_days(subscription.repo, repo_days, until)
+                         for subscription in batch})
+                else:
+                    exported, batch_deferred = github_client.export_progress_batch(
+                        [subscription.repo for subscription in batch], repo_days)
+                deferred.extend(batch_deferred)
+                yield from ((subscription, exported[subscription.repo], repo_days)
+                            for subscription in batch if subscription.repo in exported)
+
+    if github_client.graphql:
+        items = graphql_items()
+    else:
+        # 拉取、总结、通知三个阶段流水线并行，一个慢仓库不会阻塞整个任务；
+        # 启用发件箱时通知阶段只写入发件箱，由后台发送线程投递，卡住的SMTP服务器也不会阻塞流水线
+        stages.insert(0, Stage('fetch', fetch, workers.get('fetch', github_client.max_concurrency)))
+        items = subscriptions
+    # 本次任务的所有邮件复用同一个SMTP连接；摘要模式下合并为一封邮件在结束时发送
+    with notifier.batch("[Github Sentinel] 订阅仓库进展简报汇总"):
+        Pipeline(stages, queue_size).run(items)
+
+    if deferred and scheduler:
+        schedule_deferred_github_job(scheduler, deferred, subscription_manager, github_client, report_generator,
+                                     notifier, days, workers, queue_size)
+    elif deferred:
+        LOG.warning(f"{len(deferred)} 个低优先级仓库因速率限制未执行：{deferred}")
+    github_client.log_cache_stats()  # 输出本次任务的缓存命中情况
+    report_generator.llm.log_cache_stats()
     LOG.info(f"[定时任务执行完毕]")
 
 
+def schedule_deferred_github_job(scheduler, repos, subscription_manager, github_client, report_generator, notifier,
+                                 days, workers=None, queue_size=10):
+    # 因速率限制被推迟的低优先级仓库，在下一个配额窗口开始后补跑一次
+    reset_at = github_client.rate_limiter.reset_at or time.time()
+    delay = max(1, int(reset_at - time.time()) + 1)
+    LOG.info(f"{len(repos)} 个低优先级仓库推迟到 {delay} 秒后执行：{repos}")
+
+    scheduler.once('github-deferred', partial(github_job, subscription_manager, github_client, report_generator,
+                                              notifier, days, repos, workers, queue_size, scheduler), delay)
+
+
 def hackernews_job(hackernews_client: HackerNewsClient, report_generator: ReportGenerator, notifier: Notifier):
     LOG.info("[开始执行HackerNews定时任务]")
     markdown_file_path = hackernews_client.export_hackernews_top_stories()
+    if markdown_file_path is None:
+        LOG.info("[HackerNews定时任务执行完毕]本次没有需要报告的新闻")
+        return
     report, report_file_path = report_generator.generate_hackernews_trends_report(markdown_file_path)
     subject = f"[HackerNews] 趋势简报"
-    notifier.notify(subject, report)
+    if notifier.notify(subject, report, message_id=f"hackernews:{markdown_file_path}"):
+        hackernews_client.mark_reported()  # 报告已交给通知器后才记录本次的新闻
+    report_generator.llm.log_cache_stats()
     LOG.info("[HackerNews定时任务执行完毕]")
 
-def main():
-    # 设置信号处理器
-    signal.signal(signal.SIGTERM, graceful_shutdown)
+def github_check_interval(config, subscription_manager):
+    # 检查到期订阅的间隔（秒）：优先使用 github_check_interval_hours，否则取最短的报告周期，
+    # 报告周期比全局周期短的订阅也能按时处理
+    if config.github_check_interval_hours:
+        return config.github_check_interval_hours * 3600
+    return subscription_manager.min_frequency_days() * 86400
 
-    config = Config()  # 创建配置实例
-    github_client = GitHubClient(config.github_token)  # 创建GitHub客户端实例
-    hackernews_client=HackerNewsClient()
-    notifier = Notifier(config.email)  # 创建通知器实例
-    llm = LLM()  # 创建语言模型实例
-    report_generator = ReportGenerator(llm)  # 创建报告生成器实例
-    subscription_manager = SubscriptionManager(config.subscriptions_file)  # 创建订阅管理器实例
+def rewarm_if_due(llm, job, run_at):
+    # 定时任务即将开始、而模型届时已被 Ollama 卸载时，提前重新预热
+    if not llm.is_warm(run_at):
+        LOG.info(f"[{job.name}]即将运行，提前预热模型")
+        llm.warm_up()
 
-    # 启动时立即执行（如不需要可注释）
-    github_job(subscription_manager, github_client, report_generator, notifier, config.freq_days)
-    hackernews_job(hackernews_client,report_generator,notifier,config.freq_days)
-
-    # 安排每天github sentinel的定时任务
-    schedule.every(config.freq_days).days.at(
-        config.exec_time
-    ).do(github_job, subscription_manager, github_client, report_generator, notifier, config.freq_days)
-
-    # 安排每天hackernews的定时任务
-    schedule.every(config.hackernews_freq_hours).hours.at(
-        config.exec_time
-    ).do(hackernews_job, hackernews_client, report_generator, notifier)
+def main():
+    parser = argparse.ArgumentParser(description='GitHub Sentinel daemon')
+    parser.add_argument('--profile', action='store_true', help='Profile every job run and log the hottest functions')
+    args = parser.parse_args()
 
+    # 设置信号处理器
+    signal.signal(signal.SIGTERM, graceful_shutdown)
 
+    config = Config.shared()  # 获取共享的配置实例
+    start_metrics_server(config.metrics_port, config.metrics_host)  # 暴露各阶段的耗时、错误与缓存命中指标
+    github_client = GitHubClient.from_config(config)  # 创建GitHub客户端实例
+    hackernews_client=HackerNewsClient.from_config(config)
+    notifier = Notifier.from_config(config)  # 创建通知器实例
+    notifier.start_sender(config.outbox_poll_seconds)  # 后台投递发件箱中待发送和待重试的邮件
+    llm = LLM(config)  # 创建语言模型实例
+    report_generator = ReportGenerator.from_config(llm, config)  # 创建报告生成器实例
+    subscription_manager = SubscriptionManager.from_config(config)  # 创建订阅管理器实例
+    llm.warm_up()  # 预热 Ollama 模型，避免第一个任务承担模型加载耗时
+
+    # 定时任务在后台线程中运行，主线程只休眠到下一个任务的运行时间；
+    # 首次启动或停机期间错过了运行时，按 scheduler_catch_up 策略立即补跑
+    profiler = Profiler.from_config(config) if args.profile else None
+    scheduler = Scheduler(config.scheduler_state_file, profiler=profiler)
+
+    # 安排github sentinel的定时任务：每次只处理到期的订阅，检查间隔不超过最短的订阅报告周期
+    scheduler.every(
+        'github',
+        partial(github_job, subscription_manager, github_client, report_generator, notifier, config.freq_days,
+                workers=config.pipeline_workers, queue_size=config.pipeline_queue_size, scheduler=scheduler),
+        github_check_interval(config, subscription_manager), at=config.exec_time,
+        jitter=config.scheduler_jitter_seconds, catch_up=config.scheduler_catch_up
+    )
+
+    # 安排每小时hackernews的定时任务
+    scheduler.every(
+        'hackernews',
+        partial(hackernews_job, hackernews_client, report_generator, notifier),
+        config.hackernews_freq_hours * 3600, at=config.exec_time,
+        jitter=config.scheduler_jitter_seconds, catch_up=config.scheduler_catch_up
+    )
+
+    if config.is_ollama:
+        scheduler.add_lead_hook(config.ollama_rewarm_lead_seconds, partial(rewarm_if_due, llm))
 
     try:
         # 在守护进程中持续运行
-        while True:
-            schedule.run_pending()
-            time.sleep(1)  # 短暂休眠以减少 CPU 使用
+        scheduler.run_forever()
     except Exception as e:
         LOG.error(f"主进程发生异常: {str(e)}")
         sys.exit(1)
@@ -0,0 +1,94 @@
+# src/disk_cache.py
+
+import hashlib  # 导入hashlib用于生成缓存文件名
+import json  # 导入json用于序列化缓存内容
+import os  # 导入os模块用于文件和目录操作
+import tempfile  # 导入tempfile用于原子写入
+import threading  # 导入threading保证多线程下的容量统计正确
+import time
+from logger import LOG  # 导入日志模块
+
+
+# 以JSON文件保存在磁盘上的键值缓存，按总大小做LRU淘汰，可选TTL过期
+class DiskCache:
+    def __init__(self, cache_dir, max_size_mb=100, ttl_seconds=None):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)  # 缓存目录允许占用的最大字节数
+        self.ttl_seconds = ttl_seconds  # 条目有效期（秒），None 表示永不过期
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._size = sum(size for _, size, _ in self._entries())  # 当前缓存总大小
+
+    def _path(self, key):
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f'{digest}.json')
+
+    def _entries(self):
+        # 返回 (路径, 大小, 最近访问时间) 列表
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def get(self, key):
+        # 读取缓存，不存在或已过期时返回 None；命中时刷新访问时间用于LRU
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if self.ttl_seconds is not None and time.time() - entry['stored_at'] > self.ttl_seconds:
+            self.delete(key)
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return entry['value']
+
+    def set(self, key, value):
+        # 先写入临时文件再原子替换，避免并发读到半个文件
+        data = json.dumps({'stored_at': time.time(), 'value': value}, ensure_ascii=False).encode('utf-8')
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        with self._lock:
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            self._size += len(data) - old_size
+            if self._size > self.max_size_bytes:
+                self._evict()
+
+    def delete(self, key):
+        path = self._path(key)
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                self._size -= size
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        # 按最近访问时间从旧到新删除，直到总大小降到上限的90%
+        target = self.max_size_bytes * 0.9
+        for path, size, _ in sorted(self._entries(), key=lambda entry: entry[2]):
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self._size -= size
+            self.evictions += 1
+        LOG.debug(f"缓存 {self.cache_dir} 淘汰后大小：{self._size} 字节，累计淘汰 {self.evictions} 条")
@@ -0,0 +1,92 @@
+# src/event_store.py
+
+import json  # 导入json用于保存原始条目
+import os  # 导入os模块用于创建数据目录
+import sqlite3  # 导入sqlite3作为本地事件存储
+from contextlib import closing
+from itertools import islice
+
+KINDS = ('commits', 'issues', 'pull_requests')  # 支持的事件类型
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    repo TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    id TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (repo, kind, id)
+);
+CREATE INDEX IF NOT EXISTS idx_events_updated ON events (repo, kind, updated_at);
+CREATE TABLE IF NOT EXISTS sync_cursors (
+    repo TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    synced_at TEXT NOT NULL,
+    PRIMARY KEY (repo, kind)
+);
+"""
+
+
+def event_key(kind, item):
+    # 提取条目的主键与更新时间：commit 以 sha 为键、以提交时间为准，其余以 id 和 updated_at 为准
+    if kind == 'commits':
+        return item['sha'], item['commit']['committer']['date']
+    return str(item['id']), item['updated_at']
+
+
+# 本地 GitHub 事件存储：按 (repo, kind, id) 保存条目，并记录每个仓库每类事件的同步游标
+class EventStore:
+    def __init__(self, db_path='data/github_events.db'):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')  # WAL 模式允许并发读写
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # 每次操作使用独立连接，便于在多个线程中并发同步
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def upsert_events(self, repo, kind, items, batch_size=100):
+        # 按批写入条目，已存在的条目以新数据覆盖；items 可以是生成器，内存中只保留一批
+        count = 0
+        items = iter(items)
+        with closing(self._connect()) as conn:
+            while True:
+                batch = list(islice(items, batch_size))
+                if not batch:
+                    break
+                rows = [(repo, kind, *event_key(kind, item), json.dumps(item, ensure_ascii=False)) for item in batch]
+                with conn:
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO events (repo, kind, id, updated_at, payload) VALUES (?, ?, ?, ?, ?)',
+                        rows
+                    )
+                count += len(rows)
+        return count
+
+    def iter_events(self, repo, kind, since=None, until=None):
+        # 按更新时间顺序读取 [since, until) 范围内的条目
+        query = 'SELECT payload FROM events WHERE repo = ? AND kind = ?'
+        params = [repo, kind]
+        if since:
+            query += ' AND updated_at >= ?'
+            params.append(since)
+        if until:
+            query += ' AND updated_at < ?'
+            params.append(until)
+        query += ' ORDER BY updated_at'
+        with closing(self._connect()) as conn:
+            for (payload,) in conn.execute(query, params):
+                yield json.loads(payload)
+
+    def get_cursor(self, repo, kind):
+        # 返回上次成功同步的时间（ISO 8601），从未同步过时返回 None
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT synced_at FROM sync_cursors WHERE repo = ? AND kind = ?', (repo, kind)).fetchone()
+        return row[0] if row else None
+
+    def set_cursor(self, repo, kind, synced_at):
+        with closing(self._connect()) as conn, conn:
+            conn.execute('INSERT OR REPLACE INTO sync_cursors (repo, kind, synced_at) VALUES (?, ?, ?)',
+                         (repo, kind, synced_at))
@@ -1,72 +1,319 @@
 # src/github_client.py
 
+import threading  # 导入threading库用于限制并发请求数
+from concurrent.futures import ThreadPoolExecutor  # 导入线程池用于并发获取
 import requests  # 导入requests库用于HTTP请求
-from datetime import datetime, date, timedelta  # 导入日期处理模块
+from datetime import datetime, date, timedelta, timezone  # 导入日期处理模块
 import os  # 导入os模块用于文件和目录操作
+import time
+from http_cache import HTTPCache  # 导入 ETag 条件请求缓存
+from rate_limiter import RateLimitScheduler, RateLimitDeferred  # 导入速率限制调度器
+from event_store import EventStore, KINDS  # 导入本地事件存储
+from github_graphql import GitHubGraphQLClient  # 导入 GraphQL 批量客户端
+from cassette import Cassette, mount_session  # 导入录制/回放存储
 from logger import LOG  # 导入日志模块
+from metrics import HTTP_REQUEST_SECONDS, ERRORS_TOTAL, RETRIES_TOTAL  # 导入请求耗时、错误与重试指标
+
+PER_PAGE = 100  # GitHub 列表接口单页允许的最大条目数
+
+
+def closed_on(item):
+    # 已关闭的问题与 PR 按关闭（合并）时间归入某一天，关闭之后的评论等更新不改变它的归属
+    return item.get('closed_at') or item.get('merged_at') or item['updated_at']
+
 
 class GitHubClient:
-    def __init__(self, token):
+    def __init__(self, token, max_concurrency=8, api_url='https://api.github.com', http_cache=None,
+                 rate_limiter=None, event_store=None, backend='rest', graphql_batch_size=50, graphql_max_cost=10,
+                 cassette=None):
         self.token = token  # GitHub API令牌
+        self.api_url = api_url.rstrip('/')  # GitHub API地址，便于指向本地桩服务测试
+        self.http_cache = http_cache  # 可选的 ETag 条件请求缓存（HTTPCache 实例）
+        # 所有请求共用的速率限制调度器，读取 X-RateLimit-* 响应头控制请求节奏
+        self.rate_limiter = rate_limiter or RateLimitScheduler()
+        self.event_store = event_store  # 可选的本地事件存储，启用后按游标增量同步
         self.headers = {'Authorization': f'token {self.token}'}  # 设置HTTP头部认证信息
+        self.max_concurrency = max(1, max_concurrency)  # 同时进行中的HTTP请求上限
+        self._request_slots = threading.BoundedSemaphore(self.max_concurrency)
+        # 所有请求共享一个带连接池的会话，复用TCP/TLS连接
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        mount_session(self.session, cassette, self.max_concurrency)  # cassette 不为空时录制或回放所有请求
+        # backend 为 graphql 时，批量接口用一次 GraphQL 查询获取一批仓库的更新
+        self.graphql = None
+        if backend == 'graphql':
+            self.graphql = GitHubGraphQLClient(self.session, f'{self.api_url}/graphql',
+                                               graphql_batch_size, graphql_max_cost)
+
+    @classmethod
+    def from_config(cls, config):
+        # 根据配置创建客户端，github_cache_dir 为空时不启用缓存
+        http_cache = None
+        if config.github_cache_dir:
+            http_cache = HTTPCache(config.github_cache_dir, config.github_cache_max_size_mb)
+        rate_limiter = RateLimitScheduler(
+            config.github_requests_per_second,
+            config.github_rate_limit_reserve,
+            config.github_low_priority_repos
+        )
+        event_store = EventStore(config.github_event_store) if config.github_event_store else None
+        return cls(config.github_token, config.github_max_concurrency, config.github_api_url, http_cache=http_cache,
+                   rate_limiter=rate_limiter, event_store=event_store, backend=config.github_backend,
+                   graphql_batch_size=config.github_graphql_batch_size,
+                   graphql_max_cost=config.github_graphql_max_cost, cassette=Cassette.from_config(config))
+
+    def _get(self, url, params=None, headers=None, repo=None):
+        # 所有GitHub请求的统一入口，通过信号量把并发数限制在 max_concurrency 以内
+        while True:
+            # 配额不足时：高优先级仓库等待窗口重置，低优先级仓库抛出 RateLimitDeferred
+            self.rate_limiter.acquire(repo)
+            with self._request_slots:
+                start = time.monotonic()
+                try:
+                    response = self.session.get(url, params=params, headers=headers, timeout=10)
+                except requests.exceptions.RequestException:
+                    ERRORS_TOTAL.inc(component='github')
+                    raise
+                HTTP_REQUEST_SECONDS.observe(time.monotonic() - start, service='github',
+                                             status=response.status_code)
+            self.rate_limiter.update(response.headers)
+            if response.status_code in (403, 429) and self.rate_limiter.is_exhausted():
+                RETRIES_TOTAL.inc(component='github_rate_limit')
+                continue  # 被限流的请求在下一个窗口重试，而不是返回空结果
+            if response.status_code >= 400:
+                ERRORS_TOTAL.inc(component='github')
+            return response
 
     def fetch_updates(self, repo, since=None, until=None):
-        # 获取指定仓库的更新，可以指定开始和结束日期
-        updates = {
-            'commits': self.fetch_commits(repo, since, until),  # 获取提交记录
-            'issues': self.fetch_issues(repo, since, until),  # 获取问题
-            'pull_requests': self.fetch_pull_requests(repo, since, until)  # 获取拉取请求
-        }
+        # 获取指定仓库的更新，可以指定开始和结束日期；三个接口并发请求
+        if self.graphql:
+            updates, failed = self._fetch_updates_graphql([repo], since, until)
+            if failed:
+                raise RuntimeError(f"GraphQL 获取 {repo} 的更新失败")
+            return updates[repo]
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            commits = executor.submit(self.fetch_commits, repo, since, until)  # 获取提交记录
+            issues = executor.submit(self.fetch_issues, repo, since, until)  # 获取问题
+            pull_requests = executor.submit(self.fetch_pull_requests, repo, since, until)  # 获取拉取请求
+            updates = {
+                'commits': commits.result(),
+                'issues': issues.result(),
+                'pull_requests': pull_requests.result()
+            }
         return updates
 
-    def fetch_commits(self, repo, since=None, until=None):
+    def fetch_updates_batch(self, repos, since=None, until=None):
+        # 并发获取多个仓库的更新，返回 ({repo: updates}, 因速率限制被推迟的仓库列表)
+        if self.graphql:
+            # GraphQL 获取失败的仓库不在结果中，与 REST 模式下单个仓库失败的处理一致
+            updates, _ = self._fetch_updates_graphql(repos, since, until)
+            return updates, []
+        return self._run_batch(lambda repo: self.fetch_updates(repo, since, until), repos)
+
+    def export_progress_batch(self, repos, days):
+        # 并发导出多个仓库的进展文件，返回 ({repo: file_path}, 被推迟的仓库列表)；单个仓库失败不影响其他仓库
+        if self.graphql:
+            # 获取失败的仓库不导出进展文件，调用方不会为它们生成报告，下次运行时重新获取
+            since = (date.today() - timedelta(days=days)).isoformat()
+            issues_by_repo = self._fetch_closed_issues_graphql(repos, since)
+            return self._run_batch(
+                lambda repo: self.export_progress_by_date_range(repo, days, issues_by_repo[repo]),
+                [repo for repo in repos if repo in issues_by_repo]
+            )
+        return self._run_batch(lambda repo: self.export_progress_by_date_range(repo, days), repos)
+
+    def export_progress_by_day_batch(self, days_by_repo):
+        # 逐天导出多个仓库的原始进展，days_by_repo 为 {repo: [日期]}，返回 ({repo: {日期: 文件路径}}, 被推迟的仓库列表)；
+        # GraphQL 模式下一次批量查询覆盖每个仓库最早的缺失日期，再按更新时间拆分到各天
+        if not self.graphql:
+            return self._run_batch(lambda repo: self.export_progress_by_day(repo, days_by_repo[repo]),
+                                   list(days_by_repo))
+        since = {repo: min(days).isoformat() for repo, days in days_by_repo.items() if days}
+        issues_by_repo = {repo: list(issues) for repo, issues in
+                          self._fetch_closed_issues_graphql(list(since), since).items()}
+
+        def export(repo):
+            files = {}
+            for day in days_by_repo[repo]:
+                start, end = day.isoformat(), (day + timedelta(days=1)).isoformat()
+                issues = [issue for issue in issues_by_repo[repo] if start <= closed_on(issue) < end]
+                files[day] = self.export_progress_by_date_range(repo, 1, issues, until=day + timedelta(days=1))
+            return files
+
+        # 没有缺失日期的仓库无需查询；获取失败的仓库不在结果中
+        return self._run_batch(export, [repo for repo, days in days_by_repo.items()
+                                        if not days or repo in issues_by_repo])
+
+    def _fetch_updates_graphql(self, repos, since=None, until=None):
+        # GraphQL 批量获取，返回 ({repo: updates}, 获取失败的仓库列表)；超过一页的连接用 REST 分页补全
+        updates, overflow, failed = self.graphql.fetch_updates_batch(repos, since, until)
+        for repo, kind in overflow:
+            repo_since = since.get(repo) if isinstance(since, dict) else since
+            LOG.debug(f"[{repo}]{kind} 超过一页，使用 REST 分页补全")
+            updates[repo][kind] = list(self._iterators()[kind](repo, since=repo_since, until=until))
+        return updates, failed
+
+    def _fetch_closed_issues_graphql(self, repos, since):
+        # 用 GraphQL 批量获取一批仓库自 since 起关闭的问题，返回 {repo: issues}；获取失败的仓库不在其中
+        # since 可以是统一的日期，也可以是 {repo: since}
+        today = date.today().isoformat()
+        if not self.event_store:
+            updates, _ = self._fetch_updates_graphql(repos, since, today)
+            return {repo: repo_updates['issues'] for repo, repo_updates in updates.items()}
+
+        # 有本地存储时按每个仓库的游标批量获取增量，再从存储读取整个日期范围
+        synced_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        starts = {repo: since.get(repo) if isinstance(since, dict) else since for repo in repos}
+        cursors = {}
+        for repo in repos:
+            repo_cursors = [self.event_store.get_cursor(repo, kind) for kind in KINDS]
+            cursors[repo] = max(min(repo_cursors), starts[repo]) if all(repo_cursors) else starts[repo]
+        # 失败的仓库不推进游标，下次从原游标重新获取
+        updates, _ = self._fetch_updates_graphql(repos, cursors)
+        for repo, repo_updates in updates.items():
+            for kind in KINDS:
+                self.event_store.upsert_events(repo, kind, repo_updates[kind])
+                self.event_store.set_cursor(repo, kind, synced_at)
+        return {repo: self.event_store.iter_events(repo, 'issues', since=starts[repo]) for repo in updates}
+
+    def _iterators(self):
+        return {
+            'commits': self.iter_commits,
+            'issues': self.iter_issues,
+            'pull_requests': self.iter_pull_requests
+        }
+
+    def _run_batch(self, func, repos):
+        results = {}
+        deferred = []
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures = {repo: executor.submit(func, repo) for repo in repos}
+            for repo, future in futures.items():
+                try:
+                    results[repo] = future.result()
+                except RateLimitDeferred as e:
+                    LOG.warning(f"[{repo}]{str(e)}")
+                    deferred.append(repo)
+                except Exception as e:
+                    LOG.error(f"[{repo}]并发任务执行失败：{str(e)}")
+        return results, deferred
+
+    def _get_page(self, url, params=None, repo=None):
+        # 请求一页数据，返回 (当前页条目, 下一页URL)；没有下一页时 URL 为 None
+        cached = self.http_cache.lookup(url, params) if self.http_cache else None
+        headers = HTTPCache.conditional_headers(cached)  # 有缓存时发送 If-None-Match/If-Modified-Since
+        response = self._get(url, params=params, headers=headers, repo=repo)
+        if cached and response.status_code == 304:
+            # 304 不计入速率限制，直接返回缓存的响应体
+            self.http_cache.record_hit()
+            return cached['body'], cached['next_url']
+        response.raise_for_status()  # 检查请求是否成功
+        next_url = response.links.get('next', {}).get('url')  # 解析 Link: rel="next"
+        body = response.json()
+        if self.http_cache:
+            self.http_cache.record_miss()
+            self.http_cache.save(url, params, response, body, next_url)
+        return body, next_url
+
+    def log_cache_stats(self):
+        if self.http_cache:
+            self.http_cache.log_stats()
+
+    def _paginate(self, url, params, repo, kind, strict=False):
+        # 逐页跟随 Link: rel="next" 获取数据，每获取一页就逐条产出，内存中最多只保留一页
+        # strict 为 True 时请求失败会抛出异常，便于调用方判断数据是否完整
+        params = dict(params, per_page=PER_PAGE)
+        while url:
+            try:
+                items, url = self._get_page(url, params, repo)
+            except RateLimitDeferred:
+                raise  # 推迟由调用方处理，不能当作空结果
+            except Exception as e:
+                LOG.error(f"从 {repo} 获取 {kind} 失败：{str(e)}")
+                response = getattr(e, 'response', None)
+                LOG.error(f"响应详情：{response.text if response is not None else '无响应数据可用'}")
+                if strict:
+                    raise
+                return
+            params = None  # 下一页URL中已包含全部查询参数
+            yield from items
+
+    def iter_commits(self, repo, since=None, until=None, strict=False):
         LOG.debug(f"准备获取 {repo} 的 Commits")
-        url = f'https://api.github.com/repos/{repo}/commits'  # 构建获取提交的API URL
+        url = f'{self.api_url}/repos/{repo}/commits'  # 构建获取提交的API URL
         params = {}
         if since:
             params['since'] = since  # 如果指定了开始日期，添加到参数中
         if until:
             params['until'] = until  # 如果指定了结束日期，添加到参数中
+        yield from self._paginate(url, params, repo, 'Commits', strict)
 
-        try:
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
-            response.raise_for_status()  # 检查请求是否成功
-            return response.json()  # 返回JSON格式的数据
-        except Exception as e:
-            LOG.error(f"从 {repo} 获取 Commits 失败：{str(e)}")
-            LOG.error(f"响应详情：{response.text if 'response' in locals() else '无响应数据可用'}")
-            return []  # Handle failure case
-
-    def fetch_issues(self, repo, since=None, until=None):
+    def iter_issues(self, repo, since=None, until=None, strict=False):
         LOG.debug(f"准备获取 {repo} 的 Issues。")
-        url = f'https://api.github.com/repos/{repo}/issues'  # 构建获取问题的API URL
+        url = f'{self.api_url}/repos/{repo}/issues'  # 构建获取问题的API URL
         params = {'state': 'closed', 'since': since, 'until': until}
-        try:
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            LOG.error(f"从 {repo} 获取 Issues 失败：{str(e)}")
-            LOG.error(f"响应详情：{response.text if 'response' in locals() else '无响应数据可用'}")
-            return []
+        yield from self._paginate(url, params, repo, 'Issues', strict)
 
-    def fetch_pull_requests(self, repo, since=None, until=None):
+    def iter_pull_requests(self, repo, since=None, until=None, strict=False):
         LOG.debug(f"准备获取 {repo} 的 Pull Requests。")
-        url = f'https://api.github.com/repos/{repo}/pulls'  # 构建获取拉取请求的API URL
-        params = {'state': 'closed', 'since': since, 'until': until}
-        try:
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
-            response.raise_for_status()  # 确保成功响应
-            return response.json()
-        except Exception as e:
-            LOG.error(f"从 {repo} 获取 Pull Requests 失败：{str(e)}")
-            LOG.error(f"响应详情：{response.text if 'response' in locals() else '无响应数据可用'}")
-            return []
+        url = f'{self.api_url}/repos/{repo}/pulls'  # 构建获取拉取请求的API URL
+        # pulls 接口不支持 since 参数，按更新时间倒序获取，遇到早于 since 的条目即停止翻页
+        params = {'state': 'closed', 'sort': 'updated', 'direction': 'desc'}
+        for pull_request in self._paginate(url, params, repo, 'Pull Requests', strict):
+            if since and pull_request.get('updated_at', '') < since:
+                return
+            yield pull_request
+
+    def fetch_commits(self, repo, since=None, until=None):
+        return list(self.iter_commits(repo, since, until))
+
+    def fetch_issues(self, repo, since=None, until=None):
+        return list(self.iter_issues(repo, since, until))
+
+    def fetch_pull_requests(self, repo, since=None, until=None):
+        return list(self.iter_pull_requests(repo, since, until))
+
+    def sync_repo(self, repo, days):
+        # 增量同步：只获取每类事件上次同步之后的变化写入本地存储，首次同步获取完整的 days 天窗口
+        window_start = (date.today() - timedelta(days=days)).isoformat()
+        # 以开始同步的时间作为新游标，同步期间产生的更新留到下次获取
+        synced_at = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        iterators = self._iterators()
+
+        def sync_kind(kind):
+            cursor = self.event_store.get_cursor(repo, kind)
+            since = max(cursor, window_start) if cursor else window_start
+            try:
+                count = self.event_store.upsert_events(repo, kind, iterators[kind](repo, since=since, strict=True))
+            except RateLimitDeferred:
+                raise
+            except Exception as e:
+                # 同步不完整时不推进游标，下次会重新获取这段时间
+                LOG.error(f"[{repo}]同步 {kind} 失败，保留原游标：{str(e)}")
+                return 0
+            self.event_store.set_cursor(repo, kind, synced_at)
+            return count
+
+        with ThreadPoolExecutor(max_workers=len(KINDS)) as executor:
+            counts = dict(zip(KINDS, executor.map(sync_kind, KINDS)))
+        LOG.info(f"[{repo}]增量同步完成，新增或更新条目：{counts}")
+        return counts
+
+    def _iter_closed_issues(self, repo, since, until, days, bounded=False):
+        # 有本地存储时先增量同步再从存储读取整个日期范围，否则直接从 API 边翻页边读取；
+        # bounded 为 True 时只返回在 [since, until) 内关闭的问题，用于导出某一天的进展
+        if self.event_store:
+            self.sync_repo(repo, days)
+            issues = self.event_store.iter_events(repo, 'issues', since=since)
+        else:
+            issues = self.iter_issues(repo, since=since, until=until)
+        if bounded:
+            return (issue for issue in issues if since <= closed_on(issue) < until)
+        return issues
 
     def export_daily_progress(self, repo):
         LOG.debug(f"[准备导出项目进度]：{repo}")
         today = datetime.now().date().isoformat()  # 获取今天的日期
-        updates = self.fetch_updates(repo, since=today)  # 获取今天的更新数据
         
         repo_dir = os.path.join('daily_progress', repo.replace("/", "_"))  # 构建存储路径
         os.makedirs(repo_dir, exist_ok=True)  # 确保目录存在
@@ -75,18 +322,18 @@ class GitHubClient:
         with open(file_path, 'w') as file:
             file.write(f"# Daily Progress for {repo} ({today})\n\n")
             file.write("\n## Issues Closed Today\n")
-            for issue in updates['issues']:  # 写入今天关闭的问题
+            for issue in self._iter_closed_issues(repo, today, None, 0):  # 边获取边写入今天关闭的问题
                 file.write(f"- {issue['title']} #{issue['number']}\n")
         
         LOG.info(f"[{repo}]项目每日进展文件生成： {file_path}")  # 记录日志
         return file_path
 
-    def export_progress_by_date_range(self, repo, days):
-        today = date.today()  # 获取当前日期
+    def export_progress_by_date_range(self, repo, days, issues=None, until=None):
+        # issues 为空时自行获取；批量导出时由调用方传入已批量获取的问题。
+        # until 为结束日期（不含），用于导出过去某一天的进展；默认截至当前时间
+        today = until or date.today()  # 获取当前日期
         since = today - timedelta(days=days)  # 计算开始日期
         
-        updates = self.fetch_updates(repo, since=since.isoformat(), until=today.isoformat())  # 获取指定日期范围内的更新
-        
         repo_dir = os.path.join('daily_progress', repo.replace("/", "_"))  # 构建目录路径
         os.makedirs(repo_dir, exist_ok=True)  # 确保目录存在
         
@@ -97,8 +344,16 @@ class GitHubClient:
         with open(file_path, 'w') as file:
             file.write(f"# Progress for {repo} ({since} to {today})\n\n")
             file.write(f"\n## Issues Closed in the Last {days} Days\n")
-            for issue in updates['issues']:  # 写入在指定日期内关闭的问题
+            # 边翻页边写入在指定日期内关闭的问题，内存占用与仓库活跃度无关
+            if issues is None:
+                issues = self._iter_closed_issues(repo, since.isoformat(), today.isoformat(),
+                                                  (date.today() - since).days, bounded=until is not None)
+            for issue in issues:
                 file.write(f"- {issue['title']} #{issue['number']}\n")
         
         LOG.info(f"[{repo}]项目最新进展文件生成： {file_path}")  # 记录日志
         return file_path
+
+    def export_progress_by_day(self, repo, days):
+        # 逐天导出原始进展，返回 {日期: 文件路径}；用于补齐每日简报存储中缺少的日期
+        return {day: self.export_progress_by_date_range(repo, 1, until=day + timedelta(days=1)) for day in days}
@@ -0,0 +1,228 @@
+# src/github_graphql.py
+
+import math
+import time
+import requests  # 导入requests库用于HTTP请求
+from logger import LOG  # 导入日志模块
+from rate_limiter import RateLimitScheduler  # GraphQL 与 REST 的配额独立计算
+from metrics import HTTP_REQUEST_SECONDS, ERRORS_TOTAL, RETRIES_TOTAL  # 导入请求耗时、错误与重试指标
+
+PAGE_SIZE = 100  # 每个连接单次查询返回的最大条目数
+CONNECTIONS_PER_REPO = 3  # 每个仓库查询 issues、pullRequests、commit history 三个连接
+MAX_NODE_LIMIT = 500000  # GitHub 单次查询允许的最大节点数
+
+REPO_FRAGMENT = """
+  {alias}: repository(owner: ${alias}_owner, name: ${alias}_name) {{
+    issues(first: {page_size}, states: CLOSED, filterBy: {{since: ${alias}_since}},
+           orderBy: {{field: UPDATED_AT, direction: DESC}}) {{
+      pageInfo {{ hasNextPage }}
+      nodes {{ databaseId number title url state closedAt updatedAt }}
+    }}
+    pullRequests(first: {page_size}, states: [CLOSED, MERGED], orderBy: {{field: UPDATED_AT, direction: DESC}}) {{
+      pageInfo {{ hasNextPage }}
+      nodes {{ databaseId number title url state closedAt mergedAt updatedAt }}
+    }}
+    defaultBranchRef {{
+      target {{
+        ... on Commit {{
+          history(first: {page_size}, since: ${alias}_git_since, until: $until) {{
+            pageInfo {{ hasNextPage }}
+            nodes {{ oid url messageHeadline committedDate author {{ name }} }}
+          }}
+        }}
+      }}
+    }}
+  }}"""
+
+
+class GraphQLBatchTooLarge(Exception):
+    # 查询超出 GitHub 的节点/复杂度限制或超时，需要拆分批次
+    pass
+
+
+def estimate_cost(repo_count):
+    # 按 GitHub 的计算方式估算查询消耗的点数：所需请求数之和除以 100，最少 1 点
+    requests_needed = repo_count * CONNECTIONS_PER_REPO
+    return max(1, math.ceil(requests_needed / 100))
+
+
+def _to_timestamp(value):
+    # GraphQL 的 DateTime/GitTimestamp 需要完整的 ISO 8601 时间，REST 风格的日期补齐为当天零点
+    if value and len(value) == 10:
+        return f'{value}T00:00:00Z'
+    return value
+
+
+def estimate_nodes(repo_count):
+    return repo_count * CONNECTIONS_PER_REPO * PAGE_SIZE
+
+
+# 把 GraphQL 节点转换成与 REST 接口一致的字段，下游导出和本地存储无需区分来源
+def _issue_from_node(node):
+    return {
+        'id': node['databaseId'],
+        'number': node['number'],
+        'title': node['title'],
+        'html_url': node['url'],
+        'state': node['state'].lower(),
+        'closed_at': node['closedAt'],
+        'updated_at': node['updatedAt'],
+    }
+
+
+def _pull_request_from_node(node):
+    pull_request = _issue_from_node(node)
+    pull_request['merged_at'] = node['mergedAt']
+    return pull_request
+
+
+def _commit_from_node(node):
+    return {
+        'sha': node['oid'],
+        'html_url': node['url'],
+        'commit': {
+            'message': node['messageHeadline'],
+            'author': {'name': (node.get('author') or {}).get('name')},
+            'committer': {'date': node['committedDate']},
+        },
+    }
+
+
+# GitHub GraphQL 批量客户端：一次查询获取一批仓库的 issues、PR 和最近提交
+class GitHubGraphQLClient:
+    def __init__(self, session, api_url='https://api.github.com/graphql', max_batch_size=50, max_batch_cost=10,
+                 rate_limiter=None):
+        self.session = session  # 复用 GitHubClient 的连接池与认证头
+        self.api_url = api_url
+        self.max_batch_size = max(1, max_batch_size)  # 单个查询包含的最大仓库数
+        self.max_batch_cost = max_batch_cost  # 单个查询允许的最大估算点数
+        self.rate_limiter = rate_limiter or RateLimitScheduler()
+        self.total_cost = 0  # 累计实际消耗的点数
+        self.queries = 0  # 累计发送的查询次数
+
+    def fetch_updates_batch(self, repos, since=None, until=None):
+        # 返回 ({repo: updates}, [(repo, kind)], [repo])；第二项是超过一页、需要用 REST 补全的连接，
+        # 第三项是获取失败的仓库，它们不在第一项中，调用方不能把它们当作没有更新
+        # since 可以是统一的日期，也可以是 {repo: since} 以便每个仓库使用自己的同步游标
+        updates = {}
+        overflow = []
+        failed = []
+        for batch in self._plan_batches(list(repos)):
+            self._fetch_batch(batch, since, until, updates, overflow, failed)
+        LOG.info(f"GraphQL 批量获取完成：{len(repos)} 个仓库，{self.queries} 次查询，累计消耗 {self.total_cost} 点")
+        if failed:
+            LOG.warning(f"GraphQL 获取失败的仓库：{failed}")
+        return updates, overflow, failed
+
+    def _plan_batches(self, repos):
+        # 按仓库数、估算点数和节点上限预先切分批次
+        size = self.max_batch_size
+        while size > 1 and (estimate_cost(size) > self.max_batch_cost or estimate_nodes(size) > MAX_NODE_LIMIT):
+            size //= 2
+        return [repos[i:i + size] for i in range(0, len(repos), size)]
+
+    def _fetch_batch(self, repos, since, until, updates, overflow, failed):
+        try:
+            data = self._query(repos, since, until)
+        except GraphQLBatchTooLarge as e:
+            if len(repos) == 1:
+                ERRORS_TOTAL.inc(component='github_graphql')
+                LOG.error(f"[{repos[0]}]GraphQL 查询失败：{str(e)}")
+                failed.append(repos[0])
+                return
+            # 批次过大时对半拆分后分别重试
+            RETRIES_TOTAL.inc(component='github_graphql')
+            middle = len(repos) // 2
+            LOG.warning(f"GraphQL 批次过大（{len(repos)} 个仓库），拆分为 {middle} + {len(repos) - middle} 重试")
+            self._fetch_batch(repos[:middle], since, until, updates, overflow, failed)
+            self._fetch_batch(repos[middle:], since, until, updates, overflow, failed)
+            return
+        except requests.exceptions.RequestException as e:
+            # 认证失败、服务端错误或连接中断：只把这一批仓库记为失败，不影响其他批次
+            ERRORS_TOTAL.inc(component='github_graphql')
+            LOG.error(f"GraphQL 查询失败（{len(repos)} 个仓库）：{str(e)}")
+            failed.extend(repos)
+            return
+
+        for index, repo in enumerate(repos):
+            node = data.get(f'r{index}')
+            if node is None:
+                LOG.error(f"[{repo}]GraphQL 未返回仓库数据（仓库不存在或无权限）")
+                failed.append(repo)
+                continue
+            repo_since = since.get(repo) if isinstance(since, dict) else since
+            updates[repo] = self._parse_repo(repo, node, repo_since, overflow)
+
+    def _parse_repo(self, repo, node, since, overflow):
+        history = ((node.get('defaultBranchRef') or {}).get('target') or {}).get('history') or {'nodes': []}
+        connections = {
+            'issues': (node['issues'], _issue_from_node),
+            'pull_requests': (node['pullRequests'], _pull_request_from_node),
+            'commits': (history, _commit_from_node),
+        }
+        updates = {}
+        for kind, (connection, convert) in connections.items():
+            items = [convert(item) for item in connection['nodes']]
+            has_next_page = connection.get('pageInfo', {}).get('hasNextPage', False)
+            if kind == 'pull_requests' and since:
+                # pullRequests 连接没有 since 过滤，按更新时间倒序截断；截断后说明已覆盖整个范围
+                recent = [item for item in items if item['updated_at'] >= since]
+                has_next_page = has_next_page and len(recent) == len(items)
+                items = recent
+            if has_next_page:
+                overflow.append((repo, kind))
+            updates[kind] = items
+        return updates
+
+    def build_query(self, repos, since, until):
+        # 每个仓库使用一个别名 r{i}，仓库名与 since 通过变量传入，避免拼接注入
+        declarations = ['$until: GitTimestamp']
+        variables = {'until': _to_timestamp(until)}
+        fragments = []
+        for index, repo in enumerate(repos):
+            alias = f'r{index}'
+            owner, name = repo.split('/', 1)
+            declarations += [f'${alias}_owner: String!', f'${alias}_name: String!',
+                             f'${alias}_since: DateTime', f'${alias}_git_since: GitTimestamp']
+            repo_since = _to_timestamp(since.get(repo) if isinstance(since, dict) else since)
+            variables[f'{alias}_owner'] = owner
+            variables[f'{alias}_name'] = name
+            variables[f'{alias}_since'] = repo_since
+            variables[f'{alias}_git_since'] = repo_since
+            fragments.append(REPO_FRAGMENT.format(alias=alias, page_size=PAGE_SIZE))
+        query = (f"query({', '.join(declarations)}) {{\n"
+                 f"  rateLimit {{ cost remaining resetAt }}"
+                 + ''.join(fragments) + "\n}")
+        return query, variables
+
+    def _query(self, repos, since, until):
+        query, variables = self.build_query(repos, since, until)
+        LOG.debug(f"发送 GraphQL 查询：{len(repos)} 个仓库，估算消耗 {estimate_cost(len(repos))} 点")
+        self.rate_limiter.acquire()
+        start = time.monotonic()
+        try:
+            response = self.session.post(self.api_url, json={'query': query, 'variables': variables}, timeout=30)
+        except requests.exceptions.Timeout as e:
+            HTTP_REQUEST_SECONDS.observe(time.monotonic() - start, service='github_graphql', status='timeout')
+            raise GraphQLBatchTooLarge(f"查询超时：{str(e)}")
+        except requests.exceptions.RequestException:
+            HTTP_REQUEST_SECONDS.observe(time.monotonic() - start, service='github_graphql', status='error')
+            raise
+        HTTP_REQUEST_SECONDS.observe(time.monotonic() - start, service='github_graphql', status=response.status_code)
+        self.rate_limiter.update(response.headers)
+        self.queries += 1
+        if response.status_code in (502, 504):
+            # GitHub 在查询过于复杂、无法在时限内完成时返回 502/504
+            raise GraphQLBatchTooLarge(f"HTTP {response.status_code}")
+        response.raise_for_status()
+        result = response.json()
+        errors = result.get('errors') or []
+        if any(error.get('type') in ('MAX_NODE_LIMIT_EXCEEDED', 'RESOURCE_LIMITS_EXCEEDED') for error in errors):
+            raise GraphQLBatchTooLarge(errors[0].get('message', ''))
+        for error in errors:
+            LOG.warning(f"GraphQL 查询返回错误：{error.get('message')}")
+        data = result.get('data') or {}
+        rate_limit = data.get('rateLimit') or {}
+        self.total_cost += rate_limit.get('cost', 0)
+        LOG.debug(f"GraphQL 查询消耗 {rate_limit.get('cost')} 点，剩余 {rate_limit.get('remaining')} 点")
+        return data
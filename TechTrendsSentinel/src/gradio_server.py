@@ -1,32 +1,28 @@
 import gradio as gr  # 导入gradio库用于创建GUI
 
-from config import Config  # 导入配置管理模块
-from github_client import GitHubClient  # 导入用于GitHub API操作的客户端
-from report_generator import ReportGenerator  # 导入报告生成器模块
-from llm import LLM  # 导入可能用于处理语言模型的LLM类
-from src.hackernews_client import HackerNewsClient
-from subscription_manager import SubscriptionManager  # 导入订阅管理器
+from services import Services  # 按需创建GitHub客户端、语言模型、报告生成器和HackerNews客户端
 from logger import LOG  # 导入日志记录器
+from metrics import start_metrics_server  # 导入指标端点
 
-# 创建各个组件的实例
-config = Config()
-github_client = GitHubClient(config.github_token)
-llm = LLM()
-report_generator = ReportGenerator(llm)
-subscription_manager = SubscriptionManager(config.subscriptions_file)
-hackernewsClient=HackerNewsClient()
+# 各个组件在第一次生成报告时才创建，启动界面只需要读取订阅列表
+services = Services()
 
 def export_progress_by_date_range(repo, days):
     # 定义一个函数，用于导出和生成指定时间范围内项目的进展报告
+    github_client, report_generator = services.github_client, services.report_generator
+    if report_generator.report_store:
+        # 复用已保存的每日简报，只导出和总结缺少简报的日期
+        day_files = github_client.export_progress_by_day(repo, report_generator.missing_days(repo, days))
+        yield from report_generator.stream_rollup_report(repo, days, day_files)
+        return
     raw_file_path = github_client.export_progress_by_date_range(repo, days)  # 导出原始数据文件路径
-    report, report_file_path = report_generator.generate_report_by_date_range(raw_file_path, days)  # 生成并获取报告内容及文件路径
-
-    return report, report_file_path  # 返回报告内容和报告文件路径
+    # 流式生成报告，随模型输出逐步刷新页面，生成结束后再提供报告文件下载
+    yield from report_generator.stream_report_by_date_range(raw_file_path, days)
 
 def export_hackernews_trends():
-    raw_file_path=hackernewsClient.export_hackernews_top_stories()
-    report, report_file_path = report_generator.generate_hackernews_trends_report(raw_file_path)
-    return report, report_file_path  # 返回报告内容和报告文件路径
+    # 页面上手动生成时导出完整列表，不影响定时任务的增量判断
+    raw_file_path = services.hackernews_client.export_hackernews_top_stories(incremental=False)
+    yield from services.report_generator.stream_hackernews_trends_report(raw_file_path)
 
 # 创建Gradio界面
 # demo = gr.Interface(
@@ -48,7 +44,7 @@ with gr.Blocks() as demo:
     with gr.Tab("GitHub 项目进展"):
         gr.Markdown("### 选择GitHub项目和报告周期")  # 说明
         repo_dropdown = gr.Dropdown(
-            subscription_manager.list_subscriptions(), label="订阅列表", info="已订阅GitHub项目"
+            services.subscription_manager.list_subscriptions(), label="订阅列表", info="已订阅GitHub项目"
         )  # 下拉菜单选择订阅的GitHub项目
         days_slider = gr.Slider(value=2, minimum=1, maximum=7, step=1, label="报告周期", info="生成项目过去一段时间进展，单位：天")
         progress_report_output = gr.Markdown()  # 用于显示报告内容
@@ -76,6 +72,7 @@ with gr.Blocks() as demo:
         )
 
 if __name__ == "__main__":
+    start_metrics_server(services.config.gradio_metrics_port, services.config.metrics_host)  # 暴露报告生成与外部请求的指标
     demo.launch(share=True, server_name="127.0.0.1", server_port=7860)  # 启动界面并设置为公共可访问
     # 可选带有用户认证的启动方式
     # demo.launch(share=True, server_name="0.0.0.0", auth=("django", "1234"))
\ No newline at end of file
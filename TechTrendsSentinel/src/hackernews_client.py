@@ -1,42 +1,112 @@
 import os
+from concurrent.futures import ThreadPoolExecutor  # 导入线程池用于并发抓取页面和评论
 
 import requests
-from bs4 import BeautifulSoup
 from logger import LOG
-from datetime import datetime, date, timedelta  # 导入日期处理模块
-from time import sleep
+from cassette import Cassette, mount_session  # 导入录制/回放存储
+from hackernews_parser import get_parser, parse_comments  # 导入可插拔的 HackerNews 页面解析器
+from rate_limiter import TokenBucket  # 复用令牌桶限制对 HackerNews 的请求速率
+from metrics import HTTP_REQUEST_SECONDS, ERRORS_TOTAL  # 导入请求耗时与错误指标
+from story_index import StoryIndex, classify  # 导入已见新闻索引
+from datetime import datetime  # 导入日期处理模块
+from time import monotonic, time
 
 class HackerNewsClient:
-    def __init__(self):
-        pass
-    def fetch_top_stories(self):
-        url = "https://news.ycombinator.com/news"
-
+    def __init__(self, parser='auto', story_index=None, rising_points_per_hour=50,
+                 base_url='https://news.ycombinator.com', pages=1, extra_feeds=None, max_concurrency=4,
+                 timeout=10, top_comments=0, requests_per_second=2, cassette=None):
+        # 解析后端：'auto' 时优先使用已安装的最快后端（lxml），否则使用标准库流式解析
+        self.parser_name, self.parse = get_parser(parser)
+        LOG.debug(f"HackerNews 页面解析后端：{self.parser_name}")
+        self.story_index = story_index  # 已见新闻索引，为 None 时每次导出完整列表
+        self.rising_points_per_hour = rising_points_per_hour  # 每小时增加的分数达到该值视为热度快速上升
+        self.base_url = base_url.rstrip('/')  # 站点地址，便于指向本地桩服务测试
+        self.pages = max(1, pages)  # 抓取 /news 的前几页
+        self.extra_feeds = list(extra_feeds or [])  # 额外抓取第一页的列表，例如 newest、show
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout  # 单个请求的超时时间（秒）
+        self.top_comments = top_comments  # 每条新闻抽样的顶层评论数，0 表示不抓取评论
+        self.bucket = TokenBucket(requests_per_second, max(1, requests_per_second))
+        self._pending = None  # 最近一次增量导出、尚未确认报告的 (新闻列表, 抓取时间)
+        # 所有请求共享一个带连接池的会话，复用TCP/TLS连接
+        self.session = requests.Session()
+        mount_session(self.session, cassette, self.max_concurrency)  # cassette 不为空时录制或回放所有请求
+
+    @classmethod
+    def from_config(cls, config):
+        # 根据配置创建客户端，hackernews_story_index 为空时不启用已见新闻索引
+        story_index = StoryIndex(config.hackernews_story_index) if config.hackernews_story_index else None
+        return cls(config.hackernews_parser, story_index, config.hackernews_rising_points_per_hour,
+                   base_url=config.hackernews_base_url, pages=config.hackernews_pages, extra_feeds=config.hackernews_extra_feeds,
+                   max_concurrency=config.hackernews_max_concurrency, timeout=config.hackernews_timeout_seconds,
+                   top_comments=config.hackernews_top_comments,
+                   requests_per_second=config.hackernews_requests_per_second, cassette=Cassette.from_config(config))
+
+    def _get(self, path, params=None):
+        self.bucket.acquire()
+        start = monotonic()
         try:
-            # 发送请求并获取页面内容
-            response = requests.get(url)
-            response.raise_for_status()  # 如果请求失败，抛出异常
-
-            LOG.info("Successfully fetched top stories page.")
+            response = self.session.get(f'{self.base_url}/{path}', params=params, timeout=self.timeout)
+        except requests.exceptions.RequestException:
+            ERRORS_TOTAL.inc(component='hackernews')
+            raise
+        HTTP_REQUEST_SECONDS.observe(monotonic() - start, service='hackernews', status=response.status_code)
+        if response.status_code >= 400:
+            ERRORS_TOTAL.inc(component='hackernews')
+        response.raise_for_status()  # 如果请求失败，抛出异常
+        return response.text
+
+    def _fetch_page(self, feed, page):
+        # 抓取并解析一个列表页，请求失败时返回 None，不影响其他页面
+        try:
+            stories = self.parse(self._get(feed, {'p': page} if page > 1 else None))
+        except requests.exceptions.RequestException as e:
+            LOG.error(f"Error fetching {feed} page {page}: {e}")
+            return None
+        LOG.debug(f"Fetched {len(stories)} stories from {feed} page {page}.")
+        return stories
 
-            # 解析页面
-            soup = BeautifulSoup(response.text, 'html.parser')
+    def fetch_top_stories(self):
+        # 并发抓取 /news 的前 pages 页以及额外列表的第一页，合并去重后返回结构化的 Story 列表
+        # （id、标题、链接、分数、评论数、发布时间等）；全部页面都失败时返回 None
+        pages = [('news', page) for page in range(1, self.pages + 1)]
+        pages += [(feed, 1) for feed in self.extra_feeds]
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(pages))) as executor:
+                results = list(executor.map(lambda args: self._fetch_page(*args), pages))
+        except Exception as e:
+            LOG.error(f"An unexpected error occurred: {e}")
+            return None
+        if all(result is None for result in results):
+            return None
 
-            # 获取Top Stories
-            stories = soup.find_all('tr', class_='athing submission')
+        # 按页面顺序合并，同一条新闻出现在多个列表中时保留第一次出现的位置
+        top_stories = []
+        seen = set()
+        for stories in results:
+            for story in stories or []:
+                if story.id not in seen:
+                    seen.add(story.id)
+                    top_stories.append(story)
 
-            top_stories = [story.get_text() for story in stories]
+        LOG.info(f"Fetched {len(top_stories)} top stories from {len(pages)} pages.")
+        return top_stories
 
-            LOG.info(f"Fetched {len(top_stories)} top stories.")
+    def fetch_comments(self, stories):
+        # 在速率限制下并发抓取每条新闻讨论页中排名最前的 top_comments 条顶层评论
+        stories = [story for story in stories if story.comments]
+        if self.top_comments <= 0 or not stories:
+            return
 
-            return top_stories
+        def fetch(story):
+            try:
+                story.top_comments = parse_comments(self._get('item', {'id': story.id}), self.top_comments)
+            except requests.exceptions.RequestException as e:
+                LOG.error(f"Error fetching comments of story {story.id}: {e}")
 
-        except requests.exceptions.RequestException as e:
-            LOG.error(f"Error fetching the page: {e}")
-            return None
-        except Exception as e:
-            LOG.error(f"An unexpected error occurred: {e}")
-            return None
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            list(executor.map(fetch, stories))
+        LOG.info(f"Fetched top comments of {len(stories)} stories.")
 
 
     def save_to_markdown(self,top_stories):
@@ -55,18 +125,80 @@ class HackerNewsClient:
             # 写入文件头，包含日期
             file.write(f"# Hacker News Top Stories - {today_date}\n\n")
 
-            # 写入每个标题
-            for idx, title in enumerate(top_stories, 1):
-                file.write(f"{title}\n\n")
+            # 写入每条新闻的排名、标题、链接与热度
+            for story in top_stories:
+                self._write_story(file, story)
 
         print(f"Markdown file saved at: {file_path}")
         return file_path
 
+    def save_incremental_markdown(self, new, rising, trending):
+        # 只详细列出新上榜和热度快速上升的新闻，其余持续在榜的新闻只保留标题和分数，缩短提示词
+        today_date = datetime.now().strftime('%Y-%m-%d-%H-%M')
+        folder_path = 'hackernews_trends'
+        os.makedirs(folder_path, exist_ok=True)
+        file_path = os.path.join(folder_path, f"top_stories_{today_date}.md")
+
+        with open(file_path, 'w', encoding='utf-8') as file:
+            file.write(f"# Hacker News Top Stories - {today_date}\n\n")
+            if new:
+                file.write("## 新上榜\n\n")
+                for story in new:
+                    self._write_story(file, story)
+            if rising:
+                file.write("## 热度快速上升\n\n")
+                for story, gained in rising:
+                    self._write_story(file, story, f" | 上次抓取以来 +{gained} points")
+            if trending:
+                file.write("## 持续在榜（上次报告已包含）\n\n")
+                for story in trending:
+                    file.write(f"- {story.title} ({story.score} points)\n")
+                file.write("\n")
+
+        LOG.info(f"HackerNews 增量列表已保存到 {file_path}")
+        return file_path
 
-    def export_hackernews_top_stories(self):
+    @staticmethod
+    def _write_story(file, story, extra=''):
+        file.write(f"{story.rank}. [{story.title}]({story.url})\n")
+        file.write(f"   - {story.score} points | {story.comments} comments | {story.age}"
+                   f"{extra} | [讨论]({story.discussion_url})\n")
+        for comment in story.top_comments:
+            # 评论只保留开头部分，控制提示词长度
+            comment = ' '.join(comment.split())
+            file.write(f"   > {comment[:300]}{'…' if len(comment) > 300 else ''}\n")
+        file.write("\n")
+
+    def export_hackernews_top_stories(self, incremental=True):
+        # incremental 为 True 且启用了已见新闻索引时，只导出相对上次抓取的变化；
+        # 没有新上榜或热度快速上升的新闻时返回 None，调用方可以跳过本次报告
         top_stories = self.fetch_top_stories()
-        file_path=self.save_to_markdown(top_stories)
-        return file_path
+        if not top_stories:
+            return None
+        if not (incremental and self.story_index):
+            self.fetch_comments(top_stories)
+            return self.save_to_markdown(top_stories)
+
+        # 这里只读取索引，不写入：报告生成并交给通知器之后，调用方再调用 mark_reported() 记录本次的新闻，
+        # 生成或发送失败时这些新闻在下次运行时仍然算作新上榜
+        now = time()
+        previous = self.story_index.lookup(top_stories)
+        new, rising, trending = classify(top_stories, previous, self.rising_points_per_hour, now)
+        self._pending = (top_stories, now)
+        LOG.info(f"HackerNews 新上榜 {len(new)} 条，热度快速上升 {len(rising)} 条，持续在榜 {len(trending)} 条")
+        if not new and not rising:
+            LOG.info("没有新上榜或热度快速上升的新闻，跳过本次报告")
+            return None
+        # 只为需要详细列出的新闻抓取评论
+        self.fetch_comments(new + [story for story, gained in rising])
+        return self.save_incremental_markdown(new, rising, trending)
+
+    def mark_reported(self):
+        # 把最近一次增量导出的新闻记入索引，"上次报告已包含" 只包含确实已经报告过的新闻
+        pending, self._pending = self._pending, None
+        if pending and self.story_index:
+            self.story_index.record(*pending)
+            self.story_index.prune()
 
 
 
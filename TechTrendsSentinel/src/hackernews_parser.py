@@ -0,0 +1,266 @@
+# src/hackernews_parser.py
+
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser  # 标准库的事件驱动解析器，不构建文档树
+from typing import List, Optional
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html  # 可选依赖：基于 libxml2 的 C 实现，安装后自动优先使用
+except ImportError:
+    lxml = None
+
+BASE_URL = 'https://news.ycombinator.com/'
+NUMBER_RE = re.compile(r'\d+')
+
+
+@dataclass
+class Story:
+    id: int
+    rank: int
+    title: str
+    url: str
+    site: Optional[str] = None  # 外链的域名，Ask HN 等站内帖子为 None
+    score: int = 0  # 招聘帖没有分数
+    comments: int = 0
+    by: Optional[str] = None
+    age: str = ''  # 页面上显示的相对时间，例如 "3 hours ago"
+    posted_at: Optional[str] = None  # 发布时间（UTC，ISO 8601）
+    top_comments: List[str] = field(default_factory=list)  # 抽样的顶层评论，默认不抓取
+
+    @property
+    def discussion_url(self):
+        return f'{BASE_URL}item?id={self.id}'
+
+
+def _number(text):
+    match = NUMBER_RE.search(text or '')
+    return int(match.group()) if match else 0
+
+
+def _make_story(story_id, rank, title, href, site, score, comments, by, age, age_title):
+    # 各解析后端只负责提取原始文本，由这里统一转换为 Story
+    return Story(
+        id=int(story_id),
+        rank=_number(rank),
+        title=(title or '').strip(),
+        url=urljoin(BASE_URL, href or ''),
+        site=site or None,
+        score=_number(score),
+        # 评论链接的文本为 "45 comments" 或 "discuss"（没有评论）
+        comments=_number(next((text for text in comments if 'comment' in text), '')),
+        by=by or None,
+        age=(age or '').strip(),
+        posted_at=age_title.split()[0] if age_title else None,
+    )
+
+
+# 基于标准库 HTMLParser 的流式解析：只在遇到关心的标签时记录文本，比 BeautifulSoup 建树快得多
+class _StoryStreamParser(HTMLParser):
+    # 需要捕获文本的 span 的 class -> 字段名
+    SPAN_FIELDS = {'rank': 'rank', 'sitestr': 'site', 'score': 'score'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stories = []
+        self.current = None
+        self.capture = None  # (字段名, 结束标签)
+        self.buffer = []
+        self.in_titleline = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+        if tag == 'tr' and 'athing' in classes:
+            self._finish_story()
+            self.current = {'id': attrs.get('id'), 'comments': []}
+            return
+        if self.current is None or self.capture:
+            return
+        if tag == 'span':
+            if 'titleline' in classes:
+                self.in_titleline = True
+            elif 'age' in classes:
+                self.current['age_title'] = attrs.get('title')
+                self._start_capture('age', 'span')
+            elif classes and classes[0] in self.SPAN_FIELDS:
+                self._start_capture(self.SPAN_FIELDS[classes[0]], 'span')
+        elif tag == 'a':
+            href = attrs.get('href') or ''
+            if self.in_titleline:
+                self.in_titleline = False  # 只取 titleline 中的第一个链接
+                self.current['href'] = href
+                self._start_capture('title', 'a')
+            elif 'hnuser' in classes:
+                self._start_capture('by', 'a')
+            elif href.startswith('item?id='):
+                self._start_capture('comments', 'a')
+
+    def handle_data(self, data):
+        if self.capture:
+            self.buffer.append(data)
+
+    def handle_endtag(self, tag):
+        if self.capture and tag == self.capture[1]:
+            field, text = self.capture[0], ''.join(self.buffer)
+            if field == 'comments':
+                self.current['comments'].append(text)
+            else:
+                self.current[field] = text
+            self.capture = None
+        elif tag == 'span':
+            self.in_titleline = False
+
+    def close(self):
+        super().close()
+        self._finish_story()
+
+    def _start_capture(self, field, end_tag):
+        self.capture = (field, end_tag)
+        self.buffer = []
+
+    def _finish_story(self):
+        if self.current and self.current.get('id'):
+            story = self.current
+            self.stories.append(_make_story(
+                story['id'], story.get('rank'), story.get('title'), story.get('href'), story.get('site'),
+                story.get('score'), story['comments'], story.get('by'), story.get('age'), story.get('age_title')
+            ))
+        self.current = None
+        self.capture = None
+        self.in_titleline = False
+
+
+# 解析讨论页中的评论：只提取顶层评论（indent 为 0）的正文，按页面上的排序返回
+class _CommentStreamParser(HTMLParser):
+    def __init__(self, limit):
+        super().__init__(convert_charrefs=True)
+        self.limit = limit
+        self.comments = []
+        self.top_level = False
+        self.depth = 0  # 正在捕获的 commtext 内部 div 的嵌套深度，0 表示未在捕获
+        self.buffer = []
+
+    def handle_starttag(self, tag, attrs):
+        if len(self.comments) >= self.limit:
+            return
+        attrs = dict(attrs)
+        if self.depth:
+            if tag == 'div':
+                self.depth += 1
+            elif tag == 'p':
+                self.buffer.append('\n')  # 段落之间保留换行
+            return
+        classes = (attrs.get('class') or '').split()
+        if tag == 'td' and 'ind' in classes:
+            self.top_level = attrs.get('indent', '0') == '0'
+        elif tag == 'div' and 'commtext' in classes and self.top_level:
+            self.depth = 1
+            self.buffer = []
+
+    def handle_data(self, data):
+        if self.depth:
+            self.buffer.append(data)
+
+    def handle_endtag(self, tag):
+        if self.depth and tag == 'div':
+            self.depth -= 1
+            if not self.depth:
+                text = ''.join(self.buffer).strip()
+                if text:
+                    self.comments.append(text)
+
+
+def parse_comments(html, limit=3) -> List[str]:
+    # 返回讨论页中排名最前的 limit 条顶层评论
+    parser = _CommentStreamParser(limit)
+    parser.feed(html)
+    parser.close()
+    return parser.comments
+
+
+def parse_with_htmlparser(html) -> List[Story]:
+    parser = _StoryStreamParser()
+    parser.feed(html)
+    parser.close()
+    return parser.stories
+
+
+def parse_with_lxml(html) -> List[Story]:
+    stories = []
+    tree = lxml.html.fromstring(html)
+    for row in tree.xpath('//tr[contains(concat(" ", normalize-space(@class), " "), " athing ")]'):
+        links = row.xpath('.//span[@class="titleline"]/a[1]')
+        if not links:
+            continue
+        subtext = row.getnext()
+        if subtext is None:
+            subtext = row
+        age = subtext.xpath('.//span[@class="age"]')
+        stories.append(_make_story(
+            row.get('id'),
+            row.xpath('string(.//span[@class="rank"])'),
+            links[0].text_content(),
+            links[0].get('href'),
+            row.xpath('string(.//span[@class="sitestr"])'),
+            subtext.xpath('string(.//span[@class="score"])'),
+            [link.text_content() for link in subtext.xpath('.//a[starts-with(@href, "item?id=")]')],
+            subtext.xpath('string(.//a[@class="hnuser"])'),
+            age[0].text_content() if age else '',
+            age[0].get('title') if age else None,
+        ))
+    return stories
+
+
+def parse_with_bs4(html) -> List[Story]:
+    # BeautifulSoup + html.parser：原来的解析方式，保留作为对照和兜底
+    stories = []
+    soup = BeautifulSoup(html, 'html.parser')
+    for row in soup.find_all('tr', class_='athing'):
+        titleline = row.find('span', class_='titleline')
+        link = titleline.find('a') if titleline else None
+        if link is None:
+            continue
+        subtext = row.find_next_sibling('tr') or row
+
+        def text_of(element):
+            return element.get_text() if element else ''
+
+        age = subtext.find('span', class_='age')
+        stories.append(_make_story(
+            row.get('id'),
+            text_of(row.find('span', class_='rank')),
+            link.get_text(),
+            link.get('href'),
+            text_of(row.find('span', class_='sitestr')),
+            text_of(subtext.find('span', class_='score')),
+            [a.get_text() for a in subtext.find_all('a', href=re.compile(r'^item\?id='))],
+            text_of(subtext.find('a', class_='hnuser')),
+            text_of(age),
+            age.get('title') if age else None,
+        ))
+    return stories
+
+
+# 可用的解析后端，按速度从快到慢排列；未安装的可选依赖不会出现在这里
+PARSERS = {}
+if lxml is not None:
+    PARSERS['lxml'] = parse_with_lxml
+PARSERS['htmlparser'] = parse_with_htmlparser
+PARSERS['bs4'] = parse_with_bs4
+
+
+def get_parser(backend='auto'):
+    # backend 为 'auto' 时选择最快的可用后端
+    if backend in (None, 'auto'):
+        backend = next(iter(PARSERS))
+    if backend not in PARSERS:
+        raise ValueError(f"不支持的 HackerNews 解析后端：{backend}（可用：{', '.join(PARSERS)}）")
+    return backend, PARSERS[backend]
+
+
+def parse_stories(html, backend='auto') -> List[Story]:
+    return get_parser(backend)[1](html)
@@ -0,0 +1,64 @@
+# src/http_cache.py
+
+import json  # 导入json用于生成稳定的缓存键
+import threading  # 导入threading保证计数器在并发请求下正确
+from disk_cache import DiskCache  # 导入磁盘缓存
+from logger import LOG  # 导入日志模块
+from metrics import CACHE_REQUESTS_TOTAL  # 导入缓存命中指标
+
+
+# GitHub 条件请求缓存：保存 ETag/Last-Modified 与响应体，304 时直接返回缓存内容
+class HTTPCache:
+    def __init__(self, cache_dir, max_size_mb=100):
+        self.store = DiskCache(cache_dir, max_size_mb=max_size_mb)
+        self.hits = 0  # 304 命中缓存的次数（不消耗速率限制配额）
+        self.misses = 0  # 返回完整响应的次数
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(url, params=None):
+        # 以 URL 和排序后的查询参数作为缓存键
+        return json.dumps([url, sorted((params or {}).items())], default=str)
+
+    def lookup(self, url, params=None):
+        return self.store.get(self.make_key(url, params))
+
+    @staticmethod
+    def conditional_headers(entry):
+        # 根据缓存条目构造条件请求头
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def save(self, url, params, response, body, next_url):
+        # 仅缓存带有校验信息的响应，否则下次无法发起条件请求
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        self.store.set(self.make_key(url, params), {
+            'etag': etag,
+            'last_modified': last_modified,
+            'body': body,
+            'next_url': next_url,
+        })
+
+    def record_hit(self):
+        with self._lock:
+            self.hits += 1
+        CACHE_REQUESTS_TOTAL.inc(cache='github_http', result='hit')
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+        CACHE_REQUESTS_TOTAL.inc(cache='github_http', result='miss')
+
+    def log_stats(self):
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total else 0
+        LOG.info(f"GitHub HTTP 缓存统计：命中 {self.hits} 次，未命中 {self.misses} 次，"
+                 f"命中率 {hit_rate:.1f}%，节省 {self.hits} 次速率限制配额，淘汰 {self.store.evictions} 条")
@@ -1,103 +1,466 @@
 import os
 import json
 import re
+import threading  # 导入threading限制同时进行中的模型请求数
+import time
+from concurrent.futures import Future  # 单飞：相同的进行中请求共享同一个结果
+from functools import cached_property
 
-import ollama
-from openai import OpenAI  # 导入OpenAI库用于访问GPT模型
 from logger import LOG  # 导入日志模块
 from config import Config  # 从config模块导入Config类，用于配置管理
+from llm_cache import LLMResponseCache  # 导入LLM响应缓存
+from cassette import Cassette  # 导入录制/回放存储
+from metrics import ERRORS_TOTAL, RETRIES_TOTAL, observe_llm_call  # 导入LLM错误、重试计数与耗时记录
 
 
-class LLM:
+# 流式输出时逐段去掉 <think>...</think>，标签可能被拆分在相邻的两段中
+class ThinkStripper:
+    OPEN_TAG = '<think>'
+    CLOSE_TAG = '</think>'
+
     def __init__(self):
-        # 创建一个OpenAI客户端实例
-        self.client = OpenAI()
-        self.config = Config()
-        # 从TXT文件加载提示信息
-        with open("../prompts/report_prompt.txt", "r", encoding='utf-8') as file:
-            self.system_prompt = file.read()
+        self.buffer = ''
+        self.in_think = False
+        self.started = False  # 是否已输出过非空白内容，用于去掉开头的空白（与非流式的 strip() 一致）
+
+    def feed(self, text):
+        self.buffer += text
+        output = []
+        while True:
+            if self.in_think:
+                index = self.buffer.find(self.CLOSE_TAG)
+                if index == -1:
+                    # 只保留可能是结束标签前缀的尾部，其余思考内容直接丢弃
+                    self.buffer = self.buffer[-(len(self.CLOSE_TAG) - 1):]
+                    break
+                self.buffer = self.buffer[index + len(self.CLOSE_TAG):]
+                self.in_think = False
+            else:
+                index = self.buffer.find(self.OPEN_TAG)
+                if index == -1:
+                    keep = self._partial_tag_length(self.buffer, self.OPEN_TAG)
+                    output.append(self.buffer[:len(self.buffer) - keep])
+                    self.buffer = self.buffer[len(self.buffer) - keep:]
+                    break
+                output.append(self.buffer[:index])
+                self.buffer = self.buffer[index + len(self.OPEN_TAG):]
+                self.in_think = True
+        return self._lstrip(''.join(output))
+
+    def flush(self):
+        # 流结束时输出缓冲区中剩余的正文
+        rest = '' if self.in_think else self.buffer
+        self.buffer = ''
+        return self._lstrip(rest)
+
+    @staticmethod
+    def _partial_tag_length(text, tag):
+        # 返回 text 结尾与 tag 开头重合的最大长度
+        for length in range(min(len(tag) - 1, len(text)), 0, -1):
+            if text.endswith(tag[:length]):
+                return length
+        return 0
+
+    def _lstrip(self, text):
+        if not self.started:
+            text = text.lstrip()
+            self.started = bool(text)
+        return text
+
+
+def _ollama():
+    # 延迟导入：openai 与 ollama 的导入耗时占启动时间的大部分，只在真正调用模型时才导入
+    import ollama
+    return ollama
+
+
+def _read_prompt(name):
+    with open(f"../prompts/{name}", "r", encoding='utf-8') as file:
+        return file.read()
+
+
+COLD_START_LOAD_SECONDS = 1.0  # 模型加载耗时超过该值视为冷启动
+
+
+def parse_duration(value):
+    # 把 Ollama 的 keep_alive（如 "30m"、"1h"、300）换算为秒，负数表示永久驻留
+    if isinstance(value, (int, float)):
+        return float(value)
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    value = str(value).strip()
+    if value and value[-1] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+class LLM:
+    def __init__(self, config=None):
+        self.config = config or Config.shared()  # 默认使用进程内共享的配置
+        self.last_used_at = None  # 最近一次调用 Ollama 的时间，用于判断模型是否仍驻留
+        self.cassette = Cassette.from_config(self.config)  # 录制或回放模型输出，为 None 时直接调用模型
+        # 并发上限、超时和重试设置：报告分段并行总结、流水线的多个总结线程与 Gradio 请求共用同一个上限，
+        # 本地 Ollama 同一时间只处理 llm_max_concurrency 个请求
+        limits = {'openai': 8, 'ollama': 1}
+        limits.update(self.config.llm_max_concurrency or {})
+        self._request_slots = threading.BoundedSemaphore(limits[self.backend])
+        self.timeout = self.config.llm_timeout_seconds
+        self.max_retries = self.config.llm_max_retries
+        self.backoff_seconds = 1.0  # 第一次重试前的等待时间，之后每次翻倍
+        self._in_flight = {}  # 缓存键 -> 进行中的模型调用，相同的请求只调用一次模型
+        self._in_flight_lock = threading.Lock()
+
+        # 持久化的响应缓存，llm_cache_dir 为空时不启用
+        self.response_cache = None
+        if self.config.llm_cache_dir:
+            self.response_cache = LLMResponseCache(
+                self.config.llm_cache_dir,
+                self.config.llm_cache_ttl_hours,
+                self.config.llm_cache_max_size_mb
+            )
+
+    # OpenAI 客户端和提示词在首次使用时才创建和读取，不调用模型的命令无需承担这些开销
+    @cached_property
+    def client(self):
+        from openai import OpenAI  # 导入OpenAI库用于访问GPT模型
+        return OpenAI(timeout=self.timeout, max_retries=0)  # 重试由 _with_retry 统一处理
+
+    @cached_property
+    def ollama_client(self):
+        return _ollama().Client(timeout=self.timeout)
+
+    @cached_property
+    def system_prompt(self):
+        return _read_prompt("report_prompt.txt")
+
+    @cached_property
+    def hackernews_system_prompt(self):
+        return _read_prompt("hackernews_system_prompt.txt")
+
+    @cached_property
+    def merge_system_prompt(self):
+        return _read_prompt("report_merge_prompt.txt")
 
-        with open("../prompts/hackernews_system_prompt.txt", "r", encoding='utf-8') as file:
-            self.hackernews_system_prompt = file.read()
+    @cached_property
+    def rollup_system_prompt(self):
+        return _read_prompt("report_rollup_prompt.txt")
 
-    def generate_daily_report(self, markdown_content):
+    @property
+    def keep_alive_seconds(self):
+        return parse_duration(self.config.ollama_keep_alive)
+
+    def warm_up(self):
+        # 预加载 Ollama 模型：空 prompt 的 generate 请求只加载模型，不生成内容
+        if not self.config.is_ollama or self.config.dry_run or (self.cassette and self.cassette.replaying):
+            return
+        LOG.info(f"预热 Ollama 模型 {self.model}")
+        start = time.monotonic()
+        try:
+            with self._request_slots:
+                response = self.ollama_client.generate(model=self.model, prompt='',
+                                                       keep_alive=self.config.ollama_keep_alive)
+        except Exception as e:
+            LOG.error(f"预热 Ollama 模型失败：{e}")
+            return
+        self._record_ollama_call(response, time.monotonic() - start, '预热')
+
+    def is_warm(self, at=None):
+        # 判断模型在 at 时刻（默认现在）是否仍驻留在内存中
+        if self.last_used_at is None:
+            return False
+        if self.keep_alive_seconds < 0:
+            return True
+        return (at or time.time()) < self.last_used_at + self.keep_alive_seconds
+
+    @property
+    def backend(self):
+        return 'ollama' if self.config.is_ollama else 'openai'
+
+    def _record_ollama_call(self, response, elapsed, action='调用'):
+        # 记录最近一次使用时间，并根据模型加载耗时区分冷启动与热调用
+        self.last_used_at = time.time()
+        load_seconds = (response.get('load_duration') or 0) / 1e9
+        state = '冷启动' if load_seconds > COLD_START_LOAD_SECONDS else '热'
+        LOG.info(f"Ollama {action}耗时 {elapsed:.2f}s（{state}，模型加载 {load_seconds:.2f}s）")
+
+    @property
+    def model(self):
+        # Ollama 使用配置的模型，OpenAI 固定使用 gpt-4o-mini
+        return self.config.model_name if self.config.is_ollama else "gpt-4o-mini"
+
+    def generate_daily_report(self, markdown_content, use_cache=True):
         # 使用从TXT文件加载的提示信息
         messages = [
             {"role": "system", "content": self.system_prompt},
             {"role": "user", "content": markdown_content},
         ]
 
-        if self.config.dry_run:
-            # 如果启用了dry_run模式，将不会调用模型，而是将提示信息保存到文件中
-            LOG.info("Dry run mode enabled. Saving prompt to file.")
-            with open("daily_progress/prompt.txt", "w+") as f:
-                # 格式化JSON字符串的保存
-                json.dump(messages, f, indent=4, ensure_ascii=False)
-            LOG.debug("Prompt已保存到 daily_progress/prompt.txt")
+        # 日志记录开始生成报告
+        LOG.info("使用大模型开始生成报告。")
+        return self._generate(messages, use_cache, prompt_dir="daily_progress")
 
-            return "DRY RUN"
+    def generate_hackernews_report(self, markdown_content, use_cache=True):
+        # 使用从TXT文件加载的提示信息
+        messages = [
+            {"role": "system", "content": self.hackernews_system_prompt},
+            {"role": "user", "content": markdown_content},
+        ]
 
         # 日志记录开始生成报告
-        LOG.info("使用 GPT 模型开始生成报告。")
+        LOG.info("使用大模型开始生成 Hacker News 报告。")
+        return self._generate(messages, use_cache, prompt_dir="hackernews_reports")
 
-        try:
-            # 调用OpenAI GPT模型生成报告
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",  # 指定使用的模型版本
-                messages=messages
-            )
-            LOG.debug("GPT response: {}", response)
-            # 返回模型生成的内容
-            return response.choices[0].message.content
-        except Exception as e:
-            # 如果在请求过程中出现异常，记录错误并抛出
-            LOG.error(f"生成报告时发生错误：{e}")
-            raise
+    def stream_daily_report(self, markdown_content, use_cache=True):
+        # 与 generate_daily_report 相同，但随 token 到达逐段产出报告内容
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": markdown_content},
+        ]
+        LOG.info("使用大模型开始流式生成报告。")
+        yield from self._stream(messages, use_cache, prompt_dir="daily_progress")
 
-    def generate_hackernews_report(self, markdown_content):
-        # 使用从TXT文件加载的提示信息
+    def stream_hackernews_report(self, markdown_content, use_cache=True):
         messages = [
             {"role": "system", "content": self.hackernews_system_prompt},
             {"role": "user", "content": markdown_content},
         ]
+        LOG.info("使用大模型开始流式生成 Hacker News 报告。")
+        yield from self._stream(messages, use_cache, prompt_dir="hackernews_reports")
 
-        if self.config.dry_run:
-            # 如果启用了dry_run模式，将不会调用模型，而是将提示信息保存到文件中
+    def stream_merge_reports(self, reports, use_cache=True):
+        messages = [
+            {"role": "system", "content": self.merge_system_prompt},
+            {"role": "user", "content": "\n\n---\n\n".join(reports)},
+        ]
+        LOG.info(f"使用大模型流式合并 {len(reports)} 份分段简报。")
+        yield from self._stream(messages, use_cache)
+
+    def merge_reports(self, reports, use_cache=True):
+        # 把分段生成的多份简报合并为一份（map-reduce 中的 reduce 步骤）
+        messages = [
+            {"role": "system", "content": self.merge_system_prompt},
+            {"role": "user", "content": "\n\n---\n\n".join(reports)},
+        ]
+
+        LOG.info(f"使用大模型合并 {len(reports)} 份分段简报。")
+        return self._generate(messages, use_cache)
+
+    def stream_rollup_reports(self, reports, use_cache=True):
+        messages = [
+            {"role": "system", "content": self.rollup_system_prompt},
+            {"role": "user", "content": "\n\n".join(reports)},
+        ]
+        LOG.info(f"使用大模型流式汇总 {len(reports)} 份每日简报。")
+        yield from self._stream(messages, use_cache)
+
+    def rollup_reports(self, reports, use_cache=True):
+        # 把按天生成的每日简报汇总为多天的简报（summary of summaries），reports 为带日期标题的每日简报
+        messages = [
+            {"role": "system", "content": self.rollup_system_prompt},
+            {"role": "user", "content": "\n\n".join(reports)},
+        ]
+
+        LOG.info(f"使用大模型汇总 {len(reports)} 份每日简报。")
+        return self._generate(messages, use_cache)
+
+    def log_cache_stats(self):
+        if self.response_cache:
+            self.response_cache.log_stats()
+
+    def _dry_run(self, messages, prompt_dir=None):
+        # dry_run 模式下不调用模型，同步、流式与异步生成共用；prompt_dir 不为空时把提示信息保存到该目录的 prompt.txt
+        if prompt_dir:
             LOG.info("Dry run mode enabled. Saving prompt to file.")
-            os.makedirs("hackernews_reports", exist_ok=True)  # 创建文件夹
-            with open("hackernews_reports/prompt.txt", "w+", encoding='utf-8') as f:
+            os.makedirs(prompt_dir, exist_ok=True)
+            prompt_path = os.path.join(prompt_dir, "prompt.txt")
+            with open(prompt_path, "w+", encoding='utf-8') as f:
                 # 格式化JSON字符串的保存
                 json.dump(messages, f, indent=4, ensure_ascii=False)
-            LOG.debug("Prompt已保存到 hackernews_reports/prompt.txt")
+            LOG.debug(f"Prompt已保存到 {prompt_path}")
+        else:
+            LOG.info("Dry run mode enabled. Skipping model call.")
+        return "DRY RUN"
 
-            return "DRY RUN"
+    def _generate(self, messages, use_cache=True, prompt_dir=None):
+        # 先查询响应缓存，未命中时再调用模型；use_cache=False 时绕过缓存强制重新生成
+        if self.config.dry_run:
+            return self._dry_run(messages, prompt_dir)
 
-        # 日志记录开始生成报告
-        LOG.info("使用大模型开始生成 Hacker News 报告。")
+        if self.response_cache and use_cache:
+            cached = self.response_cache.get(self.model, messages)
+            if cached is not None:
+                LOG.info("命中 LLM 响应缓存，跳过模型调用。")
+                return cached
+
+        # 单飞：相同的请求正在进行时直接等待它的结果，不再重复调用模型，也不额外占用并发名额
+        key = LLMResponseCache.make_key(self.model, messages)
+        with self._in_flight_lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = Future()
+        if not leader:
+            LOG.debug("相同的 LLM 请求正在进行，共享其结果。")
+            return call.result()
 
+        start = time.monotonic()
         try:
-            if self.config.is_ollama:
-                response = ollama.chat(
-                    model=self.config.model_name,
-                    messages=messages
-                )
-
-                # 获取回复内容
-                raw_content = response["message"]["content"]
-
-                # 使用正则表达式去掉 <think> 及其内容
-                clean_content = re.sub(r'<think>.*?</think>', '', raw_content, flags=re.DOTALL).strip()
-                return clean_content
-            else:
-                # 调用OpenAI GPT模型生成报告
-                response = self.client.chat.completions.create(
-                    model="gpt-4o-mini",  # 指定使用的模型版本
-                    messages=messages
-                )
-                LOG.debug("GPT response: {}", response)
-                # 返回模型生成的内容
-                return response.choices[0].message.content
+            content = self._chat(messages)
         except Exception as e:
             # 如果在请求过程中出现异常，记录错误并抛出
+            ERRORS_TOTAL.inc(component='llm')
             LOG.error(f"生成报告时发生错误：{e}")
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(content)
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.pop(key, None)
+        observe_llm_call(self.backend, 'chat', time.monotonic() - start, content)
+
+        if self.response_cache:
+            self.response_cache.set(self.model, messages, content)
+        return content
+
+    def _stream(self, messages, use_cache=True, prompt_dir=None):
+        if self.config.dry_run:
+            yield self._dry_run(messages, prompt_dir)
+            return
+
+        if self.response_cache and use_cache:
+            cached = self.response_cache.get(self.model, messages)
+            if cached is not None:
+                LOG.info("命中 LLM 响应缓存，跳过模型调用。")
+                yield cached
+                return
+
+        stripper = ThinkStripper()
+        parts = []
+        start = time.monotonic()
+        try:
+            for delta in self._chat_stream(messages):
+                text = stripper.feed(delta)
+                if text:
+                    parts.append(text)
+                    yield text
+            text = stripper.flush()
+            if text:
+                parts.append(text)
+                yield text
+        except Exception as e:
+            ERRORS_TOTAL.inc(component='llm')
+            LOG.error(f"流式生成报告时发生错误：{e}")
             raise
+        observe_llm_call(self.backend, 'stream', time.monotonic() - start, ''.join(parts))
+
+        if self.response_cache:
+            # 与非流式结果保持一致（去掉首尾空白）后写入缓存
+            self.response_cache.set(self.model, messages, ''.join(parts).strip())
+
+    def _cassette_request(self, messages):
+        # 录制/回放的请求键与摘要：模型名和完整消息
+        return {'model': self.model, 'messages': messages}, f'{self.backend} {self.model}'
+
+    def _with_retry(self, call):
+        # 在并发上限内调用模型，失败时按指数退避重试；等待重试期间不占用并发名额
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._request_slots:
+                    return call()
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                RETRIES_TOTAL.inc(component='llm')
+                delay = self.backoff_seconds * (2 ** attempt)
+                LOG.warning(f"LLM 请求失败（第 {attempt + 1} 次）：{e}，{delay:.1f} 秒后重试")
+                time.sleep(delay)
+
+    def _limited_stream(self, messages):
+        # 流式调用在整个输出期间占用一个并发名额；收到第一段内容之前失败时按退避重试，之后失败直接抛出
+        for attempt in range(self.max_retries + 1):
+            started = False
+            try:
+                with self._request_slots:
+                    for delta in self._stream_model(messages):
+                        started = True
+                        yield delta
+                return
+            except Exception as e:
+                if started or attempt == self.max_retries:
+                    raise
+                RETRIES_TOTAL.inc(component='llm')
+                delay = self.backoff_seconds * (2 ** attempt)
+                LOG.warning(f"LLM 流式请求失败（第 {attempt + 1} 次）：{e}，{delay:.1f} 秒后重试")
+                time.sleep(delay)
+
+    def _chat_stream(self, messages):
+        if not self.cassette:
+            yield from self._limited_stream(messages)
+            return
+        request, summary = self._cassette_request(messages)
+        if self.cassette.replaying:
+            yield self.cassette.lookup('llm', request, summary)
+            return
+        parts = []
+        for delta in self._limited_stream(messages):
+            parts.append(delta)
+            yield delta
+        # 与非流式调用录制相同的内容（去掉 <think> 部分），两种调用方式可以互相回放
+        self.cassette.record('llm', request, re.sub(r'<think>.*?</think>', '', ''.join(parts), flags=re.DOTALL).strip(),
+                             summary)
+
+    def _stream_model(self, messages):
+        # 逐段产出模型返回的原始文本
+        if self.config.is_ollama:
+            start = time.monotonic()
+            first_token_at = None
+            for chunk in self.ollama_client.chat(model=self.model, messages=messages, stream=True,
+                                                 keep_alive=self.config.ollama_keep_alive):
+                if first_token_at is None:
+                    first_token_at = time.monotonic()
+                    LOG.info(f"Ollama 首个 token 耗时 {first_token_at - start:.2f}s")
+                if chunk.get('done'):
+                    self._record_ollama_call(chunk, time.monotonic() - start, '流式调用')
+                yield chunk["message"]["content"]
+            return
+
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            stream=True
+        )
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def _chat(self, messages):
+        if self.cassette:
+            request, summary = self._cassette_request(messages)
+            return self.cassette.play('llm', request, lambda: self._with_retry(lambda: self._call_model(messages)),
+                                      summary)
+        return self._with_retry(lambda: self._call_model(messages))
+
+    def _call_model(self, messages):
+        if self.config.is_ollama:
+            start = time.monotonic()
+            response = self.ollama_client.chat(
+                model=self.model,
+                messages=messages,
+                keep_alive=self.config.ollama_keep_alive  # 调用结束后模型继续驻留的时间
+            )
+            self._record_ollama_call(response, time.monotonic() - start)
+
+            # 获取回复内容
+            raw_content = response["message"]["content"]
+
+            # 使用正则表达式去掉 <think> 及其内容
+            return re.sub(r'<think>.*?</think>', '', raw_content, flags=re.DOTALL).strip()
+
+        # 调用OpenAI GPT模型生成报告
+        response = self.client.chat.completions.create(
+            model=self.model,  # 指定使用的模型版本
+            messages=messages
+        )
+        LOG.debug("GPT response: {}", response)
+        # 返回模型生成的内容
+        return response.choices[0].message.content
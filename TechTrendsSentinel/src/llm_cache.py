@@ -0,0 +1,41 @@
+# src/llm_cache.py
+
+import hashlib  # 导入hashlib用于计算内容哈希
+import json  # 导入json用于生成稳定的缓存键
+import threading  # 导入threading保证计数器在并发调用下正确
+from disk_cache import DiskCache  # 导入磁盘缓存
+from logger import LOG  # 导入日志模块
+from metrics import CACHE_REQUESTS_TOTAL  # 导入缓存命中指标
+
+
+# 以 (模型, 系统提示, 用户内容) 的哈希为键的 LLM 响应缓存，相同输入直接返回上次的结果
+class LLMResponseCache:
+    def __init__(self, cache_dir, ttl_hours=168, max_size_mb=50):
+        self.store = DiskCache(cache_dir, max_size_mb=max_size_mb, ttl_seconds=ttl_hours * 3600)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model, messages):
+        # 内容寻址：只要模型和提示内容逐字节相同，键就相同
+        system_prompt = ''.join(m['content'] for m in messages if m['role'] == 'system')
+        user_content = ''.join(m['content'] for m in messages if m['role'] != 'system')
+        payload = json.dumps([model, system_prompt, user_content], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, model, messages):
+        content = self.store.get(self.make_key(model, messages))
+        with self._lock:
+            if content is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        CACHE_REQUESTS_TOTAL.inc(cache='llm', result='miss' if content is None else 'hit')
+        return content
+
+    def set(self, model, messages, content):
+        self.store.set(self.make_key(model, messages), content)
+
+    def log_stats(self):
+        LOG.info(f"LLM 响应缓存统计：命中 {self.hits} 次，未命中 {self.misses} 次，淘汰 {self.store.evictions} 条")
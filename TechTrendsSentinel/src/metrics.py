@@ -0,0 +1,198 @@
+# src/metrics.py
+
+import bisect
+import threading  # 导入threading保证多线程下指标更新安全
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # 导入HTTP服务器暴露指标
+from logger import LOG  # 导入日志模块
+from utils import estimate_tokens  # 导入token估算，用于计算生成速度
+
+# 默认的耗时分桶（秒），覆盖从毫秒级的缓存命中到数分钟的本地模型生成
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    labels = list(labels)
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+# 指标基类：按标签值分别记录，labelnames 决定允许的标签
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+            lines += [line for key, value in items for line in self._render_sample(key, value)]
+        return lines
+
+
+# 只增不减的计数器，例如错误数、缓存命中数、重试次数
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def snapshot(self):
+        # 返回 {标签值（逗号分隔）: 计数}，用于基准测试等离线汇总
+        with self._lock:
+            return {','.join(key): value for key, value in self._values.items()}
+
+    def _render_sample(self, key, value):
+        yield f'{self.name}{_format_labels(zip(self.labelnames, key))} {_format_value(value)}'
+
+
+# 直方图：按分桶统计观测值的分布，例如请求耗时、生成速度
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        # 记录 with 块的耗时（异常时也记录）
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start, **labels)
+
+    def count(self, **labels):
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ([0], 0.0))
+        return sum(counts)
+
+    def snapshot(self):
+        # 返回 {标签值（逗号分隔）: {'count': 观测次数, 'sum': 观测值之和}}
+        with self._lock:
+            return {','.join(key): {'count': sum(counts), 'sum': total}
+                    for key, (counts, total) in self._values.items()}
+
+    def _render_sample(self, key, value):
+        counts, total = value
+        labels = list(zip(self.labelnames, key))
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            yield f'{self.name}_bucket{_format_labels(labels + [("le", _format_value(float(bound)))])} {cumulative}'
+        yield f'{self.name}_sum{_format_labels(labels)} {_format_value(total)}'
+        yield f'{self.name}_count{_format_labels(labels)} {cumulative}'
+
+
+# 指标注册表，render() 输出 Prometheus 文本格式
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def render(self):
+        return '\n'.join(line for metric in self._metrics for line in metric.render()) + '\n'
+
+
+REGISTRY = Registry()
+
+# 外部 HTTP 请求：service 为 github / github_graphql / hackernews
+HTTP_REQUEST_SECONDS = Histogram('sentinel_http_request_seconds', '外部 HTTP 请求耗时', ('service', 'status'))
+# LLM 调用：mode 为 chat / stream
+LLM_REQUEST_SECONDS = Histogram('sentinel_llm_request_seconds', 'LLM 调用耗时', ('backend', 'mode'))
+LLM_TOKENS_PER_SECOND = Histogram('sentinel_llm_tokens_per_second', 'LLM 输出速度（估算 token/秒）', ('backend',),
+                                  buckets=TOKENS_PER_SECOND_BUCKETS)
+REPORT_SECONDS = Histogram('sentinel_report_seconds', '生成一份报告的耗时（含分段总结与合并）', ('kind',))
+EMAIL_SEND_SECONDS = Histogram('sentinel_email_send_seconds', '发送一封邮件的耗时（含连接与登录）')
+# 流水线：条目在阶段输入队列中等待的时间，以及阶段处理耗时
+QUEUE_WAIT_SECONDS = Histogram('sentinel_pipeline_queue_seconds', '条目在流水线阶段队列中的等待时间', ('stage',))
+STAGE_SECONDS = Histogram('sentinel_pipeline_stage_seconds', '流水线阶段处理单个条目的耗时', ('stage',))
+JOB_SECONDS = Histogram('sentinel_job_seconds', '定时任务运行耗时', ('job',))
+
+ERRORS_TOTAL = Counter('sentinel_errors_total', '各组件的错误次数', ('component',))
+RETRIES_TOTAL = Counter('sentinel_retries_total', '各组件的重试次数', ('component',))
+# cache 为 github_http / llm，result 为 hit / miss
+CACHE_REQUESTS_TOTAL = Counter('sentinel_cache_requests_total', '缓存查询次数', ('cache', 'result'))
+EMAILS_TOTAL = Counter('sentinel_emails_total', '邮件投递结果', ('result',))
+
+
+def observe_llm_call(backend, mode, elapsed, content):
+    # 记录一次模型调用的耗时与输出速度
+    LLM_REQUEST_SECONDS.observe(elapsed, backend=backend, mode=mode)
+    if elapsed > 0 and content:
+        LLM_TOKENS_PER_SECOND.observe(estimate_tokens(content) / elapsed, backend=backend)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # 抓取请求很频繁，不写入日志
+
+
+def start_metrics_server(port, host='127.0.0.1', registry=None):
+    # 在后台线程中启动 Prometheus 格式的指标端点，port 为 0 时不启动
+    if not port:
+        return None
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry or REGISTRY})
+    try:
+        server = ThreadingHTTPServer((host, port), handler)
+    except OSError as e:
+        LOG.error(f"启动指标端点失败（{host}:{port}）：{str(e)}")
+        return None
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    LOG.info(f"指标端点已启动：http://{host}:{port}/metrics")
+    return server
@@ -1,43 +1,265 @@
 import smtplib
+import threading  # 导入threading，多个通知线程共享同一个SMTP连接
+from contextlib import contextmanager
 import markdown2
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from logger import LOG
+from rate_limiter import TokenBucket  # 复用令牌桶限制每分钟发送的邮件数
+from outbox import Outbox  # 导入持久化发件箱
+from metrics import EMAIL_SEND_SECONDS, EMAILS_TOTAL, RETRIES_TOTAL  # 导入邮件耗时、结果与重试指标
 
 class Notifier:
-    def __init__(self, email_settings):
+    def __init__(self, email_settings, outbox=None):
         self.email_settings = email_settings
-    
-    def notify(self, subject, report):
+        self.outbox = outbox  # 持久化发件箱，为 None 时直接发送，失败即丢弃
+        settings = email_settings or {}
+        # 单个连接最多发送的邮件数，超过后重新连接，避免被服务商断开
+        self.max_messages_per_connection = settings.get('max_messages_per_connection', 50)
+        # 每分钟最多发送的邮件数（0 表示不限制）
+        per_minute = settings.get('max_messages_per_minute', 30)
+        self.bucket = TokenBucket(per_minute / 60, per_minute) if per_minute else None
+        self.digest = settings.get('digest', False)  # 摘要模式：一次任务的所有报告合并为一封邮件
+        self._server = None  # 当前复用的已登录连接，只在 batch() 内保持打开
+        self._sent_on_connection = 0
+        self._batch_depth = 0
+        self._digest_reports = []
+        self._lock = threading.RLock()
+        self._drain_lock = threading.Lock()  # 同一时间只有一个线程投递发件箱，同一封邮件不会被发送两次
+        self._sender = None  # 后台发送线程，启动后写入发件箱的邮件全部由它投递
+        self._wake_sender = threading.Event()
+        self._stop_sender = threading.Event()
+
+    @classmethod
+    def from_config(cls, config):
+        # 根据配置创建通知器，outbox_db 为空时不启用发件箱
+        outbox = None
+        if config.outbox_db:
+            outbox = Outbox(config.outbox_db, config.outbox_max_attempts, config.outbox_retry_seconds)
+        return cls(config.email, outbox)
+
+    def notify(self, subject, report, recipients=None, message_id=None, on_delivered=None):
+        # recipients 为空时发送到 email.to；返回报告是否已交给通知器（已发送、已写入发件箱或已加入摘要）
+        # message_id 标识一份报告（例如任务、仓库与报告周期），发件箱据此去重，重跑同一周期时不会重复发送
+        # on_delivered 在报告已发送或已写入发件箱后调用；摘要模式下要等 batch() 结束时摘要发送成功才调用
         if self.email_settings:
-            self.send_email(subject, report)
-        else:
-            LOG.warning("邮件设置未配置正确，无法发送通知")
-    
-    def send_email(self, subject, report):
+            with self._lock:
+                if self.digest and self._batch_depth:
+                    # 摘要模式下先收集报告，batch() 结束时按收件人合并发送
+                    self._digest_reports.append((subject, report, self._recipient(recipients), message_id,
+                                                 on_delivered))
+                    return True
+            delivered = self.send_email(subject, report, recipients, message_id)
+            if delivered and on_delivered:
+                on_delivered()
+            return delivered
+        LOG.warning("邮件设置未配置正确，无法发送通知")
+        return False
+
+    @contextmanager
+    def batch(self, digest_subject="[Github Sentinel] 进展简报汇总"):
+        # 批量发送：块内的所有邮件复用同一个已登录的SMTP连接，结束时发送摘要并关闭连接
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                reports = []
+                if not self._batch_depth:
+                    reports, self._digest_reports = self._digest_reports, []
+            by_recipient = {}
+            for subject, report, recipient, message_id, on_delivered in reports:
+                by_recipient.setdefault(recipient, []).append((subject, report, message_id, on_delivered))
+            try:
+                # 摘要在锁外发送，等待令牌桶时不阻塞其他线程；发送失败的摘要中的报告不回调 on_delivered
+                for recipient, recipient_reports in by_recipient.items():
+                    if self.send_email(digest_subject, self._build_digest(recipient_reports), [recipient],
+                                       self._digest_message_id(recipient_reports)):
+                        for subject, report, message_id, on_delivered in recipient_reports:
+                            if on_delivered:
+                                on_delivered()
+            finally:
+                with self._lock:
+                    if not self._batch_depth:
+                        self._disconnect()
+
+    @staticmethod
+    def _build_digest(reports):
+        LOG.info(f"摘要模式：合并 {len(reports)} 份报告为一封邮件")
+        return "\n\n---\n\n".join(report for subject, report, message_id, on_delivered in reports)
+
+    @staticmethod
+    def _digest_message_id(reports):
+        # 摘要的消息ID由其中各份报告的ID组成；有报告没有ID时摘要也不去重
+        message_ids = [message_id for subject, report, message_id, on_delivered in reports]
+        if None in message_ids:
+            return None
+        return 'digest:' + '|'.join(sorted(message_ids))
+
+    def _recipient(self, recipients):
+        # 多个收件人合并为一个 To 头，发送时再拆分
+        return ', '.join(recipients) if recipients else self.email_settings['to']
+
+    def send_email(self, subject, report, recipients=None, message_id=None):
+        # 返回 True 表示邮件已发送；启用发件箱时表示邮件已持久化，会在之后可靠地送达
+        # 发件箱模式下只写入发件箱并唤醒后台发送线程，调用方不等待 SMTP；没有后台发送线程时才在当前线程投递
         LOG.info("准备发送邮件")
-        msg = MIMEMultipart()
-        msg['From'] = self.email_settings['from']
-        msg['To'] = self.email_settings['to']
-        msg['Subject'] = f"{subject}"
-        
         # 将Markdown内容转换为HTML
         html_report = markdown2.markdown(report)
 
+        if self.outbox:
+            # 先写入发件箱再投递，失败时由后台发送线程重试，无需重新拉取和总结
+            self.outbox.enqueue(self._recipient(recipients), subject, html_report, message_id)
+            if self._sender is not None:
+                self._wake_sender.set()
+            else:
+                self.drain()
+            return True
+
+        msg = self._build_message(self._recipient(recipients), subject, html_report)
+        if self.bucket:
+            self.bucket.acquire()
+        with self._lock:
+            try:
+                self._send(msg)
+                EMAILS_TOTAL.inc(result='sent')
+                LOG.info("邮件发送成功！")
+                return True
+            except Exception as e:
+                EMAILS_TOTAL.inc(result='failed')
+                LOG.error(f"发送邮件失败：{str(e)}")
+                self._disconnect()
+                return False
+            finally:
+                if not self._batch_depth:
+                    self._disconnect()  # 不在批量发送中时，每封邮件后立即关闭连接
+
+    def _build_message(self, recipient, subject, html_report):
+        msg = MIMEMultipart()
+        msg['From'] = self.email_settings['from']
+        msg['To'] = recipient
+        msg['Subject'] = f"{subject}"
         msg.attach(MIMEText(html_report, 'html'))
+        return msg
+
+    def drain(self):
+        # 投递发件箱中所有到期的邮件，返回成功发送的数量。
+        # 限速等待在 self._lock 之外进行，只有使用 SMTP 连接时才持有它，不阻塞收集报告的通知线程
+        if not self.outbox:
+            return 0
+        with self._drain_lock:
+            return self._drain()
+
+    def _drain(self):
+        sent = 0
         try:
-            with smtplib.SMTP_SSL(self.email_settings['smtp_server'], self.email_settings['smtp_port']) as server:
+            for message_id, recipient, subject, html_report in self.outbox.due():
+                if self.bucket:
+                    self.bucket.acquire()
+                try:
+                    with self._lock:
+                        self._send(self._build_message(recipient, subject, html_report))
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError) as e:
+                    # 只影响这一封邮件的错误，继续投递其余邮件
+                    EMAILS_TOTAL.inc(result='failed')
+                    self.outbox.mark_failed(message_id, e)
+                    continue
+                except Exception as e:
+                    # 连接或认证失败，其余邮件这次也无法送达，留待下次重试
+                    with self._lock:
+                        self._disconnect()
+                    EMAILS_TOTAL.inc(result='failed')
+                    self.outbox.mark_failed(message_id, e)
+                    break
+                EMAILS_TOTAL.inc(result='sent')
+                self.outbox.mark_sent(message_id)
+                sent += 1
+                LOG.info(f"邮件发送成功：{subject}")
+        finally:
+            with self._lock:
+                if not self._batch_depth:
+                    self._disconnect()
+        return sent
+
+    def start_sender(self, interval=30):
+        # 启动后台发送线程：立即投递上次运行遗留的邮件，之后在有新邮件写入时或每 interval 秒投递到期的重试
+        if not self.outbox:
+            return None
+
+        def run():
+            while not self._stop_sender.is_set():
+                self._wake_sender.clear()
+                try:
+                    self.drain()
+                    self.outbox.purge_sent()
+                except Exception as e:
+                    LOG.error(f"后台发送邮件失败：{str(e)}")
+                self._wake_sender.wait(interval)
+
+        counts = self.outbox.counts()
+        LOG.info(f"启动发件箱后台发送线程（待发送 {counts.get('pending', 0)}，死信 {counts.get('dead', 0)}）")
+        self._sender = threading.Thread(target=run, name='outbox-sender', daemon=True)
+        self._sender.start()
+        return self._sender
+
+    def stop_sender(self):
+        self._stop_sender.set()
+        self._wake_sender.set()
+
+    def _send(self, msg):
+        # 连接断开（服务器超时、达到单连接上限）时重新连接并重试一次
+        with EMAIL_SEND_SECONDS.time():
+            for attempt in range(2):
+                server = self._connect()
+                try:
+                    server.sendmail(msg['From'], [address.strip() for address in msg['To'].split(',')],
+                                    msg.as_string())
+                    self._sent_on_connection += 1
+                    return
+                except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError) as e:
+                    self._disconnect()
+                    if attempt:
+                        raise
+                    RETRIES_TOTAL.inc(component='smtp')
+                    LOG.warning(f"SMTP连接已断开：{str(e)}，重新连接")
+
+    def _connect(self):
+        if self._server is not None and self._sent_on_connection >= self.max_messages_per_connection:
+            LOG.debug(f"当前连接已发送 {self._sent_on_connection} 封邮件，重新连接")
+            self._disconnect()
+        if self._server is None:
+            # 设置超时时间，避免卡住的SMTP服务器一直占用通知线程
+            timeout = self.email_settings.get('timeout', 30)
+            # ssl 为 false 时使用明文 SMTP，例如本地的测试邮件服务器
+            smtp_class = smtplib.SMTP_SSL if self.email_settings.get('ssl', True) else smtplib.SMTP
+            server = smtp_class(self.email_settings['smtp_server'], self.email_settings['smtp_port'],
+                                timeout=timeout)
+            try:
                 LOG.debug("登录SMTP服务器")
-                server.login(msg['From'], self.email_settings['password'])
-                server.sendmail(msg['From'], msg['To'], msg.as_string())
-                LOG.info("邮件发送成功！")
-        except Exception as e:
-            LOG.error(f"发送邮件失败：{str(e)}")
+                server.login(self.email_settings['from'], self.email_settings['password'])
+            except Exception:
+                server.close()
+                raise
+            self._server = server
+            self._sent_on_connection = 0
+        return self._server
+
+    def _disconnect(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            self._server.close()
+        self._server = None
+        self._sent_on_connection = 0
 
 
 if __name__ == '__main__':
     from config import Config
-    config = Config()
+    config = Config.shared()
     notifier = Notifier(config.email)
 
     test_repo = "DjangoPeng/openai-quickstart"
@@ -0,0 +1,131 @@
+# src/outbox.py
+
+import hashlib  # 导入hashlib计算去重键
+import os  # 导入os模块用于创建数据目录
+import sqlite3  # 导入sqlite3持久化待发送的邮件
+import time
+import uuid  # 没有消息ID的邮件使用随机去重键
+from contextlib import closing
+from logger import LOG  # 导入日志模块
+
+STATUS_PENDING = 'pending'  # 等待发送或等待重试
+STATUS_SENT = 'sent'  # 已发送，保留一段时间用于按消息ID去重
+STATUS_DEAD = 'dead'  # 超过最大重试次数，进入死信区等待人工处理
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedup_key TEXT NOT NULL UNIQUE,
+    recipient TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    html TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+def dedup_key(recipient, message_id=None):
+    # 同一消息ID（例如任务、仓库与报告周期）发给同一收件人只发送一次；
+    # 没有消息ID时不去重，内容相同的邮件（例如两个周期的报告恰好一样）也会各自发送
+    if message_id is None:
+        return uuid.uuid4().hex
+    return hashlib.sha256('\0'.join((recipient, message_id)).encode('utf-8')).hexdigest()
+
+
+# 持久化发件箱：渲染好的邮件先写入 SQLite，再由发送方按指数退避重试投递，
+# 守护进程重启后未发送的邮件会继续发送，超过最大重试次数的邮件转入死信区
+class Outbox:
+    def __init__(self, db_path='data/outbox.db', max_attempts=8, retry_seconds=60, max_retry_seconds=3600,
+                 retention_days=7):
+        self.db_path = db_path
+        self.max_attempts = max_attempts  # 最大投递次数，超过后进入死信区
+        self.retry_seconds = retry_seconds  # 第一次重试前的等待时间，之后每次翻倍
+        self.max_retry_seconds = max_retry_seconds  # 重试间隔上限
+        self.retention_days = retention_days  # 已发送记录的保留天数，即去重窗口
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')  # WAL 模式允许通知线程与后台发送线程并发读写
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # 每次操作使用独立连接，便于在多个线程中使用
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def enqueue(self, recipient, subject, html, message_id=None):
+        # 写入一封待发送邮件；已存在相同消息ID的邮件（待发送、已发送或死信）时忽略，返回是否新写入
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO outbox (dedup_key, recipient, subject, html, status, next_attempt_at, '
+                'created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (dedup_key(recipient, message_id), recipient, subject, html, STATUS_PENDING, now, now, now)
+            )
+        if not cursor.rowcount:
+            LOG.warning(f"发件箱中已有消息 {message_id} 发往 {recipient} 的邮件，跳过：{subject}")
+        return bool(cursor.rowcount)
+
+    def due(self, limit=100, now=None):
+        # 返回已到重试时间的待发送邮件 [(id, recipient, subject, html)]，按写入顺序排列
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                'SELECT id, recipient, subject, html FROM outbox WHERE status = ? AND next_attempt_at <= ? '
+                'ORDER BY id LIMIT ?',
+                (STATUS_PENDING, now or time.time(), limit)
+            ).fetchall()
+
+    def mark_sent(self, message_id):
+        with closing(self._connect()) as conn, conn:
+            conn.execute('UPDATE outbox SET status = ?, attempts = attempts + 1, last_error = NULL, updated_at = ? '
+                         'WHERE id = ?', (STATUS_SENT, time.time(), message_id))
+
+    def mark_failed(self, message_id, error):
+        # 记录一次失败：按指数退避安排下一次重试，达到最大次数后转入死信区
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute('SELECT attempts, subject FROM outbox WHERE id = ?', (message_id,)).fetchone()
+            if row is None:
+                return
+            attempts, subject = row[0] + 1, row[1]
+            if attempts >= self.max_attempts:
+                status, next_attempt_at = STATUS_DEAD, now
+                LOG.error(f"邮件投递失败 {attempts} 次，转入死信区：{subject}（{error}）")
+            else:
+                status = STATUS_PENDING
+                delay = min(self.max_retry_seconds, self.retry_seconds * (2 ** (attempts - 1)))
+                next_attempt_at = now + delay
+                LOG.warning(f"邮件投递失败（第 {attempts} 次），{delay:.0f} 秒后重试：{subject}（{error}）")
+            conn.execute('UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, '
+                         'updated_at = ? WHERE id = ?',
+                         (status, attempts, next_attempt_at, str(error), now, message_id))
+
+    def dead_letters(self):
+        # 返回死信区的邮件 [(id, subject, attempts, last_error)]
+        with closing(self._connect()) as conn:
+            return conn.execute('SELECT id, subject, attempts, last_error FROM outbox WHERE status = ? ORDER BY id',
+                                (STATUS_DEAD,)).fetchall()
+
+    def requeue_dead(self):
+        # 把死信区的邮件重新放回待发送队列（例如修复邮件配置之后），返回重新排队的数量
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute('UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = ?, updated_at = ? '
+                                  'WHERE status = ?', (STATUS_PENDING, now, now, STATUS_DEAD))
+        return cursor.rowcount
+
+    def purge_sent(self):
+        # 删除超过保留期的已发送记录，控制数据库大小
+        cutoff = time.time() - self.retention_days * 86400
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute('DELETE FROM outbox WHERE status = ? AND updated_at < ?', (STATUS_SENT, cutoff))
+        return cursor.rowcount
+
+    def counts(self):
+        # 返回各状态的邮件数量
+        with closing(self._connect()) as conn:
+            return dict(conn.execute('SELECT status, COUNT(*) FROM outbox GROUP BY status').fetchall())
@@ -0,0 +1,105 @@
+# src/pipeline.py
+
+import queue  # 导入queue用于阶段之间的有界队列
+import threading  # 导入threading用于每个阶段的工作线程
+import time
+from logger import LOG  # 导入日志模块
+from metrics import QUEUE_WAIT_SECONDS, STAGE_SECONDS, ERRORS_TOTAL  # 导入队列等待与阶段耗时指标
+
+_STOP = object()  # 阶段结束标记
+
+
+# 流水线中的一个阶段：func 处理上一阶段的输出，返回 None 时该条目不再向下游传递
+class Stage:
+    def __init__(self, name, func, workers=1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.processed = 0  # 成功处理的条目数
+        self.failed = 0  # 处理失败的条目数
+        self.busy_seconds = 0.0  # 所有工作线程累计处理耗时
+        self._lock = threading.Lock()
+
+    def _record(self, elapsed, ok):
+        with self._lock:
+            self.busy_seconds += elapsed
+            if ok:
+                self.processed += 1
+            else:
+                self.failed += 1
+
+
+# 多阶段流水线：阶段之间用有界队列连接，各阶段使用独立的工作线程并行运行
+# 例如拉取第 N+1 个仓库的同时总结第 N 个仓库、发送第 N-1 个仓库的邮件
+class Pipeline:
+    def __init__(self, stages, queue_size=10):
+        self.stages = stages
+        self.queue_size = queue_size
+
+    def run(self, items):
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        threads = []
+        start = time.monotonic()
+        for index, stage in enumerate(self.stages):
+            out_queue = queues[index + 1] if index + 1 < len(self.stages) else None
+            next_workers = self.stages[index + 1].workers if out_queue else 0
+            remaining = [stage.workers]  # 尚未退出的工作线程数，最后一个退出的线程负责通知下游
+            lock = threading.Lock()
+            for worker_id in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._work,
+                    args=(stage, queues[index], out_queue, next_workers, remaining, lock),
+                    name=f'{stage.name}-{worker_id}',
+                    daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+        # 向第一个阶段投递条目；队列已满时阻塞，防止上游远远跑在下游前面
+        # 条目与入队时间一起放入队列，用于统计在队列中的等待时间
+        # items 可以是生成器（例如逐批获取的结果），生成器出错时也先让已投递的条目处理完再抛出
+        try:
+            for item in items:
+                queues[0].put((item, time.monotonic()))
+        finally:
+            for _ in range(self.stages[0].workers):
+                queues[0].put(_STOP)
+            for thread in threads:
+                thread.join()
+
+        elapsed = time.monotonic() - start
+        summary = ', '.join(
+            f"{stage.name}: 成功 {stage.processed} / 失败 {stage.failed} / 耗时 {stage.busy_seconds:.1f}s"
+            for stage in self.stages
+        )
+        LOG.info(f"流水线执行完毕，总耗时 {elapsed:.1f}s（{summary}）")
+        return elapsed
+
+    @staticmethod
+    def _work(stage, in_queue, out_queue, next_workers, remaining, lock):
+        while True:
+            entry = in_queue.get()
+            if entry is _STOP:
+                break
+            item, enqueued_at = entry
+            started = time.monotonic()
+            QUEUE_WAIT_SECONDS.observe(started - enqueued_at, stage=stage.name)
+            try:
+                result = stage.func(item)
+            except Exception as e:
+                # 单个条目失败只记录日志，不影响其他条目和其他阶段
+                stage._record(time.monotonic() - started, False)
+                STAGE_SECONDS.observe(time.monotonic() - started, stage=stage.name)
+                ERRORS_TOTAL.inc(component=f'pipeline_{stage.name}')
+                LOG.error(f"[{stage.name}]处理失败：{str(e)}")
+                continue
+            stage._record(time.monotonic() - started, True)
+            STAGE_SECONDS.observe(time.monotonic() - started, stage=stage.name)
+            if out_queue is not None and result is not None:
+                out_queue.put((result, time.monotonic()))
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last and out_queue is not None:
+            for _ in range(next_workers):
+                out_queue.put(_STOP)
@@ -0,0 +1,143 @@
+# src/profiler.py
+
+import cProfile  # 导入cProfile记录函数调用耗时
+import io
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+from logger import LOG  # 导入日志模块
+
+_active = []  # 正在运行的剖析会话
+_sessions = {}  # 线程 ID -> 该线程所属的剖析会话；剖析期间启动的线程继承启动它的线程的会话
+_active_lock = threading.Lock()
+_thread_start = threading.Thread.start
+
+
+def _start_in_session(thread):
+    # 剖析期间替换 Thread.start：新线程（流水线阶段、并行总结等）加入启动它的线程所属的会话，
+    # 多个定时任务同时剖析时，每个任务只统计自己启动的线程
+    with _active_lock:
+        session = _sessions.get(threading.get_ident())
+    if session is not None:
+        run = thread.run
+
+        def run_in_session():
+            with session.attach():
+                run()
+        thread.run = run_in_session
+    return _thread_start(thread)
+
+
+# 一次剖析会话：记录调用线程以及期间新启动的线程，结束后合并统计
+class _Session:
+    def __init__(self):
+        self.profiles = []  # 已启用的剖析器
+        self.finished = []  # 所在线程已结束并自行停用的剖析器
+        self._lock = threading.Lock()
+
+    def _enable_in_current_thread(self):
+        # 返回启用的剖析器，无法启用时返回 None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12 起 cProfile 基于 sys.monitoring，同一时间只能启用一个剖析器，且已覆盖所有线程
+            return None
+        with self._lock:
+            self.profiles.append(profile)
+        return profile
+
+    @contextmanager
+    def attach(self):
+        # 在当前线程中启用剖析器，并把当前线程记为属于本会话
+        profile = self._enable_in_current_thread()
+        ident = threading.get_ident()
+        with _active_lock:
+            previous = _sessions.get(ident)
+            _sessions[ident] = self
+        try:
+            yield profile
+        finally:
+            if profile:
+                # 剖析器只能由启用它的线程停用，停用后才能读取它的统计
+                profile.disable()
+                with self._lock:
+                    self.finished.append(profile)
+            with _active_lock:
+                if previous is None:
+                    _sessions.pop(ident, None)
+                else:
+                    _sessions[ident] = previous
+
+    def stats(self, stream):
+        # 只合并已结束的线程；仍在运行的线程还在写入统计，不读取
+        with self._lock:
+            profiles = list(self.finished)
+        stats = pstats.Stats(profiles[0], stream=stream)
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+
+# 剖析器：为每次命令或任务运行生成带时间戳的 .prof 文件，并在日志中输出最耗时的函数
+class Profiler:
+    def __init__(self, output_dir='data/profiles', top_n=20, sort='cumulative'):
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self.sort = sort  # pstats 排序字段：cumulative（含子调用）或 tottime（函数自身）
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.profile_dir, config.profile_top_n, config.profile_sort)
+
+    @contextmanager
+    def profile(self, name):
+        session = _Session()
+        try:
+            with session.attach() as profile:
+                if profile is None:
+                    LOG.warning(f"[{name}]已有剖析器在运行，本次运行不剖析")
+                    yield None
+                    return
+                with _active_lock:
+                    # 第一个会话开始时替换 Thread.start，最后一个会话结束时恢复；
+                    # 未属于任何会话的线程启动新线程时不做任何处理
+                    if not _active:
+                        threading.Thread.start = _start_in_session
+                    _active.append(session)
+                try:
+                    yield session
+                finally:
+                    with _active_lock:
+                        _active.remove(session)
+                        if not _active and threading.Thread.start is _start_in_session:
+                            threading.Thread.start = _thread_start
+        finally:
+            # 调用线程的剖析器已在 attach 结束时停用
+            if session.finished:
+                self._save(name, session)
+
+    def wrap(self, name, func):
+        # 返回在剖析中运行 func 的函数
+        def profiled(*args, **kwargs):
+            with self.profile(name):
+                return func(*args, **kwargs)
+        return profiled
+
+    def _save(self, name, session):
+        os.makedirs(self.output_dir, exist_ok=True)
+        safe_name = re.sub(r'[^\w.-]+', '_', name)
+        path = os.path.join(self.output_dir, f"{safe_name}_{time.strftime('%Y%m%d_%H%M%S')}.prof")
+        stream = io.StringIO()
+        stats = session.stats(stream)
+        stats.dump_stats(path)
+        stats.sort_stats(self.sort).print_stats(self.top_n)
+        summary = stream.getvalue().strip()
+        LOG.info(f"[{name}]剖析结果已保存到 {path}（共 {len(session.finished)} 个线程），最耗时的 {self.top_n} 个函数：\n{summary}")
+        running = len(session.profiles) - len(session.finished)
+        if running:
+            LOG.warning(f"[{name}]{running} 个线程在任务结束时仍在运行，未计入剖析结果")
+        return path
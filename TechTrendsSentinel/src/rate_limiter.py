@@ -0,0 +1,102 @@
+# src/rate_limiter.py
+
+import threading  # 导入threading保证多线程共享限流状态
+import time
+from logger import LOG  # 导入日志模块
+
+PRIORITY_HIGH = 'high'  # 高优先级：配额耗尽时等待到下一个窗口
+PRIORITY_LOW = 'low'  # 低优先级：配额接近耗尽时推迟到下一个窗口
+
+
+class RateLimitDeferred(Exception):
+    # 低优先级请求因配额不足被推迟时抛出，reset_at 为下一个配额窗口开始的时间戳
+    def __init__(self, reset_at):
+        super().__init__(f"速率限制配额不足，推迟到 {time.strftime('%H:%M:%S', time.localtime(reset_at))}")
+        self.reset_at = reset_at
+
+
+# 令牌桶：以 rate 个/秒的速度补充令牌，最多积攒 capacity 个
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, tokens=1):
+        # 阻塞直到取得令牌
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# GitHub 请求调度器：根据 X-RateLimit-* 响应头调整节奏，配额不足时等待或推迟
+class RateLimitScheduler:
+    def __init__(self, requests_per_second=10, reserve=200, low_priority_repos=None):
+        self.requests_per_second = requests_per_second  # 配额充足时的最大请求速率
+        self.reserve = reserve  # 剩余配额低于该值时推迟低优先级仓库
+        self.low_priority_repos = set(low_priority_repos or [])
+        self.bucket = TokenBucket(requests_per_second, max(1, requests_per_second))
+        self.limit = None  # 当前窗口的总配额
+        self.remaining = None  # 当前窗口的剩余配额
+        self.reset_at = None  # 下一个窗口开始的时间戳（秒）
+        self._lock = threading.Lock()
+
+    def priority_of(self, repo):
+        return PRIORITY_LOW if repo in self.low_priority_repos else PRIORITY_HIGH
+
+    def acquire(self, repo=None):
+        # 每次发送请求前调用：低优先级在配额不足时抛出 RateLimitDeferred，高优先级等待窗口重置
+        priority = self.priority_of(repo)
+        while True:
+            with self._lock:
+                now = time.time()
+                if self.reset_at is None or self.reset_at <= now:
+                    break
+                if priority == PRIORITY_LOW and self.remaining <= self.reserve:
+                    raise RateLimitDeferred(self.reset_at)
+                if self.remaining > 0:
+                    if self.remaining <= self.reserve:
+                        # 进入保留配额后，把剩余配额均匀分布到窗口重置之前，避免提前耗尽
+                        self.bucket.rate = min(self.requests_per_second, self.remaining / (self.reset_at - now))
+                    else:
+                        self.bucket.rate = self.requests_per_second
+                    self.remaining -= 1
+                    break
+                wait = self.reset_at - now
+            LOG.warning(f"GitHub 速率限制配额已耗尽，等待 {wait:.0f} 秒后继续")
+            time.sleep(wait)
+        self.bucket.acquire()
+
+    def update(self, headers):
+        # 根据响应头刷新配额状态
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset = headers.get('X-RateLimit-Reset')
+        retry_after = headers.get('Retry-After')
+        with self._lock:
+            if remaining is not None and reset is not None:
+                self.remaining = int(remaining)
+                self.reset_at = float(reset)
+                if headers.get('X-RateLimit-Limit') is not None:
+                    self.limit = int(headers['X-RateLimit-Limit'])
+            if retry_after is not None:
+                # 触发二级限流时 GitHub 返回 Retry-After，此前不再发送请求
+                self.remaining = 0
+                self.reset_at = time.time() + float(retry_after)
+            if self.reset_at is None or self.reset_at <= time.time():
+                self.bucket.rate = self.requests_per_second
+
+    def is_exhausted(self):
+        with self._lock:
+            return self.remaining == 0 and self.reset_at is not None and self.reset_at > time.time()
@@ -1,19 +1,33 @@
 # src/report_generator.py
 
 import os
-from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor  # 导入线程池用于并行总结分段
+from datetime import timedelta
 from logger import LOG  # 导入日志模块，用于记录日志信息
+from utils import estimate_tokens, split_markdown  # 导入 token 估算与 Markdown 分段工具
+from metrics import REPORT_SECONDS  # 导入报告生成耗时指标
+from report_store import ReportStore, rollup_days  # 导入每日简报存储
 
 class ReportGenerator:
-    def __init__(self, llm):
+    def __init__(self, llm, chunk_tokens=6000, map_workers=4, report_store=None):
         self.llm = llm  # 初始化时接受一个LLM实例，用于后续生成报告
+        self.chunk_tokens = chunk_tokens  # 单次提示中进展内容允许的最大 token 数
+        self.map_workers = max(1, map_workers)  # 并行总结分段的最大并发数
+        self.report_store = report_store  # 每日简报存储，为 None 时不启用按天汇总
+
+    @classmethod
+    def from_config(cls, llm, config):
+        # report_store_db 为空时不保存每日简报，多天报告直接总结原始数据
+        report_store = ReportStore(config.report_store_db) if config.report_store_db else None
+        return cls(llm, config.report_chunk_tokens, config.report_map_workers, report_store)
 
     def generate_daily_report(self, markdown_file_path):
         # 读取Markdown文件并使用LLM生成日报
         with open(markdown_file_path, 'r') as file:
             markdown_content = file.read()
 
-        report = self.llm.generate_daily_report(markdown_content)  # 调用LLM生成报告
+        with REPORT_SECONDS.time(kind='github'):
+            report = self._summarize(markdown_content)  # 调用LLM生成报告
 
         report_file_path = os.path.splitext(markdown_file_path)[0] + "_report.md"
         with open(report_file_path, 'w+') as report_file:
@@ -29,21 +43,185 @@ class ReportGenerator:
         with open(markdown_file_path, 'r') as file:
             markdown_content = file.read()
 
-        report = self.llm.generate_daily_report(markdown_content)
+        with REPORT_SECONDS.time(kind='github'):
+            report = self._summarize(markdown_content)
 
         report_file_path = os.path.splitext(markdown_file_path)[0] + f"_report.md"
         with open(report_file_path, 'w+') as report_file:
             report_file.write(report)
-        
+
+        LOG.info(f"GitHub 项目报告已保存到 {report_file_path}")
+
+        return report, report_file_path
+
+    def _summarize(self, markdown_content):
+        # 内容超出单次提示的 token 预算时采用 map-reduce：先并行总结各分段，再合并
+        chunks = split_markdown(markdown_content, self.chunk_tokens)
+        if len(chunks) == 1:
+            return self.llm.generate_daily_report(markdown_content)
+
+        LOG.info(f"进展内容约 {estimate_tokens(markdown_content)} tokens，切分为 {len(chunks)} 段并行总结")
+        partial_reports = self._map(self.llm.generate_daily_report, chunks)
+        return self._reduce(partial_reports)
+
+    def missing_days(self, repo, days, until=None):
+        # 返回需要导出原始数据的日期：[until - days, until) 内还没有每日简报的日期，以及尚未结束的 until 当天
+        all_days = rollup_days(days, until)
+        return self.report_store.missing_days(repo, all_days[:-1]) + all_days[-1:]
+
+    def generate_rollup_report(self, repo, days, day_files, until=None):
+        # 按天汇总：复用已保存的每日简报，day_files 为缺少简报的日期的原始进展文件 {日期: 路径}，
+        # 先总结这些日期并保存，再把各天的简报汇总为整个时间段的报告
+        with REPORT_SECONDS.time(kind='github'):
+            sections = self._daily_sections(repo, days, day_files, until)
+            if len(sections) == 1:
+                report = sections[0][1]
+            else:
+                reports = self._collapse([self._section(day, report) for day, report in sections],
+                                         self.llm.rollup_reports)
+                report = reports[0] if len(reports) == 1 else self.llm.rollup_reports(reports)
+
+        report_file_path = self._rollup_file_path(repo, days, until)
+        with open(report_file_path, 'w+', encoding='utf-8') as report_file:
+            report_file.write(report)
+
         LOG.info(f"GitHub 项目报告已保存到 {report_file_path}")
 
         return report, report_file_path
 
+    def stream_rollup_report(self, repo, days, day_files, until=None):
+        # 流式版本的 generate_rollup_report：每一天的简报就绪后立即按日期顺序展示，
+        # 不必等所有缺少的日期总结完；最后流式输出的汇总结果替换这些每日简报
+        sections = []
+        for day, report in self._iter_daily_sections(repo, days, day_files, until):
+            sections.append((day, report))
+            yield "\n\n".join(self._section(day, report) for day, report in sections), None
+        if len(sections) == 1:
+            stream = iter([sections[0][1]])
+        else:
+            reports = self._collapse([self._section(day, report) for day, report in sections],
+                                     self.llm.rollup_reports)
+            stream = iter(reports) if len(reports) == 1 else self.llm.stream_rollup_reports(reports)
+        report_file_path = self._rollup_file_path(repo, days, until)
+        yield from self._stream_to_file(stream, report_file_path)
+        LOG.info(f"GitHub 项目报告已保存到 {report_file_path}")
+
+    def _daily_sections(self, repo, days, day_files, until):
+        # 返回按日期排列的 [(日期, 每日简报)]
+        return list(self._iter_daily_sections(repo, days, day_files, until))
+
+    def _iter_daily_sections(self, repo, days, day_files, until):
+        # 按日期顺序产出 (日期, 每日简报)，缺少简报的日期并行从原始进展文件总结后写入存储，
+        # 每一天在它之前的日期都就绪后立即产出；尚未结束的最后一天每次重新总结，不写入存储
+        all_days = rollup_days(days, until)
+        current = all_days[-1]
+        reports = self.report_store.get_reports(repo, all_days[:-1])
+        missing = [day for day in all_days if day not in reports and day in day_files]
+
+        def summarize_day(day):
+            with open(day_files[day], 'r') as file:
+                report = self._summarize(file.read())
+            if day != current:
+                self.report_store.put_report(repo, day, report)
+            return report
+
+        if missing:
+            LOG.info(f"[{repo}]{len(all_days)} 天中复用 {len(reports)} 份每日简报，总结 {len(missing)} 天的原始数据")
+        skipped = [day for day in all_days if day not in reports and day not in day_files]
+        if skipped:
+            LOG.warning(f"[{repo}]以下日期既没有每日简报也没有原始数据，汇总时跳过：{skipped}")
+        with ThreadPoolExecutor(max_workers=self.map_workers) as executor:
+            futures = {day: executor.submit(summarize_day, day) for day in missing}
+            for day in all_days:
+                if day in futures:
+                    yield day, futures[day].result()
+                elif day in reports:
+                    yield day, reports[day]
+
+    @staticmethod
+    def _section(day, report):
+        return f"## {day}\n\n{report}"
+
+    @staticmethod
+    def _rollup_file_path(repo, days, until):
+        all_days = rollup_days(days, until)
+        repo_dir = os.path.join('daily_progress', repo.replace("/", "_"))
+        os.makedirs(repo_dir, exist_ok=True)
+        return os.path.join(repo_dir, f"{all_days[0]}_to_{all_days[-1]}_report.md")
+
+    def _map(self, func, items):
+        with ThreadPoolExecutor(max_workers=self.map_workers) as executor:
+            return list(executor.map(func, items))
+
+    def stream_report_by_date_range(self, markdown_file_path, days):
+        # 流式生成：随模型输出逐步产出 (当前报告内容, None)，结束后写入报告文件并产出 (完整报告, 报告文件路径)
+        with open(markdown_file_path, 'r') as file:
+            markdown_content = file.read()
+
+        report_file_path = os.path.splitext(markdown_file_path)[0] + f"_report.md"
+        yield from self._stream_to_file(self._stream_summarize(markdown_content), report_file_path)
+        LOG.info(f"GitHub 项目报告已保存到 {report_file_path}")
+
+    def stream_hackernews_trends_report(self, markdown_file_path):
+        with open(markdown_file_path, 'r', encoding='utf-8') as file:
+            markdown_content = file.read()
+
+        report_file_path = os.path.splitext(markdown_file_path)[0] + f"_report.md"
+        yield from self._stream_to_file(self.llm.stream_hackernews_report(markdown_content), report_file_path)
+        LOG.info(f"Hackernews 趋势报告已保存到 {report_file_path}")
+
+    @staticmethod
+    def _stream_to_file(stream, report_file_path):
+        report = ''
+        for delta in stream:
+            report += delta
+            yield report, None
+        report = report.strip()
+        with open(report_file_path, 'w+', encoding='utf-8') as report_file:
+            report_file.write(report)
+        yield report, report_file_path
+
+    def _stream_summarize(self, markdown_content):
+        # 流式版本的 _summarize：分段时先并行总结各分段，只流式输出最终的合并结果
+        chunks = split_markdown(markdown_content, self.chunk_tokens)
+        if len(chunks) == 1:
+            yield from self.llm.stream_daily_report(markdown_content)
+            return
+
+        LOG.info(f"进展内容约 {estimate_tokens(markdown_content)} tokens，切分为 {len(chunks)} 段并行总结")
+        reports = self._collapse(self._map(self.llm.generate_daily_report, chunks))
+        if len(reports) == 1:
+            yield reports[0]
+        else:
+            yield from self.llm.stream_merge_reports(reports)
+
+    def _reduce(self, reports):
+        reports = self._collapse(reports)
+        return reports[0] if len(reports) == 1 else self.llm.merge_reports(reports)
+
+    def _collapse(self, reports, merge=None):
+        # 分段简报合起来仍超出预算时分组合并，逐层收敛到可以一次合并的数量；merge 默认为分段合并
+        merge = merge or self.llm.merge_reports
+        while len(reports) > 1 and estimate_tokens(''.join(reports)) > self.chunk_tokens:
+            groups = []
+            current = []
+            for report in reports:
+                if current and estimate_tokens(''.join(current + [report])) > self.chunk_tokens:
+                    groups.append(current)
+                    current = []
+                current.append(report)
+            groups.append(current)
+            if len(groups) == len(reports):
+                break  # 每份简报本身已接近预算，无法再分组，直接做最终合并
+            reports = self._map(lambda group: group[0] if len(group) == 1 else merge(group), groups)
+        return reports
+
     def generate_hackernews_trends_report(self,markdown_file_path):
         with open(markdown_file_path,'r',encoding='utf-8') as file:
             markdown_content=file.read()
 
-        report = self.llm.generate_hackernews_report(markdown_content)
+        with REPORT_SECONDS.time(kind='hackernews'):
+            report = self.llm.generate_hackernews_report(markdown_content)
         report_file_path = os.path.splitext(markdown_file_path)[0] + f"_report.md"
         with open(report_file_path, 'w+',encoding='utf-8') as report_file:
             report_file.write(report)
@@ -0,0 +1,60 @@
+# src/report_store.py
+
+import os  # 导入os模块用于创建数据目录
+import sqlite3  # 导入sqlite3保存每日简报
+import time
+from contextlib import closing
+from datetime import date, timedelta
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_reports (
+    repo TEXT NOT NULL,
+    day TEXT NOT NULL,
+    report TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (repo, day)
+);
+"""
+
+
+def rollup_days(days, until=None):
+    # 返回 [until - days, until] 内按先后排列的每一天，until 默认为今天，与按日期范围导出的窗口一致；
+    # 最后一天（until 当天）尚未结束，它的简报每次实时生成，不写入存储
+    until = until or date.today()
+    return [until - timedelta(days=offset) for offset in range(days, -1, -1)]
+
+
+# 每日简报存储：按 (仓库, 日期) 保存每一天的进展简报，多天的报告由这些简报汇总生成，
+# 只有缺少简报的日期才需要重新获取原始数据并调用模型
+class ReportStore:
+    def __init__(self, db_path='data/reports.db'):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')  # WAL 模式允许多个总结线程并发读写
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get_reports(self, repo, days):
+        # 返回 {日期: 简报}，没有简报的日期不在其中
+        if not days:
+            return {}
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                'SELECT day, report FROM daily_reports WHERE repo = ? AND day BETWEEN ? AND ?',
+                (repo, min(days).isoformat(), max(days).isoformat())
+            ).fetchall()
+        wanted = set(days)
+        reports = {date.fromisoformat(day): report for day, report in rows}
+        return {day: report for day, report in reports.items() if day in wanted}
+
+    def missing_days(self, repo, days):
+        stored = self.get_reports(repo, days)
+        return [day for day in days if day not in stored]
+
+    def put_report(self, repo, day, report):
+        with closing(self._connect()) as conn, conn:
+            conn.execute('INSERT OR REPLACE INTO daily_reports (repo, day, report, created_at) VALUES (?, ?, ?, ?)',
+                         (repo, day.isoformat(), report, time.time()))
@@ -0,0 +1,193 @@
+# src/scheduler.py
+
+import heapq  # 导入heapq维护按下次运行时间排序的任务堆
+import itertools
+import json  # 导入json持久化任务的上次运行时间
+import os
+import random  # 导入random为运行时间加入随机抖动
+import tempfile
+import threading  # 导入threading在后台线程中运行任务
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from logger import LOG  # 导入日志模块
+from metrics import JOB_SECONDS, ERRORS_TOTAL  # 导入任务耗时与错误指标
+
+CATCH_UP_SKIP = 'skip'  # 错过的运行直接跳过，等待下一个周期
+CATCH_UP_ONCE = 'once'  # 错过了一次或多次运行时，启动后立即补跑一次
+MAX_SLEEP_SECONDS = 600  # 单次休眠上限，系统时间被调整或机器休眠唤醒后也能及时校正
+
+
+# 定时任务：每 interval 秒运行一次，at 为 "HH:MM" 时运行时间对齐到该时刻
+class Job:
+    def __init__(self, name, func, interval, at=None, jitter=0, catch_up=CATCH_UP_ONCE, once=False):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.at = at
+        self.jitter = jitter  # 每次运行随机推迟 0~jitter 秒，避免多个实例同时请求外部接口
+        self.catch_up = catch_up
+        self.once = once  # 一次性任务，运行后不再安排
+        self.running = False  # 防止同一任务的两次运行重叠
+        self.next_run = None  # 下一次计划运行的时间戳（未加抖动）
+
+    def slot_after(self, now):
+        # 返回晚于 now 的最近一个计划运行时间
+        if self.at is None:
+            return now + self.interval
+        hour, minute = (int(part) for part in self.at.split(':'))
+        anchor = datetime.fromtimestamp(now).replace(hour=hour, minute=minute, second=0, microsecond=0).timestamp()
+        # anchor 可能在 now 之前或之后，按周期前后平移到 now 之后的第一个时刻
+        periods = (now - anchor) // self.interval + 1
+        return anchor + periods * self.interval
+
+
+# 事件驱动的调度器：按下次运行时间维护一个堆，主线程休眠到最近的截止时间才醒来，
+# 任务在线程池中运行，互不阻塞；记录每个任务的上次运行时间，重启后按策略补跑错过的运行
+class Scheduler:
+    def __init__(self, state_file=None, max_workers=4, profiler=None):
+        self.state_file = state_file  # 保存上次运行时间的 JSON 文件，为 None 时不持久化
+        self.profiler = profiler  # 设置后每次任务运行都会被剖析
+        self.jobs = {}
+        self._heap = []  # [(运行时间, 序号, 任务名, 类型)]，类型为 'run' 或提前触发的 'lead'
+        self._counter = itertools.count()
+        self._lead_hooks = []  # [(提前秒数, 回调)]
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._state = self._load_state()
+
+    def every(self, name, func, interval, at=None, jitter=0, catch_up=CATCH_UP_ONCE):
+        # 添加周期任务，并根据上次运行时间决定第一次运行的时间
+        job = Job(name, func, interval, at, jitter, catch_up)
+        now = time.time()
+        last_run = self._state.get(name)
+        if last_run is None or (catch_up == CATCH_UP_ONCE and job.slot_after(last_run) <= now):
+            # 从未运行过，或者上次运行之后至少错过了一个周期：立即运行一次
+            if last_run is not None:
+                LOG.info(f"[{name}]上次运行于 {datetime.fromtimestamp(last_run):%Y-%m-%d %H:%M}，补跑错过的运行")
+            first_run = now
+        else:
+            first_run = job.slot_after(now)
+        self._add(job, first_run)
+        return job
+
+    def once(self, name, func, delay):
+        # 添加 delay 秒后运行一次的任务，例如因速率限制推迟的仓库
+        job = Job(f'{name}#{next(self._counter)}', func, delay, once=True)  # 加序号，同名的一次性任务互不覆盖
+        self._add(job, time.time() + delay)
+        return job
+
+    def add_lead_hook(self, seconds, callback):
+        # 在每次周期任务运行前 seconds 秒调用 callback(job, run_at)，例如提前预热模型
+        self._lead_hooks.append((seconds, callback))
+
+    def next_run(self):
+        # 返回最近一个任务的计划运行时间戳，没有任务时返回 None
+        with self._condition:
+            runs = [job.next_run for job in self.jobs.values() if job.next_run is not None]
+        return min(runs) if runs else None
+
+    def _add(self, job, run_at):
+        with self._condition:
+            self.jobs[job.name] = job
+            self._push(job, run_at)
+            self._condition.notify()  # 唤醒主循环重新计算休眠时间
+
+    def _push(self, job, run_at):
+        job.next_run = run_at
+        deadline = run_at + (random.uniform(0, job.jitter) if job.jitter else 0)
+        heapq.heappush(self._heap, (deadline, next(self._counter), job.name, 'run'))
+        if not job.once:
+            for seconds, callback in self._lead_hooks:
+                if deadline - seconds > time.time():
+                    heapq.heappush(self._heap, (deadline - seconds, next(self._counter), job.name, ('lead', callback)))
+
+    def run_forever(self):
+        LOG.info(f"调度器启动，共 {len(self.jobs)} 个任务")
+        with self._condition:
+            while not self._stopped:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                deadline = self._heap[0][0]
+                wait = deadline - time.time()
+                if wait > 0:
+                    # 休眠到最近的截止时间；新增任务或停止时会被提前唤醒
+                    self._condition.wait(min(wait, MAX_SLEEP_SECONDS))
+                    continue
+                _, _, name, kind = heapq.heappop(self._heap)
+                job = self.jobs.get(name)
+                if job is None:
+                    continue
+                if kind == 'run':
+                    self._dispatch(job)
+                else:
+                    self._executor.submit(self._call_hook, kind[1], job)
+
+    def _dispatch(self, job):
+        # 在持有锁的情况下调用：提交任务运行，并安排下一次运行
+        scheduled_at = job.next_run
+        if job.once:
+            del self.jobs[job.name]
+        else:
+            self._push(job, job.slot_after(max(time.time(), scheduled_at)))
+        if job.running:
+            LOG.warning(f"[{job.name}]上一次运行尚未结束，跳过本次运行")
+            return
+        job.running = True
+        self._executor.submit(self._run, job, scheduled_at)
+
+    def _run(self, job, scheduled_at):
+        start = time.monotonic()
+        LOG.info(f"[{job.name}]开始运行（计划时间 {datetime.fromtimestamp(scheduled_at):%H:%M:%S}）")
+        try:
+            with self.profiler.profile(job.name.split('#')[0]) if self.profiler else nullcontext():
+                job.func()
+        except Exception as e:
+            ERRORS_TOTAL.inc(component='scheduler')
+            LOG.error(f"[{job.name}]运行失败：{str(e)}")
+        finally:
+            job.running = False
+            if not job.once:
+                self._save_run(job.name, scheduled_at)
+        elapsed = time.monotonic() - start
+        # 一次性任务名带序号，按原任务名统计
+        JOB_SECONDS.observe(elapsed, job=job.name.split('#')[0])
+        LOG.info(f"[{job.name}]运行结束，耗时 {elapsed:.1f}s")
+
+    def _call_hook(self, callback, job):
+        try:
+            callback(job, job.next_run)
+        except Exception as e:
+            LOG.error(f"[{job.name}]运行前回调失败：{str(e)}")
+
+    def stop(self, wait=True):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._executor.shutdown(wait=wait)
+
+    def _load_state(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            LOG.warning(f"读取调度状态失败：{str(e)}")
+            return {}
+
+    def _save_run(self, name, scheduled_at):
+        # 记录任务的上次运行时间，原子写入，避免进程被杀时留下损坏的文件
+        with self._condition:
+            self._state[name] = scheduled_at
+            if not self.state_file:
+                return
+            directory = os.path.dirname(self.state_file) or '.'
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                json.dump(self._state, file)
+            os.replace(tmp_path, self.state_file)
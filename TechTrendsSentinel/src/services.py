@@ -0,0 +1,41 @@
+# src/services.py
+
+from functools import cached_property
+from config import Config  # 导入配置管理类
+
+
+# 进程内共享的组件：首次访问时才导入对应模块并创建实例。
+# 例如 list 等只读写订阅列表的命令不会导入 openai、ollama、requests，也不会创建 LLM 和 GitHub 客户端
+class Services:
+    def __init__(self, config=None):
+        self.config = config or Config.shared()
+
+    @cached_property
+    def subscription_manager(self):
+        from subscription_manager import SubscriptionManager
+        return SubscriptionManager.from_config(self.config)
+
+    @cached_property
+    def github_client(self):
+        from github_client import GitHubClient
+        return GitHubClient.from_config(self.config)
+
+    @cached_property
+    def hackernews_client(self):
+        from hackernews_client import HackerNewsClient
+        return HackerNewsClient.from_config(self.config)
+
+    @cached_property
+    def llm(self):
+        from llm import LLM
+        return LLM(self.config)
+
+    @cached_property
+    def report_generator(self):
+        from report_generator import ReportGenerator
+        return ReportGenerator.from_config(self.llm, self.config)
+
+    @cached_property
+    def notifier(self):
+        from notifier import Notifier
+        return Notifier.from_config(self.config)
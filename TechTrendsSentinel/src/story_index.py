@@ -0,0 +1,103 @@
+# src/story_index.py
+
+import os  # 导入os模块用于创建数据目录
+import sqlite3  # 导入sqlite3持久化已见过的新闻
+import time
+from contextlib import closing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stories (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    score INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS story_scores (
+    id INTEGER NOT NULL,
+    seen_at REAL NOT NULL,
+    score INTEGER NOT NULL,
+    PRIMARY KEY (id, seen_at)
+);
+CREATE INDEX IF NOT EXISTS idx_stories_last_seen ON stories (last_seen);
+"""
+
+
+# 已见新闻索引：记录每条 HackerNews 新闻的首次/最近出现时间和分数历史，
+# 用于区分新上榜、热度快速上升和持续在榜的新闻
+class StoryIndex:
+    def __init__(self, db_path='data/hackernews_stories.db', retention_days=7):
+        self.db_path = db_path
+        self.retention_days = retention_days  # 超过该天数未再出现的新闻从索引中删除
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def lookup(self, stories):
+        # 只读查询：返回这些新闻已记录的状态 {id: (first_seen, last_seen, score)}，从未记录过的新闻不在其中
+        with closing(self._connect()) as conn:
+            return self._lookup(conn, [story.id for story in stories])
+
+    @staticmethod
+    def _lookup(conn, ids):
+        previous = {}
+        for start in range(0, len(ids), 500):  # 分批查询，避免超过 SQLite 的变量数上限
+            batch = ids[start:start + 500]
+            rows = conn.execute(
+                f"SELECT id, first_seen, last_seen, score FROM stories WHERE id IN ({','.join('?' * len(batch))})",
+                batch
+            )
+            previous.update((row[0], row[1:]) for row in rows)
+        return previous
+
+    def record(self, stories, now=None):
+        # 记录本次抓取到的新闻，返回记录之前的状态 {id: (first_seen, last_seen, score)}，从未见过的新闻不在其中
+        now = now or time.time()
+        with closing(self._connect()) as conn, conn:
+            previous = self._lookup(conn, [story.id for story in stories])
+            conn.executemany(
+                'INSERT INTO stories (id, title, url, first_seen, last_seen, score) VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(id) DO UPDATE SET title = excluded.title, url = excluded.url, '
+                'last_seen = excluded.last_seen, score = excluded.score',
+                [(story.id, story.title, story.url, now, now, story.score) for story in stories]
+            )
+            conn.executemany('INSERT OR REPLACE INTO story_scores (id, seen_at, score) VALUES (?, ?, ?)',
+                             [(story.id, now, story.score) for story in stories])
+        return previous
+
+    def score_history(self, story_id):
+        # 返回 [(seen_at, score)]，按时间排序
+        with closing(self._connect()) as conn:
+            return conn.execute('SELECT seen_at, score FROM story_scores WHERE id = ? ORDER BY seen_at',
+                                (story_id,)).fetchall()
+
+    def prune(self, now=None):
+        # 删除超过保留期未再出现的新闻及其分数历史，返回删除的新闻数
+        cutoff = (now or time.time()) - self.retention_days * 86400
+        with closing(self._connect()) as conn, conn:
+            conn.execute('DELETE FROM story_scores WHERE id IN (SELECT id FROM stories WHERE last_seen < ?)',
+                         (cutoff,))
+            return conn.execute('DELETE FROM stories WHERE last_seen < ?', (cutoff,)).rowcount
+
+
+def classify(stories, previous, rising_points_per_hour=50, now=None):
+    # 把本次抓取的新闻分为 (新上榜, 热度快速上升, 持续在榜) 三组；
+    # 热度上升按距上次出现以来每小时增加的分数计算
+    now = now or time.time()
+    new, rising, trending = [], [], []
+    for story in stories:
+        if story.id not in previous:
+            new.append(story)
+            continue
+        first_seen, last_seen, score = previous[story.id]
+        hours = max((now - last_seen) / 3600, 1 / 60)  # 至少按 1 分钟计算，避免连续两次运行时除以接近 0 的数
+        if (story.score - score) / hours >= rising_points_per_hour:
+            rising.append((story, story.score - score))
+        else:
+            trending.append(story)
+    return new, rising, trending
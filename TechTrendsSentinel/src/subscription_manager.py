@@ -1,27 +1,192 @@
+# src/subscription_manager.py
+
 import json
+import os  # 导入os模块用于创建数据目录和原子替换导出文件
+import sqlite3  # 导入sqlite3作为订阅存储
+import tempfile
+import time
+from contextlib import closing
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import List, Optional
+
+from logger import LOG  # 导入日志模块
+from rate_limiter import PRIORITY_HIGH, PRIORITY_LOW  # 订阅的优先级与速率限制的优先级一致
+
+# 定时任务的实际开始时间会因随机推迟和上次运行耗时而浮动，一小时内即将到期的订阅视为已到期
+DUE_GRACE_SECONDS = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscriptions (
+    repo TEXT PRIMARY KEY,
+    frequency_days INTEGER,
+    recipients TEXT,
+    priority TEXT NOT NULL DEFAULT 'high',
+    added_at REAL NOT NULL,
+    last_run_at REAL,
+    next_run_at REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_subscriptions_due ON subscriptions (next_run_at);
+"""
+
+COLUMNS = 'repo, frequency_days, recipients, priority, last_run_at, next_run_at'
+
+
+@dataclass
+class Subscription:
+    repo: str
+    frequency_days: Optional[int] = None  # 报告周期（天），为 None 时使用全局的 github_progress_frequency_days
+    recipients: List[str] = field(default_factory=list)  # 收件人，为空时发送到 email.to
+    priority: str = PRIORITY_HIGH  # 速率限制配额不足时，low 优先级的仓库推迟到下一个窗口
+    last_run_at: Optional[float] = None
+    next_run_at: float = 0
 
+    @classmethod
+    def from_row(cls, row):
+        repo, frequency_days, recipients, priority, last_run_at, next_run_at = row
+        return cls(repo, frequency_days, json.loads(recipients) if recipients else [], priority,
+                   last_run_at, next_run_at)
+
+    def to_dict(self):
+        # 导出格式只包含可编辑的设置，不包含运行时间
+        data = {'repo': self.repo}
+        if self.frequency_days:
+            data['frequency_days'] = self.frequency_days
+        if self.recipients:
+            data['recipients'] = self.recipients
+        if self.priority != PRIORITY_HIGH:
+            data['priority'] = self.priority
+        return data
+
+
+# 订阅存储：以仓库名为主键保存在 SQLite 中，查询、增删为 O(1)，每次修改都是一个事务，
+# 命令行工具、Gradio 界面和守护进程可以同时读写；next_run_at 上的索引用于查询到期的订阅
 class SubscriptionManager:
-    def __init__(self, subscriptions_file):
-        self.subscriptions_file = subscriptions_file
-        self.subscriptions = self.load_subscriptions()
-    
-    def load_subscriptions(self):
-        with open(self.subscriptions_file, 'r') as f:
-            return json.load(f)
-    
-    def save_subscriptions(self):
-        with open(self.subscriptions_file, 'w') as f:
-            json.dump(self.subscriptions, f, indent=4)
-    
+    def __init__(self, db_path='data/subscriptions.db', import_file=None, default_frequency_days=1):
+        self.db_path = db_path
+        self.default_frequency_days = default_frequency_days
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')  # WAL 模式允许并发读写
+            conn.executescript(SCHEMA)
+            empty = conn.execute('SELECT 1 FROM subscriptions LIMIT 1').fetchone() is None
+        if empty and import_file and os.path.exists(import_file):
+            # 首次使用时导入原有的 JSON 订阅列表
+            count = self.import_file(import_file)
+            LOG.info(f"从 {import_file} 导入 {count} 个订阅到 {db_path}")
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.subscriptions_db, config.subscriptions_file, config.freq_days)
+
+    def _connect(self):
+        # 每次操作使用独立连接，便于在多个线程中使用
+        return sqlite3.connect(self.db_path, timeout=30)
+
     def list_subscriptions(self):
-        return self.subscriptions
-    
-    def add_subscription(self, repo):
-        if repo not in self.subscriptions:
-            self.subscriptions.append(repo)
-            self.save_subscriptions()
-    
+        # 返回所有订阅的仓库名，按名称排序
+        with closing(self._connect()) as conn:
+            return [row[0] for row in conn.execute('SELECT repo FROM subscriptions ORDER BY repo')]
+
+    def iter_subscriptions(self):
+        with closing(self._connect()) as conn:
+            for row in conn.execute(f'SELECT {COLUMNS} FROM subscriptions ORDER BY repo'):
+                yield Subscription.from_row(row)
+
+    def get_subscription(self, repo):
+        with closing(self._connect()) as conn:
+            row = conn.execute(f'SELECT {COLUMNS} FROM subscriptions WHERE repo = ?', (repo,)).fetchone()
+        return Subscription.from_row(row) if row else None
+
+    def add_subscription(self, repo, frequency_days=None, recipients=None, priority=None):
+        # 添加订阅；仓库已订阅时只更新给出的设置，返回是否新添加
+        return self.import_subscriptions([{'repo': repo, 'frequency_days': frequency_days,
+                                           'recipients': recipients, 'priority': priority}]) > 0
+
     def remove_subscription(self, repo):
-        if repo in self.subscriptions:
-            self.subscriptions.remove(repo)
-            self.save_subscriptions()
\ No newline at end of file
+        with closing(self._connect()) as conn, conn:
+            return conn.execute('DELETE FROM subscriptions WHERE repo = ?', (repo,)).rowcount > 0
+
+    def import_subscriptions(self, items, batch_size=500):
+        # 批量添加或更新订阅，items 为仓库名或 to_dict() 格式的字典，全部写入在一个事务中完成；返回新添加的数量
+        now = time.time()
+        added = 0
+        items = iter(items)
+        with closing(self._connect()) as conn, conn:
+            while True:
+                batch = list(islice(items, batch_size))
+                if not batch:
+                    break
+                rows = [self._row(item, now) for item in batch]
+                before = conn.total_changes
+                conn.executemany('INSERT OR IGNORE INTO subscriptions (repo, frequency_days, recipients, priority, '
+                                 'added_at) VALUES (:repo, :frequency_days, :recipients, :insert_priority, :now)', rows)
+                added += conn.total_changes - before
+                conn.executemany(
+                    'UPDATE subscriptions SET frequency_days = COALESCE(:frequency_days, frequency_days), '
+                    'recipients = COALESCE(:recipients, recipients), priority = COALESCE(:priority, priority) '
+                    'WHERE repo = :repo', rows
+                )
+        return added
+
+    @staticmethod
+    def _row(item, now):
+        if isinstance(item, str):
+            item = {'repo': item}
+        priority = item.get('priority')
+        if priority not in (None, PRIORITY_HIGH, PRIORITY_LOW):
+            raise ValueError(f"不支持的优先级：{priority}（可用：{PRIORITY_HIGH}、{PRIORITY_LOW}）")
+        recipients = item.get('recipients')
+        return {
+            'repo': item['repo'],
+            'frequency_days': item.get('frequency_days'),
+            'recipients': json.dumps(recipients) if recipients is not None else None,
+            'priority': priority,
+            'insert_priority': priority or PRIORITY_HIGH,
+            'now': now,
+        }
+
+    def export_subscriptions(self):
+        return [subscription.to_dict() for subscription in self.iter_subscriptions()]
+
+    def import_file(self, path):
+        # 从 JSON 文件导入，文件内容为仓库名或订阅字典的列表（即原有的 subscriptions.json 或 export_file 的输出）
+        with open(path, 'r', encoding='utf-8') as file:
+            return self.import_subscriptions(json.load(file))
+
+    def export_file(self, path):
+        # 原子写入，避免导出中断时留下损坏的文件；返回导出的数量
+        subscriptions = self.export_subscriptions()
+        directory = os.path.dirname(path) or '.'
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(subscriptions, file, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return len(subscriptions)
+
+    def due_subscriptions(self, now=None):
+        # 返回到期需要生成报告的订阅，高优先级在前
+        now = now or time.time()
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f'SELECT {COLUMNS} FROM subscriptions WHERE next_run_at <= ? '
+                f'ORDER BY priority = ?, next_run_at, repo', (now + DUE_GRACE_SECONDS, PRIORITY_LOW)
+            ).fetchall()
+        return [Subscription.from_row(row) for row in rows]
+
+    def min_frequency_days(self):
+        # 所有订阅中最短的报告周期（天），守护进程据此决定检查到期订阅的间隔；没有订阅时为默认周期
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT MIN(COALESCE(frequency_days, ?)) FROM subscriptions',
+                               (self.default_frequency_days,)).fetchone()
+        return min(row[0] or self.default_frequency_days, self.default_frequency_days)
+
+    def mark_run(self, repos, now=None):
+        # 记录仓库本次的运行时间，下次到期时间为本次加上各自的报告周期
+        now = now or time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                'UPDATE subscriptions SET last_run_at = ?, '
+                'next_run_at = ? + COALESCE(frequency_days, ?) * 86400 WHERE repo = ?',
+                [(now, now, self.default_frequency_days, repo) for repo in repos]
+            )
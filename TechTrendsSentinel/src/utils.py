@@ -1 +1,34 @@
-# Add utility functions as needed
+# src/utils.py
+
+import re
+
+_CJK_PATTERN = re.compile(r'[\u3000-\u303f\u4e00-\u9fff\uff00-\uffef]')
+
+
+def estimate_tokens(text):
+    # 粗略估算 token 数：中日韩字符约 1 个/token，其余字符约 4 个/token
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def split_markdown(markdown_content, max_tokens):
+    # 按行把 Markdown 切成不超过 max_tokens 的块，每块都带上一级标题，保留上下文
+    lines = markdown_content.splitlines(keepends=True)
+    header = lines[0] if lines and lines[0].startswith('# ') else ''
+    body = lines[1:] if header else lines
+    budget = max(1, max_tokens - estimate_tokens(header))
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for line in body:
+        line_tokens = estimate_tokens(line)
+        if current and current_tokens + line_tokens > budget:
+            chunks.append(header + ''.join(current))
+            current = []
+            current_tokens = 0
+        current.append(line)
+        current_tokens += line_tokens
+    if current or not chunks:
+        chunks.append(header + ''.join(current))
+    return chunks
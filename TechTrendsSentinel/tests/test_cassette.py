@@ -0,0 +1,119 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+from src.cassette import Cassette, CassetteMiss, RECORD, REPLAY
+from src.github_client import GitHubClient
+from src.hackernews_client import HackerNewsClient
+from src.llm import LLM
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # GitHub 接口返回一条问题，其余路径返回保存的 HackerNews 首页
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        if self.path.startswith('/repos/'):
+            body = json.dumps([{'title': 'recorded issue', 'number': 3, 'id': 3,
+                                'updated_at': '2024-08-24T10:00:00Z'}]).encode()
+            content_type = 'application/json'
+        else:
+            with open(os.path.join(FIXTURES, 'hackernews_front_page.html'), 'rb') as file:
+                body = file.read()
+            content_type = 'text/html; charset=utf-8'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestCassette(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'cassette.db')
+
+    def _start_server(self):
+        StubHandler.requests = 0
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def _stop_server(self, server):
+        server.shutdown()
+        server.server_close()
+
+    def test_replays_in_recorded_order_and_ignores_dates(self):
+        recorder = Cassette(self.path, RECORD)
+        recorder.record('http', {'url': '/issues?since=2024-08-23'}, 'first')
+        recorder.record('http', {'url': '/issues?since=2024-08-23'}, 'second')
+
+        player = Cassette(self.path, REPLAY)
+        # 录制之后的日期也能匹配；录制的次数用完后重复最后一次
+        request = {'url': '/issues?since=2024-09-30'}
+        self.assertEqual([player.lookup('http', request) for _ in range(3)], ['first', 'second', 'second'])
+        with self.assertRaises(CassetteMiss):
+            player.lookup('http', {'url': '/pulls'})
+        self.assertEqual(player.counts(), {'http': 2})
+
+    def test_http_responses_replay_without_network(self):
+        server = self._start_server()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+        recorded = HackerNewsClient(base_url=base_url, requests_per_second=100,
+                                    cassette=Cassette(self.path, RECORD)).fetch_top_stories()
+        github = GitHubClient('secret-token', api_url=base_url, cassette=Cassette(self.path, RECORD))
+        self.assertEqual(github.fetch_issues('owner/repo')[0]['title'], 'recorded issue')
+        self._stop_server(server)
+        self.assertEqual(StubHandler.requests, 2)
+
+        replayed = HackerNewsClient(base_url=base_url, requests_per_second=100,
+                                    cassette=Cassette(self.path, REPLAY)).fetch_top_stories()
+        self.assertEqual([story.id for story in replayed], [story.id for story in recorded])
+        github = GitHubClient('secret-token', api_url=base_url, cassette=Cassette(self.path, REPLAY))
+        self.assertEqual(github.fetch_issues('owner/repo')[0]['title'], 'recorded issue')
+        self.assertEqual(StubHandler.requests, 2)
+
+        # 请求头不写入录制文件，令牌不会泄露
+        with sqlite3.connect(self.path) as conn:
+            payloads = [zlib.decompress(row[0]) for row in conn.execute('SELECT payload FROM interactions')]
+        self.assertFalse(any(b'secret-token' in payload for payload in payloads))
+
+    def _llm(self, cassette):
+        # 提示词文件和 OpenAI 客户端在首次使用时才加载，这里不会用到
+        llm = LLM(SimpleNamespace(is_ollama=False, dry_run=False, model_name='gpt-4o-mini', llm_cache_dir='',
+                                  cassette_mode='', llm_max_concurrency={}, llm_timeout_seconds=30,
+                                  llm_max_retries=0))
+        llm.cassette = cassette
+        return llm
+
+    def test_llm_completions_replay_without_model_calls(self):
+        messages = [{'role': 'user', 'content': '# Progress for owner/repo (2024-08-23 to 2024-08-24)'}]
+        recorder = self._llm(Cassette(self.path, RECORD))
+        recorder._call_model = lambda messages: '# Report'
+        self.assertEqual(recorder._generate(messages), '# Report')
+
+        player = self._llm(Cassette(self.path, REPLAY))
+        player._call_model = player._stream_model = mock_model_call
+        self.assertEqual(player._generate(messages), '# Report')
+        # 流式调用回放同一条录制
+        self.assertEqual(''.join(player._stream(messages)), '# Report')
+
+
+def mock_model_call(messages):
+    raise AssertionError('replay must not call the model')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import os
+import tempfile
+import time
+import unittest
+from src.disk_cache import DiskCache
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def test_get_set(self):
+        cache = DiskCache(self.cache_dir.name)
+        cache.set('key', {'body': [1, 2, 3]})
+        self.assertEqual(cache.get('key'), {'body': [1, 2, 3]})
+        self.assertIsNone(cache.get('missing'))
+
+    def test_evicts_least_recently_used_when_over_size(self):
+        cache = DiskCache(self.cache_dir.name, max_size_mb=0.002)  # 约2KB
+        cache.set('old', 'x' * 900)
+        old_path = cache._path('old')
+        os.utime(old_path, (time.time() - 60, time.time() - 60))
+        cache.set('new', 'y' * 900)
+        cache.set('newest', 'z' * 900)
+
+        self.assertIsNone(cache.get('old'))
+        self.assertEqual(cache.get('newest'), 'z' * 900)
+        self.assertGreaterEqual(cache.evictions, 1)
+
+    def test_expired_entries_are_dropped(self):
+        cache = DiskCache(self.cache_dir.name, ttl_seconds=0)
+        cache.set('key', 'value')
+        time.sleep(0.01)
+        self.assertIsNone(cache.get('key'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from src.github_client import GitHubClient, EventStore
+
+
+class SinceRecordingHandler(BaseHTTPRequestHandler):
+    # 本地桩服务：记录每个请求的 since 参数，返回一个以请求路径区分的条目
+    requests_seen = []
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        since = parse_qs(parsed.query).get('since', [None])[0]
+        type(self).requests_seen.append((parsed.path, since))
+        if parsed.path.endswith('/commits'):
+            items = [{'sha': 'abc', 'commit': {'committer': {'date': '2099-01-01T00:00:00Z'}}}]
+        else:
+            items = [{'id': 1, 'number': 1, 'title': 'issue', 'updated_at': '2099-01-01T00:00:00Z'}]
+        body = json.dumps(items).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestEventStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = EventStore(os.path.join(self.tmp_dir.name, 'events.db'))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_upsert_and_iter_events(self):
+        self.store.upsert_events('owner/repo', 'issues', [
+            {'id': 1, 'title': 'old', 'updated_at': '2024-01-01T00:00:00Z'},
+            {'id': 2, 'title': 'new', 'updated_at': '2024-01-03T00:00:00Z'},
+        ])
+        # 相同 id 的条目以新数据覆盖
+        self.store.upsert_events('owner/repo', 'issues', [
+            {'id': 1, 'title': 'updated', 'updated_at': '2024-01-02T00:00:00Z'},
+        ])
+
+        titles = [issue['title'] for issue in self.store.iter_events('owner/repo', 'issues')]
+        self.assertEqual(titles, ['updated', 'new'])
+        recent = list(self.store.iter_events('owner/repo', 'issues', since='2024-01-03'))
+        self.assertEqual([issue['id'] for issue in recent], [2])
+
+    def test_cursor(self):
+        self.assertIsNone(self.store.get_cursor('owner/repo', 'issues'))
+        self.store.set_cursor('owner/repo', 'issues', '2024-01-02T00:00:00Z')
+        self.assertEqual(self.store.get_cursor('owner/repo', 'issues'), '2024-01-02T00:00:00Z')
+
+    def test_sync_repo_fetches_only_delta(self):
+        SinceRecordingHandler.requests_seen = []
+        server = ThreadingHTTPServer(('127.0.0.1', 0), SinceRecordingHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            client = GitHubClient('token', api_url=f'http://127.0.0.1:{server.server_port}',
+                                  event_store=self.store)
+            client.sync_repo('owner/repo', 7)
+            cursor = self.store.get_cursor('owner/repo', 'issues')
+            SinceRecordingHandler.requests_seen = []
+            client.sync_repo('owner/repo', 7)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        issue_since = [since for path, since in SinceRecordingHandler.requests_seen if path.endswith('/issues')]
+        self.assertEqual(issue_since, [cursor])
+        self.assertEqual(len(list(self.store.iter_events('owner/repo', 'commits'))), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,197 @@
+import json
+import os
+import tempfile
+import threading
+import time
 import unittest
-from src.github_client import GitHubClient
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.github_client import GitHubClient, HTTPCache
+
+
+class StubGitHubHandler(BaseHTTPRequestHandler):
+    # 本地 GitHub REST 桩服务：每个请求延迟 delay 秒，并记录同时进行中的请求数
+    delay = 0.2
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+    paths = []
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+            cls.paths.append(self.path)
+        time.sleep(cls.delay)
+        body = json.dumps([{'title': f'item for {self.path}', 'number': 1}]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with cls.lock:
+            cls.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PaginatedGitHubHandler(BaseHTTPRequestHandler):
+    # 本地分页桩服务：共 pages 页，每页通过 Link: rel="next" 指向下一页
+    pages = 3
+    per_page_seen = []
+
+    def do_GET(self):
+        path, _, query = self.path.partition('?')
+        params = dict(pair.split('=', 1) for pair in query.split('&') if pair)
+        page = int(params.get('page', 1))
+        type(self).per_page_seen.append(params.get('per_page'))
+        items = [{'title': f'issue {page}-{i}', 'number': page * 10 + i,
+                  'updated_at': f'2024-01-0{9 - page}T00:00:00Z'} for i in range(2)]
+        if page == 1:
+            items[1]['closed_at'] = '2024-01-07T12:00:00Z'  # 01-07 关闭、01-08 又有更新
+        body = json.dumps(items).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        if page < self.pages:
+            next_url = f'http://{self.headers["Host"]}{path}?per_page=100&page={page + 1}'
+            self.send_header('Link', f'<{next_url}>; rel="next"')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ETagGitHubHandler(BaseHTTPRequestHandler):
+    # 本地条件请求桩服务：带 If-None-Match 且匹配时返回 304
+    etag = '"v1"'
+    statuses = []
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == self.etag:
+            type(self).statuses.append(304)
+            self.send_response(304)
+            self.send_header('ETag', self.etag)
+            self.end_headers()
+            return
+        type(self).statuses.append(200)
+        body = json.dumps([{'title': 'cached issue', 'number': 7}]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', self.etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
 
 class TestGitHubClient(unittest.TestCase):
+    def setUp(self):
+        StubGitHubHandler.in_flight = 0
+        StubGitHubHandler.max_in_flight = 0
+        StubGitHubHandler.paths = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubGitHubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.api_url = f'http://127.0.0.1:{self.server.server_port}'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
     def test_fetch_updates(self):
-        # Add test cases for GitHubClient
-        pass
+        client = GitHubClient('token', max_concurrency=3, api_url=self.api_url)
+        start = time.monotonic()
+        updates = client.fetch_updates('owner/repo', since='2024-01-01')
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(set(updates), {'commits', 'issues', 'pull_requests'})
+        self.assertEqual(len(updates['issues']), 1)
+        # 三个接口并发请求，耗时应接近一次请求而不是三次之和
+        self.assertLess(elapsed, 3 * StubGitHubHandler.delay)
+
+    def test_fetch_updates_batch_respects_concurrency_limit(self):
+        client = GitHubClient('token', max_concurrency=4, api_url=self.api_url)
+        repos = [f'owner/repo{i}' for i in range(6)]
+        results, deferred = client.fetch_updates_batch(repos)
+
+        self.assertEqual(set(results), set(repos))
+        self.assertEqual(deferred, [])
+        self.assertEqual(len(StubGitHubHandler.paths), 3 * len(repos))
+        self.assertLessEqual(StubGitHubHandler.max_in_flight, 4)
+
+
+class TestGitHubClientPagination(unittest.TestCase):
+    def setUp(self):
+        PaginatedGitHubHandler.per_page_seen = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), PaginatedGitHubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = GitHubClient('token', api_url=f'http://127.0.0.1:{self.server.server_port}')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_iter_issues_follows_next_links(self):
+        issues = list(self.client.iter_issues('owner/repo', since='2024-01-01'))
+
+        self.assertEqual(len(issues), 6)
+        self.assertEqual(PaginatedGitHubHandler.per_page_seen, ['100'] * 3)
+
+    def test_iter_pull_requests_stops_before_since(self):
+        # 第1页更新于 01-08，第2页 01-07，第3页 01-06；since=01-08 时读到第2页即停止，不应请求第3页
+        pull_requests = list(self.client.iter_pull_requests('owner/repo', since='2024-01-08'))
+
+        self.assertEqual(len(pull_requests), 2)
+        self.assertEqual(len(PaginatedGitHubHandler.per_page_seen), 2)
+
+    def test_export_progress_by_day_excludes_later_updates(self):
+        # 导出 01-07 这一天时，只包含在这一天关闭的问题
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            try:
+                files = self.client.export_progress_by_day('owner/repo', [date(2024, 1, 7)])
+                with open(files[date(2024, 1, 7)]) as file:
+                    content = file.read()
+            finally:
+                os.chdir(cwd)
+
+        self.assertIn('# Progress for owner/repo (2024-01-07 to 2024-01-08)', content)
+        self.assertNotIn('issue 1-0', content)
+        self.assertIn('issue 1-1', content)  # 按关闭时间归入 01-07，不因之后的更新而归入 01-08
+        self.assertIn('issue 2-0', content)
+        self.assertNotIn('issue 3-0', content)
+
+
+class TestGitHubClientCache(unittest.TestCase):
+    def setUp(self):
+        ETagGitHubHandler.statuses = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), ETagGitHubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache = HTTPCache(self.cache_dir.name)
+        self.client = GitHubClient('token', api_url=f'http://127.0.0.1:{self.server.server_port}',
+                                   http_cache=self.cache)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.cache_dir.cleanup()
+
+    def test_not_modified_served_from_cache(self):
+        first = self.client.fetch_issues('owner/repo', since='2024-01-01')
+        second = self.client.fetch_issues('owner/repo', since='2024-01-01')
+
+        self.assertEqual(first, second)
+        self.assertEqual(ETagGitHubHandler.statuses, [200, 304])
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
 
 if __name__ == '__main__':
     unittest.main()
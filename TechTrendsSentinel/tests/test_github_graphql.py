@@ -0,0 +1,142 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import unittest
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.event_store import EventStore, KINDS
+from src.github_client import GitHubClient
+
+
+class StubGraphQLHandler(BaseHTTPRequestHandler):
+    # 本地 GraphQL 桩服务：超过 max_repos 个仓库的查询返回 502，模拟查询过大超时；
+    # 包含 failing_repos 中仓库的查询返回 401
+    max_repos = 2
+    failing_repos = set()
+    batch_sizes = []
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        aliases = sorted(set(re.findall(r'(r\d+): repository', payload['query'])))
+        type(self).batch_sizes.append(len(aliases))
+        variables = payload['variables']
+        repos = {f"{variables[alias + '_owner']}/{variables[alias + '_name']}" for alias in aliases}
+        if repos & self.failing_repos:
+            self.send_response(401)
+            self.end_headers()
+            return
+        if len(aliases) > self.max_repos:
+            self.send_response(502)
+            self.end_headers()
+            return
+        data = {'rateLimit': {'cost': 1, 'remaining': 4999, 'resetAt': '2099-01-01T00:00:00Z'}}
+        for alias in aliases:
+            repo = f"{variables[alias + '_owner']}/{variables[alias + '_name']}"
+            node = {'databaseId': 1, 'number': 1, 'title': f'{repo} issue', 'url': 'https://example.com',
+                    'state': 'CLOSED', 'closedAt': '2099-01-01T00:00:00Z', 'mergedAt': None,
+                    'updatedAt': '2099-01-01T00:00:00Z'}
+            data[alias] = {
+                'issues': {'pageInfo': {'hasNextPage': False}, 'nodes': [node]},
+                'pullRequests': {'pageInfo': {'hasNextPage': False}, 'nodes': [node]},
+                'defaultBranchRef': {'target': {'history': {'pageInfo': {'hasNextPage': False}, 'nodes': [
+                    {'oid': 'abc', 'url': 'https://example.com', 'messageHeadline': 'commit',
+                     'committedDate': '2099-01-01T00:00:00Z', 'author': {'name': 'dev'}}
+                ]}}},
+            }
+        body = json.dumps({'data': data}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestGitHubGraphQL(unittest.TestCase):
+    def setUp(self):
+        StubGraphQLHandler.batch_sizes = []
+        StubGraphQLHandler.failing_repos = set()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubGraphQLHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = GitHubClient('token', api_url=f'http://127.0.0.1:{self.server.server_port}',
+                                   backend='graphql', graphql_batch_size=4)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_fetch_updates_batch_splits_oversized_batches(self):
+        repos = [f'owner/repo{i}' for i in range(5)]
+        updates, deferred = self.client.fetch_updates_batch(repos, since='2024-01-01')
+
+        self.assertEqual(set(updates), set(repos))
+        self.assertEqual(deferred, [])
+        self.assertEqual(updates['owner/repo3']['issues'][0]['title'], 'owner/repo3 issue')
+        self.assertEqual(updates['owner/repo3']['commits'][0]['sha'], 'abc')
+        # 预先切成 4 + 1，4 个仓库的批次返回 502 后拆成 2 + 2
+        self.assertEqual(StubGraphQLHandler.batch_sizes, [4, 2, 2, 1])
+        self.assertEqual(self.client.graphql.total_cost, 3)
+
+    def test_failed_batch_does_not_affect_other_batches(self):
+        # 预先切成 4 + 1：第一批的 401 只让这 4 个仓库失败，不会中断整个批量获取
+        StubGraphQLHandler.failing_repos = {'owner/repo0'}
+        repos = [f'owner/repo{i}' for i in range(5)]
+        updates, deferred = self.client.fetch_updates_batch(repos, since='2024-01-01')
+
+        self.assertEqual(set(updates), {'owner/repo4'})
+        self.assertEqual(deferred, [])
+
+    def test_failed_repos_keep_cursor_and_get_no_report(self):
+        # 每个仓库单独一批，只有 owner/bad 所在的批次返回 401
+        self.client.graphql.max_batch_size = 1
+        StubGraphQLHandler.failing_repos = {'owner/bad'}
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            try:
+                store = EventStore(os.path.join(tmp_dir, 'events.db'))
+                self.client.event_store = store
+                files, deferred = self.client.export_progress_batch(['owner/good', 'owner/bad'], 1)
+                cursors = {repo: [store.get_cursor(repo, kind) for kind in KINDS]
+                           for repo in ('owner/good', 'owner/bad')}
+            finally:
+                os.chdir(cwd)
+
+        self.assertEqual(set(files), {'owner/good'})
+        self.assertTrue(all(cursors['owner/good']))
+        self.assertEqual(cursors['owner/bad'], [None, None, None])
+
+    def test_export_progress_by_day_batch_uses_one_query(self):
+        # 两个仓库缺少的日期由一次查询获取，再按更新时间拆分到各天；没有缺失日期的仓库不查询
+        days_by_repo = {'owner/a': [date(2098, 12, 31), date(2099, 1, 1)], 'owner/b': [date(2099, 1, 1)],
+                        'owner/done': []}
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            try:
+                files, deferred = self.client.export_progress_by_day_batch(days_by_repo)
+                contents = {repo: {day: open(path).read() for day, path in repo_files.items()}
+                            for repo, repo_files in files.items()}
+            finally:
+                os.chdir(cwd)
+
+        self.assertEqual(StubGraphQLHandler.batch_sizes, [2])
+        self.assertEqual(contents['owner/done'], {})
+        self.assertIn('owner/a issue', contents['owner/a'][date(2099, 1, 1)])
+        self.assertNotIn('owner/a issue', contents['owner/a'][date(2098, 12, 31)])
+        self.assertIn('owner/b issue', contents['owner/b'][date(2099, 1, 1)])
+
+    def test_fetch_updates_uses_same_interface(self):
+        updates = self.client.fetch_updates('owner/repo', since='2024-01-01')
+
+        self.assertEqual(set(updates), {'commits', 'issues', 'pull_requests'})
+        self.assertEqual(updates['pull_requests'][0]['number'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from src.hackernews_client import HackerNewsClient
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def _read_fixture(name):
+    with open(os.path.join(FIXTURES, name), 'r', encoding='utf-8') as file:
+        return file.read()
+
+
+def _story_row(story_id, rank, title):
+    return (f'<tr class="athing submission" id="{story_id}"><td class="title"><span class="rank">{rank}.</span></td>'
+            f'<td class="title"><span class="titleline"><a href="https://example.com/{story_id}">{title}</a></span>'
+            f'</td></tr><tr><td colspan="2"></td><td class="subtext"><span class="subline">'
+            f'<span class="score" id="score_{story_id}">10 points</span> by <a href="user?id=u" class="hnuser">u</a> '
+            f'<span class="age" title="2024-08-24T10:00:00 1724493600"><a href="item?id={story_id}">1 hour ago</a>'
+            f'</span> | <a href="item?id={story_id}">3&nbsp;comments</a></span></td></tr>')
+
+
+class StubHackerNewsHandler(BaseHTTPRequestHandler):
+    # 本地 HackerNews 桩服务：第一页使用保存的首页，第二页包含一条重复和一条新的新闻，/show 包含一条新的新闻
+    pages = {}
+    paths = []
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        cls = type(self)
+        with cls.lock:
+            cls.paths.append(self.path)
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        time.sleep(0.2)
+        with cls.lock:
+            cls.in_flight -= 1
+        if parsed.path == '/item':
+            body = cls.pages['item']
+        else:
+            body = cls.pages.get((parsed.path, query.get('p', ['1'])[0]))
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = body.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHackerNewsClient(unittest.TestCase):
+    def setUp(self):
+        StubHackerNewsHandler.pages = {
+            ('/news', '1'): _read_fixture('hackernews_front_page.html'),
+            ('/news', '2'): '<table>' + _story_row(41345678, 31, 'Duplicate') + _story_row(1, 32, 'Page two') + '</table>',
+            ('/show', '1'): '<table>' + _story_row(2, 1, 'Show HN: stub') + '</table>',
+            'item': _read_fixture('hackernews_item.html'),
+        }
+        StubHackerNewsHandler.paths = []
+        StubHackerNewsHandler.in_flight = 0
+        StubHackerNewsHandler.max_in_flight = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHackerNewsHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_fetches_pages_concurrently_and_deduplicates(self):
+        client = HackerNewsClient(base_url=self.base_url, pages=2, extra_feeds=['show'], requests_per_second=100)
+        start = time.monotonic()
+        stories = client.fetch_top_stories()
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(len(stories), 32)
+        self.assertEqual([story.id for story in stories[-2:]], [1, 2])
+        self.assertEqual(stories[0].title, 'Show HN: A tiny SQLite-backed job queue')
+        self.assertEqual(StubHackerNewsHandler.max_in_flight, 3)
+        self.assertLess(elapsed, 0.5)
+
+    def test_missing_page_does_not_fail_the_crawl(self):
+        client = HackerNewsClient(base_url=self.base_url, pages=3, requests_per_second=100)
+        self.assertEqual(len(client.fetch_top_stories()), 31)
+
+    def test_all_pages_failing_returns_none(self):
+        client = HackerNewsClient(base_url=self.base_url, extra_feeds=['newest'], requests_per_second=100)
+        client.base_url += '/missing'
+        self.assertIsNone(client.fetch_top_stories())
+
+    def test_samples_top_level_comments(self):
+        client = HackerNewsClient(base_url=self.base_url, top_comments=2, requests_per_second=100)
+        stories = client.fetch_top_stories()[:6]
+        client.fetch_comments(stories)
+        self.assertEqual(stories[0].top_comments, [
+            'SQLite is fast enough for most queues.\nWe ran one at 2k jobs/s without issues.',
+            'How does this compare to Postgres SKIP LOCKED?',
+        ])
+        # 没有评论的新闻（招聘帖和 discuss）不请求讨论页
+        item_requests = [path for path in StubHackerNewsHandler.paths if path.startswith('/item')]
+        self.assertEqual(len(item_requests), 4)
+
+    def test_comment_requests_are_rate_limited(self):
+        stories = HackerNewsClient().parse(_read_fixture('hackernews_front_page.html'))[:4]
+        fast = HackerNewsClient(base_url=self.base_url, top_comments=1, requests_per_second=100)
+        start = time.monotonic()
+        fast.fetch_comments(stories)
+        self.assertLess(time.monotonic() - start, 0.5)
+
+        # 令牌桶每秒补充 2 个、最多积攒 2 个：4 个请求中后 2 个需要分别等待 0.5 秒
+        slow = HackerNewsClient(base_url=self.base_url, top_comments=1, requests_per_second=2)
+        start = time.monotonic()
+        slow.fetch_comments(stories)
+        self.assertGreaterEqual(time.monotonic() - start, 0.9)
+
+if __name__ == '__main__':
+    unittest.main()
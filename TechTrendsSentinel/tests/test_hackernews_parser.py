@@ -0,0 +1,44 @@
+import os
+import unittest
+from src.hackernews_parser import PARSERS, Story, get_parser, parse_stories
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'hackernews_front_page.html')
+
+
+class TestHackerNewsParser(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(FIXTURE, 'r', encoding='utf-8') as file:
+            cls.html = file.read()
+
+    def test_parses_structured_stories(self):
+        stories = parse_stories(self.html)
+        self.assertEqual(len(stories), 30)
+        self.assertEqual(stories[0], Story(
+            id=41345678, rank=1, title='Show HN: A tiny SQLite-backed job queue',
+            url='https://github.com/example/sqlite-queue', site='github.com/example', score=312, comments=128,
+            by='alice', age='1 hours ago', posted_at='2024-08-24T10:00:00'
+        ))
+
+    def test_self_posts_jobs_and_discuss_links(self):
+        stories = {story.rank: story for story in parse_stories(self.html)}
+        # Ask HN 的链接指向站内讨论页
+        self.assertEqual(stories[3].url, stories[3].discussion_url)
+        self.assertIsNone(stories[3].site)
+        # 招聘帖没有分数和评论
+        self.assertEqual((stories[5].score, stories[5].comments, stories[5].by), (0, 0, None))
+        # "discuss" 表示还没有评论
+        self.assertEqual(stories[6].comments, 0)
+
+    def test_all_backends_agree(self):
+        results = {name: parse(self.html) for name, parse in PARSERS.items()}
+        reference = results.pop('bs4')
+        for name, stories in results.items():
+            self.assertEqual(stories, reference, name)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_parser('selectolax')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from src.llm import LLM, ThinkStripper, parse_duration
+from src.report_generator import ReportGenerator
+
+class TestThinkStripper(unittest.TestCase):
+    def _strip(self, deltas):
+        stripper = ThinkStripper()
+        output = ''.join(stripper.feed(delta) for delta in deltas)
+        return output + stripper.flush()
+
+    def test_removes_think_block_split_across_chunks(self):
+        deltas = ['<thi', 'nk>reasoning ', 'more</th', 'ink>\n\n# Report', '\n- item']
+        self.assertEqual(self._strip(deltas), '# Report\n- item')
+
+    def test_keeps_text_that_only_looks_like_a_tag_prefix(self):
+        self.assertEqual(self._strip(['a <', 'b > c']), 'a <b > c')
+
+    def test_emits_content_before_stream_ends(self):
+        stripper = ThinkStripper()
+        self.assertEqual(stripper.feed('<think>x</think>Hello'), 'Hello')
+        self.assertEqual(stripper.feed(' world'), ' world')
+
+class TestOllamaKeepAlive(unittest.TestCase):
+    def _llm(self, keep_alive, last_used_at=None):
+        # 绕过 __init__，避免读取提示词文件和创建 OpenAI 客户端
+        llm = LLM.__new__(LLM)
+        llm.config = SimpleNamespace(ollama_keep_alive=keep_alive, is_ollama=True, dry_run=False)
+        llm.last_used_at = last_used_at
+        return llm
+
+    def test_parse_duration(self):
+        self.assertEqual(parse_duration('30m'), 1800)
+        self.assertEqual(parse_duration('1h'), 3600)
+        self.assertEqual(parse_duration('45s'), 45)
+        self.assertEqual(parse_duration(300), 300)
+        self.assertEqual(parse_duration('-1'), -1)
+
+    def test_is_warm_until_keep_alive_expires(self):
+        now = time.time()
+        llm = self._llm('10m', last_used_at=now)
+        self.assertTrue(llm.is_warm(now + 540))
+        self.assertFalse(llm.is_warm(now + 660))
+
+    def test_never_used_model_is_cold(self):
+        self.assertFalse(self._llm('30m').is_warm())
+
+    def test_negative_keep_alive_stays_warm(self):
+        self.assertTrue(self._llm(-1, last_used_at=0).is_warm(time.time()))
+
+class TestDryRun(unittest.TestCase):
+    def test_sync_and_stream_save_the_same_prompt(self):
+        llm = LLM(SimpleNamespace(is_ollama=True, dry_run=True, model_name='test', llm_cache_dir='',
+                                  cassette_mode='', llm_max_concurrency={}, llm_timeout_seconds=30,
+                                  llm_max_retries=0))
+        llm.hackernews_system_prompt = 'prompt'
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            try:
+                self.assertEqual(llm.generate_hackernews_report('# stories'), 'DRY RUN')
+                with open('hackernews_reports/prompt.txt', encoding='utf-8') as file:
+                    sync_prompt = json.load(file)
+                os.remove('hackernews_reports/prompt.txt')
+                self.assertEqual(list(llm.stream_hackernews_report('# stories')), ['DRY RUN'])
+                with open('hackernews_reports/prompt.txt', encoding='utf-8') as file:
+                    stream_prompt = json.load(file)
+            finally:
+                os.chdir(cwd)
+
+        self.assertEqual(stream_prompt, sync_prompt)
+        self.assertEqual(sync_prompt[1], {'role': 'user', 'content': '# stories'})
+
+class TestRequestLimits(unittest.TestCase):
+    def _llm(self, max_retries=0):
+        llm = LLM(SimpleNamespace(is_ollama=True, dry_run=False, model_name='test', llm_cache_dir='',
+                                  cassette_mode='', llm_max_concurrency={'ollama': 2}, llm_timeout_seconds=30,
+                                  llm_max_retries=max_retries))
+        llm.system_prompt = llm.merge_system_prompt = 'prompt'
+        llm.backoff_seconds = 0
+        return llm
+
+    def test_report_generator_respects_backend_concurrency(self):
+        llm = self._llm()
+        lock = threading.Lock()
+        state = {'in_flight': 0, 'max_in_flight': 0}
+
+        def call_model(messages):
+            with lock:
+                state['in_flight'] += 1
+                state['max_in_flight'] = max(state['max_in_flight'], state['in_flight'])
+            time.sleep(0.02)
+            with lock:
+                state['in_flight'] -= 1
+            return 'summary'
+
+        llm._call_model = call_model
+        report_generator = ReportGenerator(llm, chunk_tokens=50, map_workers=4)
+        content = '# Progress\n' + ''.join(f'- a closed issue with a reasonably long title #{i}\n' for i in range(60))
+        # 与流水线一样由多个总结线程同时生成报告，每份报告内部又并行总结分段
+        threads = [threading.Thread(target=report_generator._summarize, args=(content,)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(state['max_in_flight'], 2)
+
+    def test_identical_requests_share_one_call(self):
+        llm = self._llm()
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def call_model(messages):
+            calls.append(messages)
+            started.set()
+            release.wait(5)
+            return 'report'
+
+        llm._call_model = call_model
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(llm.generate_daily_report('same')))
+                   for _ in range(4)]
+        threads[0].start()
+        self.assertTrue(started.wait(5))
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.05)  # 其余线程进入等待后再让第一个调用返回
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ['report'] * 4)
+        self.assertEqual(len(calls), 1)
+
+    def test_failed_call_is_retried_with_backoff(self):
+        llm = self._llm(max_retries=2)
+        attempts = []
+
+        def call_model(messages):
+            attempts.append(messages)
+            if len(attempts) < 3:
+                raise ConnectionError('model unavailable')
+            return 'report'
+
+        llm._call_model = call_model
+        self.assertEqual(llm._generate([{'role': 'user', 'content': 'x'}]), 'report')
+        self.assertEqual(len(attempts), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import tempfile
+import unittest
+from src.llm_cache import LLMResponseCache
+
+class TestLLMResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache = LLMResponseCache(self.cache_dir.name)
+        self.messages = [
+            {"role": "system", "content": "system prompt"},
+            {"role": "user", "content": "# Progress\n- no issues closed"},
+        ]
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def test_identical_prompt_hits(self):
+        self.assertIsNone(self.cache.get('deepseek-r1:7b', self.messages))
+        self.cache.set('deepseek-r1:7b', self.messages, 'report')
+
+        self.assertEqual(self.cache.get('deepseek-r1:7b', self.messages), 'report')
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_key_depends_on_model_and_content(self):
+        self.cache.set('deepseek-r1:7b', self.messages, 'report')
+        changed = [self.messages[0], {"role": "user", "content": "# Progress\n- one issue closed"}]
+
+        self.assertIsNone(self.cache.get('gpt-4o-mini', self.messages))
+        self.assertIsNone(self.cache.get('deepseek-r1:7b', changed))
+
+if __name__ == '__main__':
+    unittest.main()
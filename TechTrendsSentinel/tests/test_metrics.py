@@ -0,0 +1,94 @@
+import socket
+import time
+import unittest
+from urllib.request import urlopen
+
+import src.pipeline
+from src.metrics import Counter, Histogram, Registry, start_metrics_server
+from src.pipeline import Pipeline, Stage
+
+
+class TestMetrics(unittest.TestCase):
+    def test_counter_renders_labelled_samples(self):
+        registry = Registry()
+        errors = Counter('test_errors_total', '错误次数', ('component',), registry=registry)
+        errors.inc(component='github')
+        errors.inc(2, component='llm')
+        errors.inc(component='github')
+
+        self.assertEqual(errors.value(component='github'), 2)
+        self.assertEqual(registry.render().splitlines(), [
+            '# HELP test_errors_total 错误次数',
+            '# TYPE test_errors_total counter',
+            'test_errors_total{component="github"} 2',
+            'test_errors_total{component="llm"} 2',
+        ])
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        latency = Histogram('test_seconds', '耗时', ('service',), buckets=(0.1, 1), registry=registry)
+        for value in (0.05, 0.5, 5):
+            latency.observe(value, service='hn')
+
+        lines = registry.render().splitlines()
+        self.assertIn('test_seconds_bucket{service="hn",le="0.1"} 1', lines)
+        self.assertIn('test_seconds_bucket{service="hn",le="1.0"} 2', lines)
+        self.assertIn('test_seconds_bucket{service="hn",le="+Inf"} 3', lines)
+        self.assertIn('test_seconds_sum{service="hn"} 5.55', lines)
+        self.assertIn('test_seconds_count{service="hn"} 3', lines)
+
+    def test_snapshot(self):
+        registry = Registry()
+        counter = Counter('test_snapshot_total', '快照', ('cache', 'result'), registry=registry)
+        counter.inc(cache='llm', result='hit')
+        latency = Histogram('test_snapshot_seconds', '快照', registry=registry)
+        latency.observe(0.5)
+        latency.observe(1.5)
+        self.assertEqual(counter.snapshot(), {'llm,hit': 1})
+        self.assertEqual(latency.snapshot(), {'': {'count': 2, 'sum': 2.0}})
+
+    def test_rejects_unknown_labels(self):
+        counter = Counter('test_labels_total', '标签校验', ('cache',), registry=Registry())
+        with self.assertRaises(ValueError):
+            counter.inc(result='hit')
+
+    def test_serves_metrics_endpoint(self):
+        registry = Registry()
+        Counter('test_served_total', '端点测试', registry=registry).inc()
+        server = start_metrics_server(0, registry=registry)
+        self.assertIsNone(server)  # 端口为 0 时不启动
+
+        # 端口已被占用时记录错误并返回 None，不影响主程序
+        server = start_metrics_server(_free_port(), registry=registry)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.assertIsNone(start_metrics_server(server.server_port, registry=registry))
+
+        with urlopen(f'http://127.0.0.1:{server.server_port}/metrics', timeout=2) as response:
+            self.assertIn('text/plain', response.headers['Content-Type'])
+            self.assertIn('test_served_total 1', response.read().decode())
+
+    def test_pipeline_records_queue_wait_and_stage_time(self):
+        queue_wait = src.pipeline.QUEUE_WAIT_SECONDS
+        stage_time = src.pipeline.STAGE_SECONDS
+        before = queue_wait.count(stage='metrics_slow'), stage_time.count(stage='metrics_slow')
+
+        stages = [
+            Stage('metrics_fast', lambda item: item),
+            Stage('metrics_slow', lambda item: (time.sleep(0.05), item)[1]),
+        ]
+        Pipeline(stages).run(range(4))
+
+        self.assertEqual(queue_wait.count(stage='metrics_slow') - before[0], 4)
+        self.assertEqual(stage_time.count(stage='metrics_slow') - before[1], 4)
+        # 慢阶段串行处理，后面的条目在队列中至少等待了前一个条目的处理时间
+        self.assertGreaterEqual(queue_wait._values[('metrics_slow',)][1], 0.05 * (1 + 2 + 3) * 0.9)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,209 @@
+import os
+import smtplib
+import tempfile
+import threading
+import time
 import unittest
+from unittest import mock
 from src.notifier import Notifier
+from src.outbox import Outbox
+
+
+# 模拟 SMTP_SSL：记录连接、登录和发送次数，可以让指定的发送抛出连接断开
+class FakeSMTP:
+    instances = []
+    disconnect_on = set()  # 第几次 sendmail（全局计数，从 1 开始）时模拟连接断开
+    sendmail_calls = 0
+    blocker = None  # 设置为 Event 时 sendmail 等待它，模拟卡住的 SMTP 服务器
+
+    def __init__(self, host, port, timeout=None):
+        self.logins = 0
+        self.sent = []
+        self.closed = False
+        FakeSMTP.instances.append(self)
+
+    def login(self, user, password):
+        self.logins += 1
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        FakeSMTP.sendmail_calls += 1
+        if FakeSMTP.blocker is not None:
+            FakeSMTP.blocker.wait(5)
+        if FakeSMTP.sendmail_calls in FakeSMTP.disconnect_on:
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        self.sent.append(msg)
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
 
 class TestNotifier(unittest.TestCase):
-    def test_notify(self):
-        # Add test cases for Notifier
-        pass
+    def setUp(self):
+        FakeSMTP.instances = []
+        FakeSMTP.disconnect_on = set()
+        FakeSMTP.sendmail_calls = 0
+        FakeSMTP.blocker = None
+        patcher = mock.patch('src.notifier.smtplib.SMTP_SSL', FakeSMTP)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _notifier(self, outbox=None, **settings):
+        email_settings = {
+            'smtp_server': 'localhost', 'smtp_port': 465, 'from': 'a@example.com',
+            'password': 'secret', 'to': 'b@example.com', 'max_messages_per_minute': 0,
+        }
+        email_settings.update(settings)
+        return Notifier(email_settings, outbox)
+
+    def test_batch_reuses_one_connection(self):
+        notifier = self._notifier()
+        with notifier.batch():
+            for index in range(5):
+                notifier.notify(f'repo {index}', '# report')
+        self.assertEqual(len(FakeSMTP.instances), 1)
+        self.assertEqual(FakeSMTP.instances[0].logins, 1)
+        self.assertEqual(len(FakeSMTP.instances[0].sent), 5)
+        self.assertTrue(FakeSMTP.instances[0].closed)
+
+    def test_reconnects_after_max_messages_per_connection(self):
+        notifier = self._notifier(max_messages_per_connection=2)
+        with notifier.batch():
+            for index in range(5):
+                notifier.notify(f'repo {index}', '# report')
+        self.assertEqual([len(server.sent) for server in FakeSMTP.instances], [2, 2, 1])
+
+    def test_reconnects_and_retries_when_connection_drops(self):
+        FakeSMTP.disconnect_on = {2}
+        notifier = self._notifier()
+        with notifier.batch():
+            results = [notifier.send_email(f'repo {index}', '# report') for index in range(3)]
+        self.assertEqual(results, [True, True, True])
+        self.assertEqual([len(server.sent) for server in FakeSMTP.instances], [1, 2])
+
+    def test_digest_combines_reports_into_one_email(self):
+        notifier = self._notifier(digest=True)
+        with notifier.batch('digest'):
+            notifier.notify('repo a', '# report a')
+            notifier.notify('repo b', '# report b')
+        sent = [msg for server in FakeSMTP.instances for msg in server.sent]
+        self.assertEqual(len(sent), 1)
+        self.assertIn('report a', sent[0])
+        self.assertIn('report b', sent[0])
+
+    def test_digest_is_sent_once_per_recipient_list(self):
+        notifier = self._notifier(digest=True)
+        with notifier.batch('digest'):
+            notifier.notify('repo a', '# report a')
+            notifier.notify('repo b', '# report b', ['c@example.com', 'd@example.com'])
+        sent = [msg for server in FakeSMTP.instances for msg in server.sent]
+        self.assertEqual(len(sent), 2)
+        self.assertIn('To: b@example.com', sent[0])
+        self.assertIn('To: c@example.com, d@example.com', sent[1])
+        self.assertNotIn('report a', sent[1])
+
+    def test_digest_reports_are_delivered_only_when_the_digest_is_sent(self):
+        FakeSMTP.disconnect_on = {2, 3}  # 第二封摘要及其重连重试都失败
+        notifier = self._notifier(digest=True)
+        delivered = []
+        with notifier.batch('digest'):
+            self.assertTrue(notifier.notify('repo a', '# report a', on_delivered=lambda: delivered.append('a')))
+            notifier.notify('repo b', '# report b', ['c@example.com'], on_delivered=lambda: delivered.append('b'))
+            self.assertEqual(delivered, [])  # 摘要发送前不回调
+        self.assertEqual(delivered, ['a'])
+
+    def test_without_batch_each_email_closes_its_connection(self):
+        notifier = self._notifier()
+        notifier.notify('repo', '# report')
+        notifier.notify('repo', '# report')
+        self.assertEqual(len(FakeSMTP.instances), 2)
+        self.assertTrue(all(server.closed for server in FakeSMTP.instances))
+
+    def test_plain_smtp_when_ssl_disabled(self):
+        with mock.patch('src.notifier.smtplib.SMTP', FakeSMTP), \
+                mock.patch('src.notifier.smtplib.SMTP_SSL', side_effect=AssertionError('SMTP_SSL used')):
+            self.assertTrue(self._notifier(ssl=False).send_email('repo', '# report'))
+        self.assertEqual(len(FakeSMTP.instances[0].sent), 1)
+
+    def _outbox(self, **kwargs):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        return Outbox(os.path.join(tmp.name, 'outbox.db'), **kwargs)
+
+    def test_failed_delivery_stays_in_outbox_and_is_retried(self):
+        FakeSMTP.disconnect_on = {1, 2}  # 首次投递及其重连重试都失败
+        outbox = self._outbox(retry_seconds=0)
+        notifier = self._notifier(outbox)
+        self.assertTrue(notifier.send_email('repo', '# report'))
+        self.assertEqual(outbox.counts(), {'pending': 1})
+
+        # 模拟守护进程重启：新的通知器读取同一个发件箱继续投递
+        self.assertEqual(self._notifier(Outbox(outbox.db_path)).drain(), 1)
+        self.assertEqual(outbox.counts(), {'sent': 1})
+
+    def test_outbox_deduplicates_by_message_id(self):
+        outbox = self._outbox()
+        notifier = self._notifier(outbox)
+        notifier.send_email('repo', '# report', message_id='github:owner/repo:2024-01-08:1')
+        notifier.send_email('repo', '# report', message_id='github:owner/repo:2024-01-08:1')
+        self.assertEqual(sum(len(server.sent) for server in FakeSMTP.instances), 1)
+
+    def test_outbox_sends_identical_reports_for_different_periods(self):
+        # 两个周期的报告内容恰好相同时仍然各自发送
+        outbox = self._outbox()
+        notifier = self._notifier(outbox)
+        notifier.send_email('repo', '# report', message_id='github:owner/repo:2024-01-08:1')
+        notifier.send_email('repo', '# report', message_id='github:owner/repo:2024-01-09:1')
+        notifier.send_email('repo', '# report')
+        notifier.send_email('repo', '# report')
+        self.assertEqual(sum(len(server.sent) for server in FakeSMTP.instances), 4)
+
+
+    def test_send_email_only_enqueues_when_sender_is_running(self):
+        FakeSMTP.blocker = threading.Event()
+        outbox = self._outbox()
+        notifier = self._notifier(outbox)
+        notifier.start_sender(interval=60)
+        self.addCleanup(notifier.stop_sender)
+        self.addCleanup(FakeSMTP.blocker.set)
+
+        # 后台发送线程卡在第一封邮件的 SMTP 发送上时，后续的通知只写入发件箱，不等待 SMTP
+        notifier.send_email('repo 1', '# report')
+        start = time.monotonic()
+        self.assertTrue(notifier.send_email('repo 2', '# report'))
+        self.assertLess(time.monotonic() - start, 1)
+
+        FakeSMTP.blocker.set()
+        deadline = time.monotonic() + 5
+        while outbox.counts() != {'sent': 2} and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(outbox.counts(), {'sent': 2})
+
+
+class TestOutbox(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.outbox = Outbox(os.path.join(tmp.name, 'outbox.db'), max_attempts=3, retry_seconds=60)
+
+    def test_backoff_delays_next_attempt(self):
+        self.outbox.enqueue('b@example.com', 'subject', '<p>html</p>')
+        (message_id, *_), = self.outbox.due()
+        self.outbox.mark_failed(message_id, 'timeout')
+        self.assertEqual(self.outbox.due(), [])
+        self.assertEqual(len(self.outbox.due(now=10 ** 10)), 1)
+
+    def test_moves_to_dead_letters_after_max_attempts(self):
+        self.outbox.enqueue('b@example.com', 'subject', '<p>html</p>')
+        (message_id, *_), = self.outbox.due()
+        for _ in range(3):
+            self.outbox.mark_failed(message_id, 'auth failed')
+        self.assertEqual(self.outbox.counts(), {'dead': 1})
+        self.assertEqual(self.outbox.dead_letters()[0][2:], (3, 'auth failed'))
+        self.assertEqual(self.outbox.requeue_dead(), 1)
+        self.assertEqual(len(self.outbox.due()), 1)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,77 @@
+import threading
+import time
+import unittest
+from src.pipeline import Pipeline, Stage
+
+class TestPipeline(unittest.TestCase):
+    def test_stages_overlap(self):
+        delivered = []
+        lock = threading.Lock()
+
+        def deliver(item):
+            time.sleep(0.1)
+            with lock:
+                delivered.append(item)
+
+        stages = [
+            Stage('fetch', lambda item: (time.sleep(0.1), item)[1], workers=1),
+            Stage('summarize', lambda item: (time.sleep(0.1), item * 10)[1], workers=1),
+            Stage('notify', deliver, workers=1),
+        ]
+        elapsed = Pipeline(stages, queue_size=2).run(range(5))
+
+        self.assertEqual(sorted(delivered), [0, 10, 20, 30, 40])
+        # 串行需要 5 * 3 * 0.1 = 1.5 秒，流水线约为 (5 + 2) * 0.1 秒
+        self.assertLess(elapsed, 1.2)
+
+    def test_failed_item_does_not_stop_pipeline(self):
+        delivered = []
+
+        def summarize(item):
+            if item == 1:
+                raise ValueError('LLM error')
+            return item
+
+        stages = [Stage('summarize', summarize, workers=2), Stage('notify', delivered.append)]
+        Pipeline(stages).run(range(4))
+
+        self.assertEqual(sorted(delivered), [0, 2, 3])
+        self.assertEqual((stages[0].processed, stages[0].failed), (3, 1))
+
+    def test_none_result_is_dropped(self):
+        delivered = []
+        stages = [Stage('fetch', lambda item: item if item % 2 else None, workers=3),
+                  Stage('notify', delivered.append, workers=2)]
+        Pipeline(stages).run(range(6))
+
+        self.assertEqual(sorted(delivered), [1, 3, 5])
+    def test_items_from_a_generator_start_before_it_finishes(self):
+        delivered = []
+        first_delivered = threading.Event()
+
+        def batches():
+            yield from [0, 1]
+            # 获取下一批之前，上一批已经进入后续阶段
+            self.assertTrue(first_delivered.wait(2))
+            yield from [2, 3]
+
+        def deliver(item):
+            delivered.append(item)
+            first_delivered.set()
+
+        Pipeline([Stage('summarize', lambda item: item), Stage('notify', deliver)]).run(batches())
+        self.assertEqual(sorted(delivered), [0, 1, 2, 3])
+
+    def test_generator_error_is_raised_after_delivered_items_finish(self):
+        delivered = []
+
+        def batches():
+            yield 0
+            raise RuntimeError('GraphQL error')
+
+        with self.assertRaises(RuntimeError):
+            Pipeline([Stage('notify', lambda item: (time.sleep(0.1), delivered.append(item)))]).run(batches())
+        self.assertEqual(delivered, [0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import glob
+import os
+import pstats
+import tempfile
+import threading
+import unittest
+
+from src.pipeline import Pipeline, Stage
+from src.profiler import Profiler
+from src.scheduler import Scheduler
+
+
+def busy_fetch(item):
+    return sum(range(20000)) + item
+
+
+def busy_summarize(item):
+    return sorted(range(20000), reverse=True)[0] + item
+
+
+def _function_names(path):
+    return {name for _, _, name in pstats.Stats(path).stats}
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.profiler = Profiler(self.tmp.name, top_n=5)
+
+    def test_writes_prof_file_including_worker_threads(self):
+        with self.profiler.profile('github job'):
+            Pipeline([Stage('fetch', busy_fetch), Stage('summarize', busy_summarize)]).run(range(3))
+
+        files = glob.glob(os.path.join(self.tmp.name, 'github_job_*.prof'))
+        self.assertEqual(len(files), 1)
+        # 流水线阶段在各自的线程中运行，也应出现在剖析结果中
+        self.assertTrue({'busy_fetch', 'busy_summarize'} <= _function_names(files[0]))
+
+    def test_overlapping_jobs_only_include_their_own_threads(self):
+        # 两个任务同时剖析，各自启动的线程只计入各自的剖析结果
+        both_running = threading.Barrier(2)
+        workers_done = threading.Barrier(2)
+
+        def job(name, func):
+            with self.profiler.profile(name):
+                both_running.wait(5)
+                worker = threading.Thread(target=func, args=(0,))
+                worker.start()
+                worker.join()
+                workers_done.wait(5)
+
+        jobs = [threading.Thread(target=job, args=('job a', busy_fetch)),
+                threading.Thread(target=job, args=('job b', busy_summarize))]
+        for thread in jobs:
+            thread.start()
+        for thread in jobs:
+            thread.join()
+
+        names_a = _function_names(glob.glob(os.path.join(self.tmp.name, 'job_a_*.prof'))[0])
+        names_b = _function_names(glob.glob(os.path.join(self.tmp.name, 'job_b_*.prof'))[0])
+        self.assertIn('busy_fetch', names_a)
+        self.assertNotIn('busy_summarize', names_a)
+        self.assertIn('busy_summarize', names_b)
+        self.assertNotIn('busy_fetch', names_b)
+
+    def test_threads_still_running_are_left_out(self):
+        release = threading.Event()
+        with self.profiler.profile('long job'):
+            worker = threading.Thread(target=lambda: (busy_fetch(0), release.wait(5)))
+            worker.start()
+        # 会话结束后恢复 Thread.start；仍在运行的线程不计入剖析结果，也不会被其他线程停用
+        self.assertEqual(threading.Thread.start.__name__, 'start')
+        release.set()
+        worker.join()
+
+        files = glob.glob(os.path.join(self.tmp.name, 'long_job_*.prof'))
+        self.assertEqual(len(files), 1)
+        self.assertNotIn('busy_fetch', _function_names(files[0]))
+
+    def test_wrap_returns_result(self):
+        profiled = self.profiler.wrap('command_export', busy_fetch)
+        self.assertEqual(profiled(1), sum(range(20000)) + 1)
+        self.assertEqual(len(glob.glob(os.path.join(self.tmp.name, 'command_export_*.prof'))), 1)
+
+    def test_scheduler_profiles_job_runs(self):
+        ran = threading.Event()
+        scheduler = Scheduler(profiler=self.profiler)
+        scheduler.once('deferred', lambda: (busy_fetch(0), ran.set()), 0)
+        threading.Thread(target=scheduler.run_forever, daemon=True).start()
+        self.assertTrue(ran.wait(2))
+        scheduler.stop()  # 等待任务线程结束，剖析结果写入后才返回
+
+        files = glob.glob(os.path.join(self.tmp.name, 'deferred_*.prof'))
+        self.assertEqual(len(files), 1)
+        self.assertIn('busy_fetch', _function_names(files[0]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.github_client import GitHubClient, RateLimitScheduler
+from src.rate_limiter import TokenBucket
+
+
+class RateLimitedHandler(BaseHTTPRequestHandler):
+    # 本地桩服务：返回伪造的 X-RateLimit-* 响应头，exhausted_until 之前一律返回 403
+    remaining = 5000
+    exhausted_until = 0
+    statuses = []
+
+    def do_GET(self):
+        cls = type(self)
+        now = time.time()
+        if now < cls.exhausted_until:
+            cls.statuses.append(403)
+            body = json.dumps({'message': 'API rate limit exceeded'}).encode()
+            self.send_response(403)
+            self.send_header('X-RateLimit-Remaining', '0')
+            self.send_header('X-RateLimit-Reset', str(cls.exhausted_until))
+        else:
+            cls.statuses.append(200)
+            cls.remaining -= 1
+            body = json.dumps([{'title': 'issue', 'number': 1}]).encode()
+            self.send_response(200)
+            self.send_header('X-RateLimit-Remaining', str(cls.remaining))
+            self.send_header('X-RateLimit-Reset', str(now + 3600))
+        self.send_header('X-RateLimit-Limit', '5000')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestRateLimitScheduler(unittest.TestCase):
+    def setUp(self):
+        RateLimitedHandler.remaining = 5000
+        RateLimitedHandler.exhausted_until = 0
+        RateLimitedHandler.statuses = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), RateLimitedHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.api_url = f'http://127.0.0.1:{self.server.server_port}'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_reads_rate_limit_headers(self):
+        scheduler = RateLimitScheduler()
+        client = GitHubClient('token', api_url=self.api_url, rate_limiter=scheduler)
+        client.fetch_issues('owner/repo')
+
+        self.assertEqual(scheduler.remaining, 4999)
+        self.assertEqual(scheduler.limit, 5000)
+        self.assertGreater(scheduler.reset_at, time.time())
+
+    def test_low_priority_repo_is_deferred(self):
+        RateLimitedHandler.remaining = 50
+        scheduler = RateLimitScheduler(reserve=100, low_priority_repos=['owner/low'])
+        client = GitHubClient('token', api_url=self.api_url, rate_limiter=scheduler)
+        client.fetch_issues('owner/high')
+
+        results, deferred = client.fetch_updates_batch(['owner/low', 'owner/high'])
+
+        self.assertEqual(deferred, ['owner/low'])
+        self.assertIn('owner/high', results)
+        self.assertEqual(len(RateLimitedHandler.statuses), 4)  # 低优先级仓库没有发出任何请求
+
+    def test_high_priority_waits_for_reset(self):
+        RateLimitedHandler.exhausted_until = time.time() + 1
+        client = GitHubClient('token', api_url=self.api_url, rate_limiter=RateLimitScheduler())
+
+        start = time.monotonic()
+        issues = client.fetch_issues('owner/repo')
+
+        self.assertEqual(len(issues), 1)  # 重置后重试成功，而不是返回空结果
+        self.assertEqual(RateLimitedHandler.statuses, [403, 200])
+        self.assertGreaterEqual(time.monotonic() - start, 0.5)
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_paces_requests(self):
+        bucket = TokenBucket(rate=20, capacity=1)
+        start = time.monotonic()
+        for _ in range(5):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+
+
+if __name__ == '__main__':
+    unittest.main()
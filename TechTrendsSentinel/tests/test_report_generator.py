@@ -1,10 +1,156 @@
+import os
+import tempfile
+import threading
 import unittest
+from datetime import date, timedelta
 from src.report_generator import ReportGenerator
+from src.report_store import ReportStore
+
+class FakeLLM:
+    # 记录每次调用的输入，返回固定格式的简报
+    def __init__(self):
+        self.daily_calls = []
+        self.merge_calls = []
+        self.rollup_calls = []
+        self.lock = threading.Lock()
+
+    def generate_daily_report(self, markdown_content):
+        with self.lock:
+            self.daily_calls.append(markdown_content)
+        return f"partial {len(self.daily_calls)}"
+
+    def merge_reports(self, reports):
+        with self.lock:
+            self.merge_calls.append(reports)
+        return "merged report"
+
+    def rollup_reports(self, reports):
+        with self.lock:
+            self.rollup_calls.append(reports)
+        return "weekly report"
+
+    def stream_daily_report(self, markdown_content):
+        yield from ["streamed ", "report "]
+
+    def stream_rollup_reports(self, reports):
+        self.rollup_calls.append(reports)
+        yield from ["streamed ", "weekly "]
 
 class TestReportGenerator(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.llm = FakeLLM()
+
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp_dir.name)  # 汇总报告写入当前目录下的 daily_progress
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp_dir.cleanup()
+
+    def _write_progress(self, issue_count):
+        path = os.path.join(self.tmp_dir.name, 'progress.md')
+        with open(path, 'w') as file:
+            file.write("# Progress for owner/repo\n")
+            for i in range(issue_count):
+                file.write(f"- a closed issue with a reasonably long title #{i}\n")
+        return path
+
     def test_generate(self):
-        # Add test cases for ReportGenerator
-        pass
+        report_generator = ReportGenerator(self.llm, chunk_tokens=6000)
+        report, report_file_path = report_generator.generate_report_by_date_range(self._write_progress(5), 1)
+
+        self.assertEqual(report, "partial 1")
+        self.assertEqual(len(self.llm.daily_calls), 1)
+        self.assertEqual(self.llm.merge_calls, [])
+        with open(report_file_path) as file:
+            self.assertEqual(file.read(), "partial 1")
+
+    def test_large_progress_uses_map_reduce(self):
+        report_generator = ReportGenerator(self.llm, chunk_tokens=200, map_workers=3)
+        report, _ = report_generator.generate_report_by_date_range(self._write_progress(100), 7)
+
+        self.assertEqual(report, "merged report")
+        self.assertGreater(len(self.llm.daily_calls), 1)
+        for chunk in self.llm.daily_calls:
+            self.assertTrue(chunk.startswith("# Progress for owner/repo\n"))
+        self.assertEqual(len(self.llm.merge_calls), 1)
+        self.assertEqual(len(self.llm.merge_calls[0]), len(self.llm.daily_calls))
+    def test_stream_report_writes_file_at_end(self):
+        report_generator = ReportGenerator(self.llm)
+        updates = list(report_generator.stream_report_by_date_range(self._write_progress(5), 1))
+
+        self.assertEqual(updates[:2], [("streamed ", None), ("streamed report ", None)])
+        report, report_file_path = updates[-1]
+        self.assertEqual(report, "streamed report")
+        with open(report_file_path, encoding='utf-8') as file:
+            self.assertEqual(file.read(), "streamed report")
+
+    def _rollup_generator(self):
+        store = ReportStore(os.path.join(self.tmp_dir.name, 'reports.db'))
+        return ReportGenerator(self.llm, report_store=store), store
+
+    def test_rollup_reuses_stored_daily_reports(self):
+        report_generator, store = self._rollup_generator()
+        until = date(2024, 8, 25)
+        for offset in range(2, 8):
+            store.put_report('owner/repo', until - timedelta(days=offset), f'day {offset}')
+
+        # 只缺少前一天的简报，只需要导出和总结这一天以及尚未结束的当天的原始数据
+        missing = report_generator.missing_days('owner/repo', 7, until)
+        self.assertEqual(missing, [date(2024, 8, 24), until])
+        day_files = {day: self._write_progress(5) for day in missing}
+        report, report_file_path = report_generator.generate_rollup_report('owner/repo', 7, day_files, until)
+
+        self.assertEqual(report, "weekly report")
+        self.assertEqual(len(self.llm.daily_calls), 2)
+        self.assertEqual(len(self.llm.rollup_calls), 1)
+        sections = self.llm.rollup_calls[0]
+        self.assertEqual(len(sections), 8)
+        self.assertEqual(sections[0], "## 2024-08-18\n\nday 7")
+        self.assertTrue(sections[-2].startswith("## 2024-08-24\n\npartial"))
+        self.assertTrue(sections[-1].startswith("## 2024-08-25\n\npartial"))
+        # 当天的简报不保存，下次运行时按当时的数据重新总结
+        self.assertEqual(store.missing_days('owner/repo', [date(2024, 8, 24), until]), [until])
+        self.assertTrue(report_file_path.endswith('2024-08-18_to_2024-08-25_report.md'))
+
+        # 再次生成时只有当天需要重新总结
+        self.assertEqual(report_generator.missing_days('owner/repo', 7, until), [until])
+        report_generator.generate_rollup_report('owner/repo', 7, {until: self._write_progress(5)}, until)
+        self.assertEqual(len(self.llm.daily_calls), 3)
+
+    def test_single_day_rollup_is_the_daily_report(self):
+        report_generator, store = self._rollup_generator()
+        day = date.today() - timedelta(days=1)
+        updates = list(report_generator.stream_rollup_report('owner/repo', 1, {day: self._write_progress(5)}))
+
+        self.assertEqual(updates[-1][0], "partial 1")
+        self.assertEqual(self.llm.rollup_calls, [])
+        self.assertEqual(store.get_reports('owner/repo', [day]), {day: "partial 1"})
+
+    def test_stream_rollup_shows_ready_days_before_missing_days_are_summarized(self):
+        report_generator, store = self._rollup_generator()
+        until = date(2024, 8, 25)
+        for offset in range(2, 4):
+            store.put_report('owner/repo', until - timedelta(days=offset), f'day {offset}')
+        released = threading.Event()
+        generate_daily_report = self.llm.generate_daily_report
+
+        def slow_daily_report(markdown_content):
+            released.wait(5)
+            return generate_daily_report(markdown_content)
+
+        self.llm.generate_daily_report = slow_daily_report
+        updates = report_generator.stream_rollup_report(
+            'owner/repo', 3, {date(2024, 8, 24): self._write_progress(5)}, until)
+
+        # 前一天仍在总结时，已保存的日期已经可以展示
+        self.assertEqual(next(updates), ("## 2024-08-22\n\nday 3", None))
+        self.assertEqual(self.llm.daily_calls, [])
+        released.set()
+        updates = list(updates)
+        self.assertIn("## 2024-08-24\n\npartial 1", updates[1][0])
+        self.assertEqual(updates[-1][0], "streamed weekly")
 
 if __name__ == '__main__':
     unittest.main()
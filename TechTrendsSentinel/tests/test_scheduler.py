@@ -0,0 +1,107 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+
+from src.scheduler import Job, Scheduler, CATCH_UP_SKIP
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.state_file = os.path.join(self.tmp.name, 'state.json')
+
+    def _start(self, scheduler):
+        thread = threading.Thread(target=scheduler.run_forever, daemon=True)
+        thread.start()
+        self.addCleanup(scheduler.stop)
+        return thread
+
+    def test_slot_after_aligns_to_wall_clock(self):
+        job = Job('daily', None, 86400, at='08:00')
+        now = datetime(2024, 8, 24, 9, 30).timestamp()
+        self.assertEqual(job.slot_after(now), datetime(2024, 8, 25, 8, 0).timestamp())
+        hourly = Job('hourly', None, 3600, at='08:15')
+        self.assertEqual(hourly.slot_after(now), datetime(2024, 8, 24, 10, 15).timestamp())
+
+    def test_runs_jobs_in_parallel_worker_threads(self):
+        scheduler = Scheduler()
+        started = []
+        barrier = threading.Barrier(2, timeout=2)
+
+        def job(name):
+            started.append((name, threading.current_thread().name))
+            barrier.wait()  # 两个任务必须同时运行才能通过
+
+        scheduler.every('a', lambda: job('a'), 3600)
+        scheduler.every('b', lambda: job('b'), 3600)
+        self._start(scheduler)
+        time.sleep(0.3)
+        self.assertEqual(sorted(name for name, _ in started), ['a', 'b'])
+        self.assertNotIn('MainThread', [thread for _, thread in started])
+
+    def test_skips_overlapping_runs(self):
+        scheduler = Scheduler()
+        runs = []
+        release = threading.Event()
+
+        def slow():
+            runs.append(time.monotonic())
+            release.wait(2)
+
+        scheduler.every('slow', slow, 0.05)
+        self._start(scheduler)
+        time.sleep(0.3)
+        self.assertEqual(len(runs), 1)  # 上一次运行未结束时后续的运行都被跳过
+        release.set()
+
+    def test_catch_up_runs_missed_job_immediately(self):
+        last_run = time.time() - 2 * 86400
+        with open(self.state_file, 'w') as file:
+            json.dump({'daily': last_run}, file)
+        scheduler = Scheduler(self.state_file)
+        job = scheduler.every('daily', lambda: None, 86400, at='08:00')
+        self.assertLessEqual(job.next_run, time.time())
+
+        skipping = Scheduler(self.state_file)
+        job = skipping.every('daily', lambda: None, 86400, at='08:00', catch_up=CATCH_UP_SKIP)
+        self.assertGreater(job.next_run, time.time())
+
+    def test_recent_run_is_not_repeated_after_restart(self):
+        ran = threading.Event()
+        scheduler = Scheduler(self.state_file)
+        scheduler.every('hourly', ran.set, 3600)
+        self._start(scheduler)
+        self.assertTrue(ran.wait(1))
+        time.sleep(0.1)  # 等待运行时间写入状态文件
+        restarted = Scheduler(self.state_file)
+        job = restarted.every('hourly', lambda: None, 3600)
+        self.assertGreater(job.next_run, time.time() + 3000)
+
+    def test_jitter_delays_within_bound(self):
+        scheduler = Scheduler()
+        ran = threading.Event()
+        scheduler.every('jittered', ran.set, 3600, jitter=0.3)
+        deadline = scheduler._heap[0][0]
+        self.assertLessEqual(deadline - scheduler.jobs['jittered'].next_run, 0.3)
+        self._start(scheduler)
+        self.assertTrue(ran.wait(1))
+
+    def test_once_and_lead_hook(self):
+        scheduler = Scheduler()
+        events = []
+        scheduler.add_lead_hook(0.2, lambda job, run_at: events.append(('lead', job.name)))
+        scheduler.every('periodic', lambda: events.append(('run', 'periodic')), 0.3)
+        scheduler.once('deferred', lambda: events.append(('run', 'deferred')), 0.2)
+        self._start(scheduler)
+        time.sleep(0.5)
+        # 首次运行立即执行，没有提前量；第二次运行前 0.2 秒触发回调
+        self.assertEqual(events[:3], [('run', 'periodic'), ('lead', 'periodic'), ('run', 'deferred')])
+        self.assertEqual(events.count(('run', 'deferred')), 1)
+
+if __name__ == '__main__':
+    unittest.main()
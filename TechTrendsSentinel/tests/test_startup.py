@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+class TestStartup(unittest.TestCase):
+    def _loaded_modules(self, code):
+        # 在新进程中运行，检查启动后已导入的第三方模块
+        script = code + '\nimport json, sys\nprint(json.dumps(sorted(sys.modules)))'
+        env = dict(os.environ, OPENAI_API_KEY='test')
+        output = subprocess.run([sys.executable, '-c', script], cwd=SRC, env=env, capture_output=True, text=True,
+                                check=True)
+        return set(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    def test_command_tool_does_not_import_model_clients(self):
+        modules = self._loaded_modules('import command_tool')
+        self.assertFalse({'openai', 'ollama', 'requests'} & modules)
+
+    def test_llm_imports_model_clients_on_first_use(self):
+        modules = self._loaded_modules('from llm import LLM\nllm = LLM()')
+        self.assertFalse({'openai', 'ollama'} & modules)
+        modules = self._loaded_modules('from llm import LLM\nLLM().client')
+        self.assertIn('openai', modules)
+
+    def test_list_command_runs_without_interactive_prompt(self):
+        # 在临时目录中运行，订阅存储不写入仓库目录
+        with tempfile.TemporaryDirectory() as workspace:
+            with open(os.path.join(workspace, 'config.json'), 'w') as file:
+                json.dump({'subscriptions_file': '../subscriptions.json'}, file)
+            with open(os.path.join(workspace, 'subscriptions.json'), 'w') as file:
+                json.dump(['ollama/ollama'], file)
+            os.makedirs(os.path.join(workspace, 'src'))
+            output = subprocess.run([sys.executable, os.path.join(SRC, 'command_tool.py'), 'list'],
+                                    cwd=os.path.join(workspace, 'src'), capture_output=True, text=True,
+                                    stdin=subprocess.DEVNULL, check=True)
+        self.assertIn('Current subscriptions:\n  - ollama/ollama', output.stdout)
+        self.assertNotIn('GitHub Sentinel>', output.stdout)
+
+    def test_config_is_shared_within_process(self):
+        modules = self._loaded_modules(
+            'from config import Config\nfrom services import Services\n'
+            'assert Services().config is Config.shared() is Config.shared()'
+        )
+        self.assertIn('config', modules)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+from dataclasses import replace
+
+from src.hackernews_client import HackerNewsClient
+from src.hackernews_parser import parse_stories
+from src.story_index import StoryIndex, classify
+from src.utils import estimate_tokens
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'hackernews_front_page.html')
+
+
+class TestStoryIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.index = StoryIndex(os.path.join(self.tmp.name, 'stories.db'))
+        with open(FIXTURE, 'r', encoding='utf-8') as file:
+            self.stories = parse_stories(file.read())
+
+    def test_classifies_new_rising_and_trending(self):
+        previous = self.index.record(self.stories, now=1000)
+        new, rising, trending = classify(self.stories, previous, now=1000)
+        self.assertEqual((len(new), len(rising), len(trending)), (30, 0, 0))
+
+        # 一小时后：第一条涨了 200 分，第二条涨了 10 分，另有一条新上榜
+        later = [replace(self.stories[0], score=self.stories[0].score + 200),
+                 replace(self.stories[1], score=self.stories[1].score + 10),
+                 replace(self.stories[2], id=1)]
+        previous = self.index.record(later, now=4600)
+        new, rising, trending = classify(later, previous, rising_points_per_hour=50, now=4600)
+        self.assertEqual([story.id for story in new], [1])
+        self.assertEqual([(story.id, gained) for story, gained in rising], [(self.stories[0].id, 200)])
+        self.assertEqual([story.id for story in trending], [self.stories[1].id])
+        self.assertEqual(self.index.score_history(self.stories[0].id),
+                         [(1000, self.stories[0].score), (4600, self.stories[0].score + 200)])
+
+    def test_prune_removes_stories_not_seen_recently(self):
+        self.index.record(self.stories[:2], now=1000)
+        self.index.record(self.stories[1:2], now=1000 + 8 * 86400)
+        self.assertEqual(self.index.prune(now=1000 + 8 * 86400), 1)
+        self.assertEqual(self.index.score_history(self.stories[0].id), [])
+
+
+class TestIncrementalExport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)  # 导出的 Markdown 写在当前目录下
+        self.addCleanup(os.chdir, cwd)
+        with open(FIXTURE, 'r', encoding='utf-8') as file:
+            self.stories = parse_stories(file.read())
+        self.client = HackerNewsClient(story_index=StoryIndex('stories.db'))
+        self.client.fetch_top_stories = lambda: self.stories
+
+    def _tokens(self, path):
+        with open(path, 'r', encoding='utf-8') as file:
+            return estimate_tokens(file.read())
+
+    def test_second_run_only_details_changes(self):
+        full_tokens = self._tokens(self.client.export_hackernews_top_stories())
+        self.client.mark_reported()
+        # 没有任何变化时跳过本次报告
+        self.assertIsNone(self.client.export_hackernews_top_stories())
+
+        self.stories = [replace(self.stories[0], id=1, title='Brand new story')] + self.stories[1:]
+        path = self.client.export_hackernews_top_stories()
+        with open(path, 'r', encoding='utf-8') as file:
+            content = file.read()
+        self.assertIn('## 新上榜', content)
+        self.assertIn('Brand new story', content)
+        self.assertLess(self._tokens(path) * 2, full_tokens)
+
+    def test_stories_stay_new_until_reported(self):
+        # 第一次导出后报告生成失败，没有调用 mark_reported，下次运行仍然全部算作新上榜
+        self.assertIsNotNone(self.client.export_hackernews_top_stories())
+        path = self.client.export_hackernews_top_stories()
+        with open(path, 'r', encoding='utf-8') as file:
+            content = file.read()
+        self.assertIn('## 新上榜', content)
+        self.assertNotIn('上次报告已包含', content)
+        self.assertIn(self.stories[0].title, content)
+
+        self.client.mark_reported()
+        self.assertIsNone(self.client.export_hackernews_top_stories())
+
+    def test_full_export_does_not_touch_the_index(self):
+        self.assertIsNotNone(self.client.export_hackernews_top_stories(incremental=False))
+        self.assertIsNotNone(self.client.export_hackernews_top_stories())
+
+if __name__ == '__main__':
+    unittest.main()
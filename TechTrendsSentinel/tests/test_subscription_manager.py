@@ -1,10 +1,80 @@
+import json
+import os
+import tempfile
+import time
 import unittest
-from src.subscription_manager import SubscriptionManager
+from src.subscription_manager import DUE_GRACE_SECONDS, SubscriptionManager
 
 class TestSubscriptionManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = os.path.join(self.tmp.name, 'subscriptions.db')
+
     def test_get_subscriptions(self):
-        # Add test cases for SubscriptionManager
-        pass
+        manager = SubscriptionManager(self.db_path)
+        self.assertTrue(manager.add_subscription('vllm-project/vllm'))
+        self.assertTrue(manager.add_subscription('ollama/ollama', frequency_days=7, recipients=['a@example.com']))
+        self.assertFalse(manager.add_subscription('ollama/ollama', priority='low'))  # 已订阅时只更新给出的设置
+        self.assertEqual(manager.list_subscriptions(), ['ollama/ollama', 'vllm-project/vllm'])
+
+        subscription = manager.get_subscription('ollama/ollama')
+        self.assertEqual((subscription.frequency_days, subscription.recipients, subscription.priority),
+                         (7, ['a@example.com'], 'low'))
+        self.assertTrue(manager.remove_subscription('vllm-project/vllm'))
+        self.assertFalse(manager.remove_subscription('vllm-project/vllm'))
+        self.assertIsNone(manager.get_subscription('vllm-project/vllm'))
+        with self.assertRaises(ValueError):
+            manager.add_subscription('owner/repo', priority='urgent')
+
+    def test_imports_legacy_json_list_once(self):
+        legacy = os.path.join(self.tmp.name, 'subscriptions.json')
+        with open(legacy, 'w') as file:
+            json.dump(['ollama/ollama', 'vllm-project/vllm'], file)
+        manager = SubscriptionManager(self.db_path, legacy)
+        self.assertEqual(manager.list_subscriptions(), ['ollama/ollama', 'vllm-project/vllm'])
+
+        manager.remove_subscription('ollama/ollama')
+        # 存储中已有订阅时不再重复导入
+        self.assertEqual(SubscriptionManager(self.db_path, legacy).list_subscriptions(), ['vllm-project/vllm'])
+
+    def test_bulk_export_and_import_round_trip(self):
+        manager = SubscriptionManager(self.db_path)
+        repos = [{'repo': f'org/repo-{index:05d}', 'frequency_days': 1 + index % 7} for index in range(2000)]
+        self.assertEqual(manager.import_subscriptions(repos), 2000)
+        self.assertEqual(manager.import_subscriptions(repos), 0)
+
+        path = os.path.join(self.tmp.name, 'export.json')
+        self.assertEqual(manager.export_file(path), 2000)
+        other = SubscriptionManager(os.path.join(self.tmp.name, 'other.db'))
+        self.assertEqual(other.import_file(path), 2000)
+        self.assertEqual(other.export_subscriptions(), manager.export_subscriptions())
+
+    def test_due_subscriptions_follow_each_frequency(self):
+        manager = SubscriptionManager(self.db_path, default_frequency_days=1)
+        manager.add_subscription('daily/repo')
+        manager.add_subscription('weekly/repo', frequency_days=7)
+        manager.add_subscription('low/repo', priority='low')
+        now = time.time()
+        # 新订阅立即到期，低优先级排在最后
+        self.assertEqual([item.repo for item in manager.due_subscriptions(now)],
+                         ['daily/repo', 'weekly/repo', 'low/repo'])
+
+        manager.mark_run(['daily/repo', 'weekly/repo', 'low/repo'], now)
+        self.assertEqual(manager.due_subscriptions(now), [])
+        # 第二天只有按天生成报告的仓库到期；略早于到期时间启动的任务也会处理
+        tomorrow = now + 86400 - DUE_GRACE_SECONDS / 2
+        self.assertEqual([item.repo for item in manager.due_subscriptions(tomorrow)], ['daily/repo', 'low/repo'])
+        self.assertEqual([item.repo for item in manager.due_subscriptions(now + 7 * 86400)],
+                         ['daily/repo', 'weekly/repo', 'low/repo'])
+        self.assertEqual(manager.get_subscription('weekly/repo').last_run_at, now)
+    def test_min_frequency_days(self):
+        manager = SubscriptionManager(self.db_path, default_frequency_days=3)
+        self.assertEqual(manager.min_frequency_days(), 3)
+        manager.add_subscription('weekly/repo', frequency_days=7)
+        self.assertEqual(manager.min_frequency_days(), 3)
+        manager.add_subscription('daily/repo', frequency_days=1)
+        self.assertEqual(manager.min_frequency_days(), 1)
 
 if __name__ == '__main__':
     unittest.main()
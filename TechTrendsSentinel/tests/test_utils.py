@@ -1,9 +1,26 @@
 import unittest
-# Add imports for utility functions to test
+from src.utils import estimate_tokens, split_markdown
 
 class TestUtils(unittest.TestCase):
-    # Add test cases for utility functions
-    pass
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens(''), 0)
+        self.assertEqual(estimate_tokens('abcdefgh'), 2)
+        self.assertEqual(estimate_tokens('进展简报'), 4)
+
+    def test_split_markdown_keeps_header_and_all_lines(self):
+        lines = [f"- issue number {i} #{i}\n" for i in range(100)]
+        markdown = "# Progress for owner/repo\n" + ''.join(lines)
+        chunks = split_markdown(markdown, 100)
+
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertTrue(chunk.startswith("# Progress for owner/repo\n"))
+            self.assertLessEqual(estimate_tokens(chunk), 100)
+        rejoined = ''.join(chunk.split('\n', 1)[1] for chunk in chunks)
+        self.assertEqual(rejoined, ''.join(lines))
+
+    def test_small_markdown_is_single_chunk(self):
+        self.assertEqual(split_markdown("# Title\n- one\n", 100), ["# Title\n- one\n"])
 
 if __name__ == '__main__':
     unittest.main()